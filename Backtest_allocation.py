@@ -0,0 +1,288 @@
+# StockTrade24.com
+# 정적 자산배분 고속 시뮬레이터
+#
+# 올웨더/켄피셔/피터린치 포트폴리오 스크립트는 시장별로 비중 1개만
+# bt.Backtest로 검증합니다. 이 모듈은 같은 가격 데이터 위에서
+# 수천~수만 개의 비중 후보를 행렬 연산으로 한꺼번에 리밸런싱하여
+# 효율적 투자선 탐색, 제약조건 탐색 등을 몇 초 안에 할 수 있게 해줍니다.
+#
+# bt와 동일하게 종가 기준으로 리밸런싱하며, 첫 거래일에 최초 매수,
+# 이후 분기(또는 월)가 바뀐 첫 거래일마다 목표 비중으로 되돌립니다.
+
+import numpy as np
+import pandas as pd
+
+from Backtest_stats import calculate_stats_array, STAT_COLUMNS
+
+# 포트폴리오 스크립트와 동일한 시장별 수수료 함수 (q: 수량, p: 가격)
+COMMISSIONS = {
+    'US': lambda q, p: max(0, abs(q) * 0.0018),  # 미국 ETF 수수료: 0.18%
+    'KR': lambda q, p: max(0, abs(q) * 0.0003),  # 한국 ETF 수수료: 0.03%
+}
+
+REBALANCE_MODES = ('quarterly', 'monthly', 'threshold')
+
+
+def _period_keys(dates, rebalance):
+    """리밸런싱 주기를 구분하는 정수 키 (키가 바뀌는 날이 리밸런싱일)"""
+    dates = pd.DatetimeIndex(dates)
+    if rebalance == 'quarterly':
+        return np.asarray(dates.year * 4 + dates.quarter)
+    if rebalance == 'monthly':
+        return np.asarray(dates.year * 12 + dates.month)
+    raise ValueError(f"지원하지 않는 리밸런싱 주기입니다: {rebalance}")
+
+
+def _commission_matrix(commission, trades, prices):
+    """
+    수수료 함수를 거래 행렬 전체에 적용합니다.
+    NumPy 배열을 그대로 받을 수 있는 함수는 한 번에 계산하고,
+    max(0, ...)처럼 스칼라만 받는 기존 lambda는 원소별로 호출합니다.
+    """
+    if commission is None:
+        return np.zeros(trades.shape[0])
+
+    price_matrix = np.broadcast_to(prices, trades.shape)
+    try:
+        fees = np.asarray(commission(trades, price_matrix), dtype=float)
+        if fees.shape != trades.shape:
+            raise ValueError
+    except (ValueError, TypeError):
+        fees = np.frompyfunc(commission, 2, 1)(trades, price_matrix).astype(float)
+
+    # 거래가 없는 자산에는 수수료를 매기지 않습니다 (bt와 동일)
+    fees = np.where(trades != 0, fees, 0.0)
+    return fees.sum(axis=1)
+
+
+def _rebalance(shares, cash, target_weights, prices, mask, commission, integer_positions):
+    """mask가 True인 후보만 목표 비중으로 리밸런싱합니다."""
+    rows = np.flatnonzero(mask)
+    if len(rows) == 0:
+        return shares, cash
+
+    value = cash[rows] + shares[rows] @ prices
+    target = target_weights[rows] * value[:, None] / prices
+    if integer_positions:
+        target = np.trunc(target)
+
+    trades = target - shares[rows]
+    fees = _commission_matrix(commission, trades, prices)
+    cash[rows] = cash[rows] - trades @ prices - fees
+    shares[rows] = target
+    return shares, cash
+
+
+def simulate_allocation_array(prices, dates, weights, rebalance='quarterly', threshold=0.05,
+                              commission=None, initial_capital=1000000.0,
+                              integer_positions=True, state=None):
+    """
+    NumPy 배열 기반 리밸런싱 시뮬레이션 핵심 함수입니다.
+
+    Parameters:
+        prices (numpy.ndarray): 가격 행렬 (시점 x 자산), 결측치 없음
+        dates (pandas.DatetimeIndex): 각 행의 날짜
+        weights (numpy.ndarray): 목표 비중 행렬 (후보 x 자산)
+        rebalance (str): 'quarterly', 'monthly', 'threshold' 중 하나
+        threshold (float): 'threshold' 모드에서 허용하는 비중 이탈폭
+        commission (function): 수수료 함수 f(수량, 가격)
+        initial_capital (float): 초기 투자금
+        integer_positions (bool): 정수 주식 수로만 매매할지 여부 (bt 기본값과 동일)
+        state (dict): 이전 실행의 종료 상태 (이어서 계산할 때 사용)
+
+    Returns:
+        tuple: (평가금액 행렬 (시점 x 후보), 종료 상태 dict)
+    """
+    if rebalance not in REBALANCE_MODES:
+        raise ValueError(f"rebalance는 {REBALANCE_MODES} 중 하나여야 합니다: {rebalance}")
+
+    n_rows = len(prices)
+    n_candidates = weights.shape[0]
+    equity = np.empty((n_rows, n_candidates))
+
+    if state is None:
+        shares = np.zeros(weights.shape)
+        cash = np.full(n_candidates, float(initial_capital))
+        last_key = None
+        last_rebalance = None
+    else:
+        shares = state['shares'].copy()
+        cash = state['cash'].copy()
+        last_key = state['last_key']
+        last_rebalance = state['last_rebalance']
+
+    if n_rows == 0:
+        return equity, state
+
+    if rebalance == 'threshold':
+        for t in range(n_rows):
+            p = prices[t]
+            holdings = shares * p
+            value = cash + holdings.sum(axis=1)
+            if last_key is None:
+                mask = np.ones(n_candidates, dtype=bool)
+            else:
+                # 현재 비중이 목표 비중에서 threshold 이상 벗어난 후보만 리밸런싱
+                drift = np.abs(holdings / value[:, None] - weights).max(axis=1)
+                mask = drift > threshold
+            if mask.any():
+                shares, cash = _rebalance(shares, cash, weights, p, mask, commission, integer_positions)
+                last_rebalance = dates[t]
+            last_key = 0
+            equity[t] = cash + shares @ p
+    else:
+        # 리밸런싱일 사이에는 보유 수량이 고정이므로 구간 단위로 한 번에 평가합니다
+        keys = _period_keys(dates, rebalance)
+        previous = np.r_[last_key if last_key is not None else keys[0] - 1, keys[:-1]]
+        starts = np.flatnonzero(keys != previous)
+        if state is None:
+            starts = np.union1d([0], starts)
+        bounds = np.r_[starts, n_rows]
+
+        if len(starts) == 0 or starts[0] > 0:
+            end = starts[0] if len(starts) else n_rows
+            equity[:end] = cash + prices[:end] @ shares.T
+
+        everyone = np.ones(n_candidates, dtype=bool)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            shares, cash = _rebalance(shares, cash, weights, prices[start], everyone,
+                                      commission, integer_positions)
+            last_rebalance = dates[start]
+            equity[start:end] = cash + prices[start:end] @ shares.T
+        last_key = keys[-1]
+
+    new_state = {
+        'shares': shares,
+        'cash': cash,
+        'last_key': last_key,
+        'last_rebalance': last_rebalance,
+        'last_date': dates[-1],
+    }
+    return equity, new_state
+
+
+def _prepare(prices, weights):
+    """가격 DataFrame과 비중(Series/DataFrame/배열)을 같은 자산 순서의 배열로 맞춥니다."""
+    if isinstance(weights, pd.Series):
+        weights = weights.to_frame().T
+    if isinstance(weights, pd.DataFrame):
+        weights = weights.reindex(columns=prices.columns, fill_value=0.0)
+        names = list(weights.index)
+        weights = weights.to_numpy(dtype=float)
+    else:
+        weights = np.atleast_2d(np.asarray(weights, dtype=float))
+        names = list(range(weights.shape[0]))
+        if weights.shape[1] != prices.shape[1]:
+            raise ValueError("비중 배열의 자산 수가 가격 데이터의 컬럼 수와 다릅니다.")
+
+    # 비중이 하나라도 있는 자산만 사용하고, 모두 가격이 있는 날부터 시작합니다
+    used = np.flatnonzero(np.any(weights != 0, axis=0))
+    panel = prices.iloc[:, used].ffill().dropna()
+    if panel.empty:
+        raise ValueError("모든 자산의 가격이 존재하는 구간이 없습니다.")
+
+    return panel, weights[:, used], names
+
+
+def simulate_allocations(prices, weights, rebalance='quarterly', threshold=0.05, commission=None,
+                         initial_capital=1000000.0, integer_positions=True):
+    """
+    여러 비중 후보의 포트폴리오 가치를 한 번에 시뮬레이션하는 함수입니다.
+    결과는 bt의 results.prices처럼 100에서 시작하는 지수로 반환합니다.
+
+    사용법: weights = random_weights(10000, ['US_TIP', 'US_DBC', 'US_GLD', 'US_VNQ'])
+            curves = simulate_allocations(data, weights, commission=COMMISSIONS['US'])
+
+    Parameters:
+        prices (pandas.DataFrame): 가격 데이터 (download_data 결과 등)
+        weights (pandas.DataFrame 또는 Series): 목표 비중 (행: 후보, 열: 자산)
+        rebalance (str): 'quarterly', 'monthly', 'threshold' 중 하나
+        threshold (float): 'threshold' 모드의 허용 비중 이탈폭
+        commission (function): 수수료 함수 f(수량, 가격)
+        initial_capital (float): 초기 투자금
+        integer_positions (bool): 정수 주식 수로만 매매할지 여부
+
+    Returns:
+        pandas.DataFrame: 후보별 가치 지수 (시점 x 후보)
+    """
+    panel, w, names = _prepare(prices, weights)
+    equity, _ = simulate_allocation_array(panel.to_numpy(dtype=float), panel.index, w,
+                                          rebalance, threshold, commission,
+                                          initial_capital, integer_positions)
+    return pd.DataFrame(equity / initial_capital * 100, index=panel.index, columns=names)
+
+
+def random_weights(n_candidates, assets, max_weight=1.0, seed=None):
+    """
+    합이 1인 무작위 비중 후보를 만드는 함수입니다 (디리클레 분포).
+
+    Parameters:
+        n_candidates (int): 후보 개수
+        assets (list): 자산 컬럼 이름
+        max_weight (float): 자산별 최대 비중 (넘는 후보는 제외 후 다시 뽑음)
+        seed (int): 난수 시드
+
+    Returns:
+        pandas.DataFrame: 비중 후보 (행: 후보, 열: 자산)
+    """
+    rng = np.random.default_rng(seed)
+    chunks = []
+    remaining = n_candidates
+    while remaining > 0:
+        w = rng.dirichlet(np.ones(len(assets)), size=max(remaining * 2, 16))
+        w = w[w.max(axis=1) <= max_weight][:remaining]
+        chunks.append(w)
+        remaining -= len(w)
+    return pd.DataFrame(np.vstack(chunks), columns=list(assets))
+
+
+def search_allocations(prices, weights, rebalance='quarterly', threshold=0.05, commission=None,
+                       initial_capital=1000000.0, integer_positions=True,
+                       sort_by='daily_sharpe', chunk_size=2000):
+    """
+    비중 후보 전체를 시뮬레이션하고 성과지표와 함께 정렬된 표로 반환합니다.
+    메모리를 아끼기 위해 chunk_size 단위로 계산한 뒤 지표만 남깁니다.
+
+    Parameters:
+        prices (pandas.DataFrame): 가격 데이터
+        weights (pandas.DataFrame): 목표 비중 (행: 후보, 열: 자산)
+        sort_by (str): 정렬 기준 지표 (STAT_COLUMNS 중 하나)
+        chunk_size (int): 한 번에 시뮬레이션할 후보 수
+        (그 외 인자는 simulate_allocations와 동일)
+
+    Returns:
+        pandas.DataFrame: 후보별 비중과 성과지표 (sort_by 내림차순)
+    """
+    panel, w, names = _prepare(prices, weights)
+    values = panel.to_numpy(dtype=float)
+
+    tables = []
+    for start in range(0, len(w), chunk_size):
+        block = w[start:start + chunk_size]
+        equity, _ = simulate_allocation_array(values, panel.index, block, rebalance, threshold,
+                                              commission, initial_capital, integer_positions)
+        tables.append(pd.DataFrame(calculate_stats_array(equity, panel.index), columns=STAT_COLUMNS))
+
+    stats = pd.concat(tables, ignore_index=True)
+    stats.index = pd.Index(names)
+    table = pd.concat([pd.DataFrame(w, index=stats.index, columns=panel.columns), stats], axis=1)
+    return table.sort_values(sort_by, ascending=False)
+
+
+def efficient_frontier(table, risk='daily_vol', reward='cagr'):
+    """
+    search_allocations 결과에서 효율적 투자선 위의 후보만 골라냅니다.
+    위험이 낮은 순으로 보면서, 지금까지보다 수익이 높은 후보만 남깁니다.
+
+    Parameters:
+        table (pandas.DataFrame): search_allocations 결과
+        risk (str): 위험 지표 컬럼
+        reward (str): 수익 지표 컬럼
+
+    Returns:
+        pandas.DataFrame: 효율적 투자선 후보 (위험 오름차순)
+    """
+    ordered = table.dropna(subset=[risk, reward]).sort_values(risk)
+    best_so_far = np.maximum.accumulate(ordered[reward].to_numpy())
+    on_frontier = ordered[reward].to_numpy() >= best_so_far
+    return ordered[on_frontier]
@@ -0,0 +1,181 @@
+# StockTrade24.com
+# 전략/포트폴리오 일괄 실행기 (화면 없이 실행)
+#
+# 각 스크립트를 따로 실행하면 스크립트마다 yfinance, pandas_ta, bt, matplotlib을 불러오고
+# 마지막 results.plot()에서 그래프 창이 뜰 때까지 멈춥니다.
+# 이 실행기는 원하는 전략/포트폴리오를 한 프로세스에서 차례로 실행하면서
+# - 같은 종목/기간 데이터는 한 번만 읽고 (Data_cache 캐시 사용)
+# - bt, 전략 스크립트 등 무거운 모듈은 실제로 필요할 때 불러오고
+# - 그래프는 별도 프로세스에서 PNG 파일로 저장해 실행을 막지 않습니다.
+#
+# 사용법:
+#   python Backtest_batch.py --list                 # 실행 가능한 이름 보기
+#   python Backtest_batch.py                        # 전체 실행
+#   python Backtest_batch.py rsi sma allweather --charts-dir charts
+#   python Backtest_batch.py --no-charts --output summary.csv
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from Backtest_strategies import PORTFOLIOS, STRATEGIES, get_portfolio_spec, get_spec
+
+CHART_DIR = "charts"  # 그래프 저장 폴더
+
+
+def render_chart(prices, path, title):
+    """
+    평가금액 곡선과 낙폭 그래프를 PNG 파일로 저장합니다. (그래프 작업 프로세스에서 실행)
+
+    Parameters:
+        prices (pandas.DataFrame): 전략별 가치 지수 (results.prices)
+        path (str): 저장할 파일 경로
+        title (str): 그래프 제목
+    """
+    import matplotlib
+    matplotlib.use("Agg")  # 화면 없이 파일로만 그립니다
+    import matplotlib.pyplot as plt
+
+    fig, (ax_price, ax_drawdown) = plt.subplots(2, 1, figsize=(15, 8), sharex=True,
+                                                gridspec_kw={'height_ratios': [2, 1]})
+    prices.plot(ax=ax_price, title=title)
+    ax_price.set_ylabel('Value')
+    (prices / prices.cummax() - 1).plot(ax=ax_drawdown, legend=False)
+    ax_drawdown.set_ylabel('Drawdown')
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return path
+
+
+def _load_once(loaded, loader, *args):
+    """같은 인자로 이미 읽은 데이터는 다시 읽지 않습니다."""
+    if args not in loaded:
+        loaded[args] = loader(*args)
+    return loaded[args]
+
+
+def run_strategy_job(key, loaded, start_date=None, end_date=None):
+    """단일종목 전략 하나를 실행하고 bt 결과를 반환합니다."""
+    from Backtest_strategies import run_strategy
+    from Data_cache import load_ohlcv
+
+    spec = get_spec(key)
+    ohlcv = _load_once(loaded, load_ohlcv, spec['ticker'],
+                       start_date or spec['start_date'], end_date or spec['end_date'])
+    return run_strategy(key, ohlcv)
+
+
+def run_portfolio_job(key, loaded, start_date=None, end_date=None):
+    """
+    포트폴리오 하나를 스크립트와 같은 방식(시장별 백테스트 2개)으로 실행합니다.
+    시장별 데이터는 각 거래소 거래일에 맞춰 따로 읽습니다.
+    """
+    import bt
+
+    from Backtest_allocation import COMMISSIONS
+    from Backtest_parallel import run_parallel
+    from Backtest_strategies import load_portfolio_module, load_portfolio_prices, portfolio_weights
+
+    spec = get_portfolio_spec(key)
+    module = load_portfolio_module(key)
+    weights = portfolio_weights(key)
+    backtests = []
+    for market, name in spec['names'].items():
+        data = _load_once(loaded, load_portfolio_prices, key, start_date, end_date, None, market)
+        backtests.append(bt.Backtest(module.create_strategy(name, weights[market]), data,
+                                     commissions=COMMISSIONS[market]))
+    return run_parallel(*backtests)
+
+
+def run_batch(names=None, start_date=None, end_date=None, chart_dir=CHART_DIR, charts=True):
+    """
+    여러 전략/포트폴리오를 한 프로세스에서 실행하고 성과 요약표를 만드는 함수입니다.
+
+    Parameters:
+        names (list): 실행할 전략/포트폴리오 키 (생략하면 전체)
+        start_date / end_date (str): 기간 (생략하면 각 스크립트의 기본값)
+        chart_dir (str): 그래프 저장 폴더
+        charts (bool): 그래프 저장 여부
+
+    Returns:
+        pandas.DataFrame: 전략별 성과 요약 (행: 전략 이름)
+    """
+    from Backtest_stats import calculate_stats
+
+    names = names or list(STRATEGIES) + list(PORTFOLIOS)
+    loaded = {}
+    tables = []
+    chart_jobs = []
+    # 그래프는 작업 프로세스 하나가 맡아 matplotlib 로딩과 그리기가 백테스트를 막지 않게 합니다
+    chart_pool = ProcessPoolExecutor(max_workers=1) if charts else None
+    try:
+        for name in names:
+            start = time.perf_counter()
+            try:
+                if name in STRATEGIES:
+                    results = run_strategy_job(name, loaded, start_date, end_date)
+                elif name in PORTFOLIOS:
+                    results = run_portfolio_job(name, loaded, start_date, end_date)
+                else:
+                    raise ValueError(f"알 수 없는 전략/포트폴리오입니다: {name}")
+            except Exception as e:
+                print(f"{name}: 실행 중 오류가 발생했습니다 ({e})")
+                continue
+            elapsed = time.perf_counter() - start
+
+            stats = calculate_stats(results.prices)
+            stats.insert(0, 'batch', name)
+            stats['elapsed'] = elapsed
+            tables.append(stats)
+            print(f"{name}: 완료 ({elapsed:.2f}초)")
+
+            if chart_pool is not None:
+                path = os.path.join(chart_dir, f"{name}.png")
+                chart_jobs.append(chart_pool.submit(render_chart, results.prices, path,
+                                                     " vs ".join(results.prices.columns)))
+
+        for job in chart_jobs:
+            try:
+                print(f"그래프 저장: {job.result()}")
+            except Exception as e:
+                print(f"그래프 저장 중 오류가 발생했습니다: {e}")
+    finally:
+        if chart_pool is not None:
+            chart_pool.shutdown()
+
+    return pd.concat(tables) if tables else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='전략/포트폴리오 일괄 실행기')
+    parser.add_argument('names', nargs='*', help='실행할 전략/포트폴리오 키 (기본: 전체)')
+    parser.add_argument('--list', action='store_true', help='실행 가능한 이름 목록만 출력')
+    parser.add_argument('--start', help='시작일 (기본: 스크립트 설정값)')
+    parser.add_argument('--end', help='종료일 (기본: 스크립트 설정값)')
+    parser.add_argument('--charts-dir', default=CHART_DIR, help='그래프 저장 폴더')
+    parser.add_argument('--no-charts', action='store_true', help='그래프를 저장하지 않음')
+    parser.add_argument('--output', help='요약표를 저장할 CSV 파일')
+    args = parser.parse_args()
+
+    if args.list:
+        for key in STRATEGIES:
+            print(f"{key:12s} {get_spec(key)['name']}")
+        for key in PORTFOLIOS:
+            print(f"{key:12s} {', '.join(get_portfolio_spec(key)['names'].values())}")
+    else:
+        unknown = [name for name in args.names if name not in STRATEGIES and name not in PORTFOLIOS]
+        if unknown:
+            parser.error(f"알 수 없는 이름: {', '.join(unknown)} (--list로 확인)")
+
+        start = time.perf_counter()
+        summary = run_batch(args.names, args.start, args.end, args.charts_dir, not args.no_charts)
+        print("\n===== 일괄 실행 결과 =====")
+        print(summary.round(4).to_string())
+        if args.output:
+            summary.to_csv(args.output)
+        print(f"\n총 소요 시간: {time.perf_counter() - start:.2f}초")
@@ -0,0 +1,380 @@
+# StockTrade24.com
+# 대용량 유니버스 구간별(out-of-core) 백테스트
+#
+# 리더보드(Backtest_leaderboard)는 전 종목의 전체 기간 OHLCV를 한꺼번에 메모리(공유 패널)에 올립니다.
+# 코스피/코스닥 2,500여 종목 x 20년 이상 일봉이나 분봉 유니버스는 그렇게 올릴 수 없으므로,
+# 이 모듈은 가격 저장소(Data_cache 일봉, Minute_store 분봉)를 종목 묶음 x 기간 구간 단위로 읽어
+# 단일종목 전략을 실행합니다.
+# - 구간이 바뀌어도 종목별 전략 Algo(이전 포지션), 보유 수량/현금, 지표 계산용 최근 tail_bars개 OHLCV를
+#   그대로 이어받으므로 tail_bars가 지표 기간보다 충분히 길면 한 번에 실행한 것과 같은 매매가 이어집니다.
+#   (Backtest_incremental과 같은 방식)
+# - 성과지표는 Backtest_stats.StreamingStats로 구간마다 누적하므로 전체 자산곡선을 들고 있지 않습니다.
+# - 종목 묶음이 끝날 때마다 결과 행을 CSV에 바로 추가하고, 자산곡선(일별 마지막 값)은 묶음 x 구간마다
+#   파일로 저장합니다. 중단되어도 다시 실행하면 CSV에 있는 종목은 건너뜁니다.
+# 작업 프로세스 하나가 쓰는 메모리는 (묶음 종목 수 x tail_bars) + (묶음 종목 수 x 구간 길이) 정도로
+# 유니버스 크기와 전체 기간에 관계없이 일정합니다.
+#
+# 사용법:
+#   python Backtest_chunked.py rsi --tickers-file krx_all.txt --start 2004-01-01 --end 2025-01-01 --prefetch
+#   python Backtest_chunked.py sma --tickers-file krx_all.txt --block 50 --window 5YS --workers 4
+#   python Backtest_chunked.py rsi --tickers 005930 035720 --source minute --window MS --tail-bars 2000
+
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from Backtest_incremental import advance_signal
+from Backtest_leaderboard import LEADERBOARD_STATS, _parse_params
+from Backtest_stats import StreamingStats
+from Backtest_strategies import STRATEGIES, get_spec, load_strategy_module, prepare_data, split_params
+from Data_cache import (CACHE_DIR, _ohlcv_path, _safe_name, _slice_dates, load_ohlcv, read_frame,
+                        read_tickers, write_frame)
+
+OUTPUT_DIR = "chunked_results"  # 결과 저장 폴더
+SOURCES = ('daily', 'minute')   # 가격 저장소 종류
+
+# 결과 CSV 컬럼 (리더보드와 같은 이름)
+ROW_COLUMNS = (['ticker'] + LEADERBOARD_STATS + [f'bh_{col}' for col in LEADERBOARD_STATS]
+               + ['excess_cagr', 'excess_sharpe', 'bars', 'error'])
+
+
+def read_window(source, ticker, start, end, cache_dir=CACHE_DIR):
+    """
+    가격 저장소에서 종목의 [start, end) 구간 OHLCV만 읽습니다. (내려받지 않음)
+
+    Parameters:
+        source (str): 'daily' (Data_cache 일봉) 또는 'minute' (Minute_store 분봉)
+        ticker (str): 티커 또는 종목코드
+        start, end: 구간 시작/종료 (종료 시각은 포함하지 않음)
+        cache_dir (str): 데이터 캐시 폴더
+
+    Returns:
+        pandas.DataFrame: 구간의 OHLCV (없으면 빈 DataFrame)
+    """
+    if source == 'minute':
+        from Minute_store import load_minutes  # 분봉 저장소를 쓸 때만 불러옵니다
+        return load_minutes(ticker, start, end, cache_dir)
+    frame = read_frame(_ohlcv_path(ticker, cache_dir))
+    if frame is None:
+        raise FileNotFoundError(f"{ticker}: 캐시에 데이터가 없습니다. 먼저 --prefetch로 내려받으세요.")
+    return _slice_dates(frame, start, end)
+
+
+def make_windows(start_date, end_date, freq='5YS'):
+    """
+    전체 기간을 freq 경계로 나눈 구간 목록을 만듭니다. (경계는 자정이므로 하루가 두 구간에 나뉘지 않음)
+
+    사용법: make_windows("2004-01-01", "2025-01-01", "5YS")   # 5년 단위 (연초 기준)
+
+    Returns:
+        list: [(구간 시작, 구간 종료)] (종료는 포함하지 않음)
+    """
+    start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+    bounds = [start] + [b for b in pd.date_range(start, end, freq=freq) if start < b < end] + [end]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _daily_last(series):
+    """하루에 여러 행(분봉)이 있으면 그날의 마지막 값만 남깁니다."""
+    return series[~series.index.normalize().duplicated(keep='last')]
+
+
+def run_block(key, tickers, windows, params=None, source='daily', cache_dir=CACHE_DIR, equity_dir=None,
+              initial_capital=1000000.0, tail_bars=500):
+    """
+    종목 묶음 하나를 기간 구간 순서대로 읽으며 전략과 매수후 보유를 백테스트합니다.
+    구간 사이에는 종목별 Algo, 보유 수량/현금, 최근 tail_bars개 OHLCV만 이어받습니다.
+
+    Parameters:
+        key (str): 전략 키 ('rsi', 'macd', 'bollinger', 'sma', 'volmomen')
+        tickers (list): 묶음의 종목 목록
+        windows (list): make_windows 결과
+        params (dict): 전략/지표 파라미터 변경값
+        source (str): 'daily' 또는 'minute'
+        cache_dir (str): 데이터 캐시 폴더
+        equity_dir (str): 자산곡선을 저장할 폴더 (None이면 저장하지 않음)
+        initial_capital (float): 초기 투자금
+        tail_bars (int): 지표 계산용으로 이어받을 최근 OHLCV 개수 (가장 긴 지표 기간보다 충분히 길게)
+
+    Returns:
+        list: 종목별 결과 행 (dict)
+    """
+    spec = get_spec(key)
+    indicator_params, algo_params = split_params(key, params)
+    algo_class = getattr(load_strategy_module(key), spec['algo'])
+    states = {}
+    errors = {}
+
+    for start, end in windows:
+        equity = {}
+        for ticker in tickers:
+            if ticker in errors:
+                continue
+            try:
+                bars = read_window(source, ticker, start, end, cache_dir)
+                if bars.empty:
+                    continue  # 상장 전이거나 상장폐지 이후 구간
+                state = states.get(ticker)
+                if state is None:
+                    state = states[ticker] = {
+                        'algo': algo_class(**algo_params),
+                        'shares': 0.0,
+                        'cash': float(initial_capital),
+                        'tail': bars.iloc[:0],
+                        'first_close': float(bars['Close'].iloc[0]),
+                        'stats': StreamingStats([spec['name'], 'Buy & Hold']),
+                        'bars': 0,
+                    }
+                history = pd.concat([state['tail'], bars])  # 지표 계산에 필요한 과거 구간 + 이번 구간
+                data = prepare_data(key, history, **indicator_params)
+                values, state['shares'], state['cash'] = advance_signal(
+                    state['algo'], data, bars, state['shares'], state['cash'])
+                hold = initial_capital * bars['Close'].to_numpy(dtype=float) / state['first_close']
+                state['stats'].update(np.column_stack([values, hold]), bars.index)
+                state['tail'] = history.iloc[-tail_bars:].copy()  # 구간 전체를 붙잡고 있지 않도록 복사
+                state['bars'] += len(bars)
+                if equity_dir is not None:
+                    equity[ticker] = _daily_last(pd.Series(values, index=bars.index))
+            except Exception as e:
+                errors[ticker] = str(e)
+                states.pop(ticker, None)
+        if equity:
+            write_frame(pd.DataFrame(equity), os.path.join(equity_dir, _safe_name(tickers[0]),
+                                                           start.strftime("%Y%m%d")))
+
+    rows = []
+    for ticker in tickers:
+        row = {'ticker': ticker}
+        if ticker in errors:
+            row['error'] = errors[ticker]
+        elif ticker not in states:
+            row['error'] = "기간 안에 데이터가 없습니다."
+        else:
+            stats = states[ticker]['stats'].result()
+            strategy_stats, hold_stats = stats.iloc[0], stats.iloc[1]
+            for col in LEADERBOARD_STATS:
+                row[col] = strategy_stats[col]
+            for col in LEADERBOARD_STATS:
+                row[f'bh_{col}'] = hold_stats[col]
+            row['excess_cagr'] = strategy_stats['cagr'] - hold_stats['cagr']
+            row['excess_sharpe'] = strategy_stats['daily_sharpe'] - hold_stats['daily_sharpe']
+            row['bars'] = states[ticker]['bars']
+        rows.append(row)
+    return rows
+
+
+def _append_rows(path, rows):
+    """결과 행을 CSV 끝에 바로 추가합니다. (묶음이 끝날 때마다 저장)"""
+    frame = pd.DataFrame(rows).reindex(columns=ROW_COLUMNS)
+    with open(path, "a", encoding="UTF-8", newline="") as f:
+        frame.to_csv(f, header=f.tell() == 0, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _prepare_output(output_dir, config, fresh):
+    """
+    결과 폴더를 준비하고 이미 끝난 종목 목록을 반환합니다.
+    설정이 바뀌었으면 이전 결과를 지우고 처음부터 계산합니다.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    config_path = os.path.join(output_dir, "config.json")
+    rows_path = os.path.join(output_dir, "results.csv")
+    previous = None
+    if os.path.exists(config_path):
+        with open(config_path, encoding="UTF-8") as f:
+            previous = json.load(f)
+    if fresh or previous != config:
+        if previous is not None and not fresh:
+            print("설정이 바뀌어 이전 결과를 지우고 처음부터 계산합니다.")
+        if os.path.exists(rows_path):
+            os.remove(rows_path)
+        shutil.rmtree(os.path.join(output_dir, "equity"), ignore_errors=True)
+        with open(config_path, "w", encoding="UTF-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        return set()
+    if not os.path.exists(rows_path):
+        return set()
+    return set(pd.read_csv(rows_path, usecols=['ticker'], dtype=str)['ticker'])
+
+
+def run_chunked(key, tickers, start_date=None, end_date=None, params=None, source='daily',
+                window='5YS', block_size=50, workers=1, output_dir=OUTPUT_DIR, cache_dir=CACHE_DIR,
+                save_equity=True, initial_capital=1000000.0, tail_bars=500, fresh=False,
+                sort_by='excess_cagr'):
+    """
+    대용량 유니버스에 단일종목 전략을 종목 묶음 x 기간 구간 단위로 적용하는 함수입니다.
+    결과는 output_dir/results.csv에 묶음마다 추가되고, 자산곡선은 output_dir/equity에 저장됩니다.
+
+    사용법: board = run_chunked('rsi', tickers, '2004-01-01', '2025-01-01', workers=4)
+
+    Parameters:
+        key (str): 전략 키
+        tickers (list): 종목 티커(분봉은 종목코드) 목록
+        start_date (str): 시작일 (생략하면 스크립트 기본값)
+        end_date (str): 종료일 (생략하면 스크립트 기본값, 포함하지 않음)
+        params (dict): 전략/지표 파라미터 변경값
+        source (str): 'daily' (Data_cache 일봉) 또는 'minute' (Minute_store 분봉)
+        window (str): 기간 구간 단위 (pandas 주기 문자열, 예: '5YS', 'YS', 'MS')
+        block_size (int): 한 번에 처리할 종목 수 (작업 하나의 단위)
+        workers (int): 병렬 프로세스 수
+        output_dir (str): 결과 저장 폴더
+        cache_dir (str): 데이터 캐시 폴더
+        save_equity (bool): 자산곡선(일별 마지막 값) 저장 여부
+        initial_capital (float): 초기 투자금
+        tail_bars (int): 구간 사이에 이어받을 최근 OHLCV 개수
+        fresh (bool): True면 이전 결과를 지우고 처음부터 계산
+        sort_by (str): 순위 기준 컬럼
+
+    Returns:
+        pandas.DataFrame: 종목별 성과 순위표 (results.csv 전체)
+    """
+    if source not in SOURCES:
+        raise ValueError(f"source는 {SOURCES} 중 하나여야 합니다: {source}")
+    spec = get_spec(key)
+    start_date = start_date or spec['start_date']
+    end_date = end_date or spec['end_date']
+    split_params(key, params)  # 잘못된 파라미터 이름은 작업 시작 전에 알려줍니다
+
+    config = {'key': key, 'params': dict(params or {}), 'start': str(start_date), 'end': str(end_date),
+              'source': source, 'window': window, 'initial_capital': initial_capital,
+              'tail_bars': tail_bars}
+    done = _prepare_output(output_dir, config, fresh)
+    remaining = [ticker for ticker in dict.fromkeys(tickers) if ticker not in done]
+    if done:
+        print(f"이미 계산된 {len(done)}개 종목은 건너뜁니다.")
+
+    windows = make_windows(start_date, end_date, window)
+    equity_dir = os.path.join(output_dir, "equity") if save_equity else None
+    rows_path = os.path.join(output_dir, "results.csv")
+    blocks = [remaining[i:i + block_size] for i in range(0, len(remaining), block_size)]
+    jobs = [(key, block, windows, params, source, cache_dir, equity_dir, initial_capital, tail_bars)
+            for block in blocks]
+
+    started = time.perf_counter()
+    finished = 0
+    if workers <= 1 or len(jobs) <= 1:
+        results = (run_block(*job) for job in jobs)
+        for rows in results:
+            _append_rows(rows_path, rows)
+            finished += len(rows)
+            print(f"{finished}/{len(remaining)} 종목 완료 ({time.perf_counter() - started:.1f}초)")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_block, *job) for job in jobs]
+            for future in as_completed(futures):
+                rows = future.result()
+                _append_rows(rows_path, rows)
+                finished += len(rows)
+                print(f"{finished}/{len(remaining)} 종목 완료 ({time.perf_counter() - started:.1f}초)")
+
+    if not os.path.exists(rows_path):
+        return pd.DataFrame(columns=ROW_COLUMNS).set_index('ticker')
+    board = pd.read_csv(rows_path, dtype={'ticker': str}).set_index('ticker')
+    failed = board['error'].notna()
+    if failed.any():
+        print(f"\n{failed.sum()}개 종목에서 오류가 발생했습니다:")
+        print(board.loc[failed, 'error'])
+    board = board[~failed].drop(columns='error')
+    board = board.sort_values(sort_by, ascending=False)
+    board.insert(0, 'rank', range(1, len(board) + 1))
+    return board
+
+
+def load_equity(output_dir, tickers=None):
+    """
+    run_chunked가 저장한 자산곡선을 읽어 하나의 DataFrame으로 합칩니다.
+    종목이 많으면 필요한 종목만 지정하세요. (전체를 읽으면 메모리에 모두 올라옵니다)
+
+    사용법: equity = load_equity("chunked_results", ["005930.KS", "000660.KS"])
+
+    Returns:
+        pandas.DataFrame: 날짜 x 종목 전략 평가금액 (일별 마지막 값)
+    """
+    equity_dir = os.path.join(output_dir, "equity")
+    wanted = None if tickers is None else set(tickers)
+    blocks = []
+    for block in sorted(os.listdir(equity_dir)) if os.path.isdir(equity_dir) else []:
+        names = sorted({os.path.splitext(name)[0] for name in os.listdir(os.path.join(equity_dir, block))
+                        if not name.endswith(".tmp")})
+        parts = []
+        for name in names:
+            part = read_frame(os.path.join(equity_dir, block, name))
+            if wanted is not None:
+                part = part[[ticker for ticker in part.columns if ticker in wanted]]
+            if part.shape[1]:
+                parts.append(part)
+        if parts:
+            blocks.append(pd.concat(parts))
+    if not blocks:
+        return pd.DataFrame()
+    equity = pd.concat(blocks, axis=1)
+    return equity.loc[:, ~equity.columns.duplicated(keep='last')]
+
+
+def prefetch(tickers, start_date, end_date, source='daily', cache_dir=CACHE_DIR):
+    """
+    백테스트 전에 가격 저장소를 채웁니다. 한 종목씩 받아 저장하고 메모리에는 남기지 않습니다.
+    (분봉은 Minute_store.backfill_minutes로 한국투자증권 API에서 받습니다)
+    """
+    if source == 'minute':
+        from Minute_store import backfill_minutes
+        backfill_minutes(tickers, start_date, end_date, cache_dir)
+        return
+    for i, ticker in enumerate(tickers, 1):
+        try:
+            load_ohlcv(ticker, start_date, end_date, cache_dir)
+        except Exception as e:
+            print(f"Error downloading {ticker}: {e}")
+        if i % 100 == 0:
+            print(f"{i}/{len(tickers)} 종목 준비 완료")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='대용량 유니버스 구간별 백테스트')
+    parser.add_argument('strategy', choices=sorted(STRATEGIES), help='전략 키')
+    parser.add_argument('--tickers', nargs='*', default=[], help='종목 티커(분봉은 종목코드) 목록')
+    parser.add_argument('--tickers-file', help='한 줄에 티커 하나씩 적힌 파일')
+    parser.add_argument('--start', help='시작일 (기본: 스크립트 설정값)')
+    parser.add_argument('--end', help='종료일 (기본: 스크립트 설정값)')
+    parser.add_argument('--param', action='append', help='파라미터 변경 (예: rsi_upper=75)')
+    parser.add_argument('--source', choices=SOURCES, default='daily', help='가격 저장소 (일봉/분봉)')
+    parser.add_argument('--window', default='5YS', help='기간 구간 단위 (예: 5YS, YS, MS)')
+    parser.add_argument('--block', type=int, default=50, help='한 번에 처리할 종목 수')
+    parser.add_argument('--workers', type=int, default=1, help='병렬 프로세스 수')
+    parser.add_argument('--tail-bars', type=int, default=500, help='구간 사이에 이어받을 최근 봉 개수')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='결과 저장 폴더')
+    parser.add_argument('--no-equity', action='store_true', help='자산곡선을 저장하지 않음')
+    parser.add_argument('--prefetch', action='store_true', help='백테스트 전에 가격 저장소를 채움')
+    parser.add_argument('--fresh', action='store_true', help='이전 결과를 지우고 처음부터 계산')
+    parser.add_argument('--sort-by', default='excess_cagr', help='순위 기준 컬럼')
+    parser.add_argument('--output', help='순위표를 저장할 CSV 파일')
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        tickers += read_tickers(args.tickers_file)
+    if not tickers:
+        tickers = [get_spec(args.strategy)['ticker']]
+    spec = get_spec(args.strategy)
+    start_date, end_date = args.start or spec['start_date'], args.end or spec['end_date']
+
+    if args.prefetch:
+        prefetch(tickers, start_date, end_date, args.source)
+
+    board = run_chunked(args.strategy, tickers, start_date, end_date, _parse_params(args.param),
+                        args.source, args.window, args.block, args.workers, args.output_dir,
+                        save_equity=not args.no_equity, tail_bars=args.tail_bars, fresh=args.fresh,
+                        sort_by=args.sort_by)
+
+    print(f"\n===== {spec['name']} 구간별 백테스트 순위 =====")
+    print(board.round(4).to_string())
+    if args.output:
+        board.to_csv(args.output)
+        print(f"\n결과를 {args.output}에 저장했습니다.")
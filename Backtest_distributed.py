@@ -0,0 +1,497 @@
+# StockTrade24.com
+# 여러 컴퓨터로 나누어 실행하는 백테스트 스윕
+#
+# 전략 x 파라미터 x 종목 x 기간(워크포워드 구간) 조합 전체는 한 컴퓨터의 모든 코어로도 하룻밤에 끝나지 않습니다.
+# 이 모듈은 코디네이터 한 대가 작업 목록을 만들어 TCP로 나누어 주고,
+# 같은 네트워크의 여러 작업자 컴퓨터가 작업을 받아 실행한 뒤 결과를 바로 돌려보내게 합니다.
+# - 통신은 한 줄에 JSON 하나씩 주고받는 단순한 TCP 프로토콜입니다. (클라우드 서비스 필요 없음, pickle 사용 안 함)
+# - 작업자는 공유 폴더의 데이터 캐시(Data_cache)와 결과 저장소(Result_store)를 읽고 씁니다.
+# - 작업은 내용으로 만든 id가 있어, 같은 작업을 두 번 받거나 결과가 두 번 와도 한 번만 기록합니다.
+# - 작업자가 끊기거나 제한 시간 안에 결과를 보내지 않으면 그 작업을 다른 작업자에게 다시 줍니다.
+#   (오류가 난 작업도 max_attempts번까지 다시 시도)
+# - 결과는 도착하는 즉시 결과 파일(JSON Lines)에 추가하므로, 코디네이터를 다시 시작하면 끝난 작업은 건너뜁니다.
+#
+# 사용법:
+#   # 코디네이터 (작업 목록을 만들고 기다림)
+#   python Backtest_distributed.py serve rsi sma --tickers-file kospi200.txt \
+#       --window 2018-01-01:2021-01-01 --window 2021-01-01:2024-01-01 --port 5151 --token secret
+#   # 작업자 (각 컴퓨터에서, 데이터 캐시는 공유 폴더)
+#   python Backtest_distributed.py work 192.168.0.10 --port 5151 --token secret --cache-dir /mnt/share/data_cache
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from Backtest_strategies import STRATEGIES, get_spec
+from Data_cache import CACHE_DIR, read_tickers
+
+DEFAULT_PORT = 5151
+RESULTS_PATH = "sweep_results.jsonl"
+WAIT_SECONDS = 5  # 남은 작업이 없을 때 작업자가 다시 묻기 전에 기다리는 시간(초)
+
+
+def job_id(job):
+    """작업 내용으로 만든 id (같은 작업은 항상 같은 id)"""
+    return hashlib.sha1(json.dumps(job, sort_keys=True).encode('UTF-8')).hexdigest()[:16]
+
+
+def build_jobs(strategies, tickers, windows=None, grids=None):
+    """
+    전략 x 파라미터 조합 x 종목 x 기간 작업 목록을 만듭니다.
+
+    Parameters:
+        strategies (list): 전략 키 목록
+        tickers (list): 종목 티커 목록
+        windows (list): [(시작일, 종료일), ...] (생략하면 전략 스크립트의 기간 하나)
+        grids (dict): {전략 키: {파라미터: 후보 값 목록}} (생략하면 워크포워드 기본 탐색 범위)
+
+    Returns:
+        list: 작업 dict 목록 (strategy, params, ticker, start, end)
+    """
+    from Backtest_walkforward import LINKED_PARAMS, expand_grid
+
+    jobs = []
+    for key in strategies:
+        spec = get_spec(key)
+        for params, _, _ in expand_grid(key, (grids or {}).get(key)):
+            params = dict(params)
+            for algo_name, indicator_name in LINKED_PARAMS.get(key, {}).items():
+                if algo_name in params:
+                    params[indicator_name] = params[algo_name]  # 지표 파라미터도 같은 값으로
+            for ticker in tickers:
+                for start, end in windows or [(spec['start_date'], spec['end_date'])]:
+                    jobs.append({'strategy': key, 'params': params, 'ticker': ticker,
+                                 'start': start, 'end': end})
+    return jobs
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message, default=_json_default).encode('UTF-8') + b"\n")
+    stream.flush()
+
+
+def _receive(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("연결이 끊어졌습니다.")
+    return json.loads(line)
+
+
+def _json_default(value):
+    """NumPy 숫자, 날짜 등 JSON 기본형이 아닌 값을 바꿉니다."""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class SweepCoordinator:
+    """
+    작업 목록을 관리하는 코디네이터입니다. 작업을 빌려주고(lease), 결과를 받아 기록합니다.
+
+    Parameters:
+        jobs (list): build_jobs가 만든 작업 목록
+        results_path (str): 결과 파일 (JSON Lines, 이미 있으면 끝난 작업은 건너뜀)
+        lease_seconds (float): 작업자가 이 시간 안에 결과나 생존 신호를 보내지 않으면 다시 나눠 줌
+        max_attempts (int): 오류가 난 작업을 다시 시도하는 최대 횟수
+        token (str): 작업자가 보내야 하는 접속 암호 (생략하면 확인하지 않음)
+    """
+
+    def __init__(self, jobs, results_path=RESULTS_PATH, lease_seconds=600, max_attempts=3, token=None):
+        self.jobs = {}
+        for job in jobs:
+            self.jobs.setdefault(job_id(job), job)
+        self.results_path = results_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.token = token
+        self.lock = threading.Lock()
+        self.done = set()
+        self.failed = set()
+        self.attempts = {}
+        self.leases = {}           # id -> (작업자, 만료 시각)
+        self.worker_counts = {}    # 작업자별 완료 수
+        self.started = time.monotonic()
+        self.finished_event = threading.Event()
+
+        for record in read_results(results_path):
+            if 'error' not in record['row'] and record['id'] in self.jobs:
+                self.done.add(record['id'])
+        self.pending = deque(i for i in self.jobs if i not in self.done)
+        self.resumed = len(self.done)
+        if not self.pending:
+            self.finished_event.set()
+
+    def _expire_leases(self):
+        now = time.monotonic()
+        for i, (worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                print(f"{worker}의 작업 {i} 제한 시간 초과, 다시 나눠 줍니다.")
+                del self.leases[i]
+                self.pending.appendleft(i)
+
+    def next_job(self, worker):
+        """작업 하나를 빌려줍니다. 남은 작업이 없으면 None."""
+        with self.lock:
+            self._expire_leases()
+            if not self.pending:
+                return None
+            i = self.pending.popleft()
+            self.leases[i] = (worker, time.monotonic() + self.lease_seconds)
+            self.attempts[i] = self.attempts.get(i, 0) + 1
+            return i
+
+    def extend(self, worker, ids):
+        """작업자가 아직 실행 중인 작업의 제한 시간을 늘립니다."""
+        with self.lock:
+            deadline = time.monotonic() + self.lease_seconds
+            for i in ids:
+                if self.leases.get(i, (None,))[0] == worker:
+                    self.leases[i] = (worker, deadline)
+
+    def complete(self, worker, i, row):
+        """
+        결과를 기록합니다. 이미 끝난 작업의 결과는 무시하고,
+        오류가 난 작업은 max_attempts번이 될 때까지 다시 대기열에 넣습니다.
+        """
+        with self.lock:
+            if i not in self.jobs or i in self.done:
+                return
+            self.leases.pop(i, None)
+            if 'error' in row and self.attempts.get(i, 0) < self.max_attempts:
+                print(f"작업 {i} 오류 ({worker}, {self.attempts[i]}회째): {row['error']}")
+                if i not in self.pending:
+                    self.pending.append(i)
+                return
+            with open(self.results_path, "a", encoding="UTF-8") as f:
+                f.write(json.dumps({'id': i, 'job': self.jobs[i], 'row': row, 'worker': worker,
+                                    'attempts': self.attempts.get(i, 0)}, default=_json_default) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.done.add(i)
+            if 'error' in row:
+                self.failed.add(i)
+            self.worker_counts[worker] = self.worker_counts.get(worker, 0) + 1
+            if len(self.done) == len(self.jobs):
+                self.finished_event.set()
+
+    def release(self, worker):
+        """연결이 끊긴 작업자가 빌려 간 작업을 대기열 앞으로 돌려놓습니다."""
+        with self.lock:
+            returned = [i for i, (owner, _) in self.leases.items() if owner == worker]
+            for i in returned:
+                del self.leases[i]
+                self.pending.appendleft(i)
+            if returned:
+                print(f"{worker} 연결 끊김, 작업 {len(returned)}개를 다시 나눠 줍니다.")
+
+    def progress(self):
+        """진행 상황 한 줄"""
+        with self.lock:
+            total = len(self.jobs)
+            finished = len(self.done)
+            new = finished - self.resumed
+            elapsed = time.monotonic() - self.started
+            rate = new / elapsed if elapsed > 0 else 0.0
+            remaining = (total - finished) / rate if rate > 0 else float('nan')
+            workers = ", ".join(f"{w}={n}" for w, n in sorted(self.worker_counts.items()))
+            eta = str(datetime.timedelta(seconds=int(remaining))) if remaining == remaining else "?"
+            return (f"진행 {finished}/{total} ({finished / total * 100 if total else 100:.1f}%) "
+                    f"실패 {len(self.failed)} 실행 중 {len(self.leases)} | {rate:.2f}건/초 "
+                    f"남은 시간 {eta} | {workers}")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """작업자 연결 하나를 처리합니다. (요청 한 줄 -> 응답 한 줄)"""
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker = None
+        try:
+            hello = _receive(self.rfile)
+            if hello.get('op') != 'hello' or (coordinator.token and hello.get('token') != coordinator.token):
+                _send(self.wfile, {'op': 'error', 'msg': '접속 암호가 다릅니다.'})
+                return
+            worker = f"{hello.get('worker') or 'worker'}@{self.client_address[0]}:{self.client_address[1]}"
+            print(f"작업자 접속: {worker} (프로세스 {hello.get('slots')}개)")
+            _send(self.wfile, {'op': 'ok'})
+            while True:
+                message = _receive(self.rfile)
+                op = message.get('op')
+                if op == 'get':
+                    i = coordinator.next_job(worker)
+                    if i is not None:
+                        _send(self.wfile, {'op': 'job', 'id': i, 'job': coordinator.jobs[i]})
+                    elif coordinator.finished_event.is_set():
+                        _send(self.wfile, {'op': 'done'})
+                    else:
+                        _send(self.wfile, {'op': 'wait', 'seconds': WAIT_SECONDS})  # 다른 작업자가 실행 중
+                elif op == 'result':
+                    coordinator.complete(worker, message['id'], message['row'])
+                    _send(self.wfile, {'op': 'ok'})
+                elif op == 'heartbeat':
+                    coordinator.extend(worker, message.get('ids', []))
+                    _send(self.wfile, {'op': 'ok'})
+                else:
+                    _send(self.wfile, {'op': 'error', 'msg': f'알 수 없는 요청: {op}'})
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            if worker is not None:
+                coordinator.release(worker)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(jobs, host="0.0.0.0", port=DEFAULT_PORT, results_path=RESULTS_PATH, lease_seconds=600,
+          max_attempts=3, token=None, progress_interval=30):
+    """
+    코디네이터를 실행하고 모든 작업이 끝날 때까지 기다립니다.
+
+    Returns:
+        pandas.DataFrame: 결과표 (load_results와 같음)
+    """
+    coordinator = SweepCoordinator(jobs, results_path, lease_seconds, max_attempts, token)
+    print(f"작업 {len(coordinator.jobs)}개 (이미 끝난 작업 {coordinator.resumed}개), {host}:{port}에서 작업자를 기다립니다.")
+    with _Server((host, port), _Handler) as server:
+        server.coordinator = coordinator
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            while not coordinator.finished_event.wait(progress_interval):
+                print(coordinator.progress())
+            print(coordinator.progress())
+            time.sleep(WAIT_SECONDS + 1)  # 기다리던 작업자들도 다시 물어 'done'을 받고 끝낼 시간
+        finally:
+            server.shutdown()
+    return load_results(results_path, coordinator.jobs)
+
+
+def run_job(job, cache_dir=CACHE_DIR, store_dir=None):
+    """
+    작업 하나를 실행합니다. (작업자 프로세스에서 호출, 오류는 결과 행의 'error'로 기록)
+
+    Returns:
+        dict: 리더보드 한 행과 같은 성과지표 + 실행 시간(seconds)
+    """
+    from Backtest_leaderboard import evaluate_ticker
+
+    started = time.perf_counter()
+    row = evaluate_ticker(job['strategy'], job['ticker'], job['start'], job['end'], job['params'],
+                          cache_dir, store_dir)
+    row.pop('ticker', None)
+    row['seconds'] = time.perf_counter() - started
+    return row
+
+
+def _connect(host, port, retry_seconds):
+    """코디네이터가 늦게 뜰 수도 있으므로 retry_seconds 동안 다시 접속을 시도합니다."""
+    deadline = time.monotonic() + retry_seconds
+    while True:
+        try:
+            return socket.create_connection((host, port), timeout=None)
+        except OSError as e:
+            if time.monotonic() > deadline:
+                raise
+            print(f"코디네이터 접속 실패, 다시 시도합니다: {e}")
+            time.sleep(5)
+
+
+def run_worker(host, port=DEFAULT_PORT, workers=None, name=None, token=None, cache_dir=CACHE_DIR,
+               store_dir=None, heartbeat_seconds=60, retry_seconds=300):
+    """
+    코디네이터에 접속해 작업을 받아 여러 프로세스로 실행하고 결과를 보냅니다.
+    남은 작업이 없다는 응답을 받으면 실행 중인 작업을 마치고 끝납니다.
+
+    Parameters:
+        host (str): 코디네이터 주소
+        workers (int): 동시에 실행할 프로세스 수 (생략하면 CPU 코어 수)
+        name (str): 작업자 이름 (생략하면 컴퓨터 이름)
+        cache_dir (str): 데이터 캐시 폴더 (여러 컴퓨터가 공유하는 폴더 권장)
+        store_dir (str): 결과 저장소 폴더 (지정하면 이미 계산한 결과 재사용)
+        heartbeat_seconds (float): 실행 중인 작업의 생존 신호 간격
+
+    Returns:
+        int: 처리한 작업 수
+    """
+    workers = workers or os.cpu_count() or 1
+    name = name or socket.gethostname()
+    sock = _connect(host, port, retry_seconds)
+    stream = sock.makefile('rwb')
+    _send(stream, {'op': 'hello', 'worker': name, 'token': token, 'slots': workers})
+    reply = _receive(stream)
+    if reply.get('op') != 'ok':
+        raise ConnectionError(reply.get('msg', '코디네이터가 접속을 거부했습니다.'))
+    print(f"{host}:{port}에 접속했습니다. 프로세스 {workers}개로 실행합니다.")
+
+    processed = 0
+    running = {}
+    no_more = False
+    last_beat = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            while running or not no_more:
+                idle_wait = 0
+                while not no_more and len(running) < workers:
+                    _send(stream, {'op': 'get'})
+                    reply = _receive(stream)
+                    if reply['op'] == 'job':
+                        running[pool.submit(run_job, reply['job'], cache_dir, store_dir)] = reply['id']
+                    elif reply['op'] == 'wait':
+                        idle_wait = reply.get('seconds', WAIT_SECONDS)
+                        break
+                    else:
+                        no_more = True
+
+                if not running:
+                    time.sleep(idle_wait)
+                    last_beat = time.monotonic()
+                    continue
+                timeout = max(0, last_beat + heartbeat_seconds - time.monotonic())
+                finished, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = running.pop(future)
+                    try:
+                        row = future.result()
+                    except Exception as e:  # 작업 프로세스가 죽은 경우 등
+                        row = {'error': f"{type(e).__name__}: {e}"}
+                    _send(stream, {'op': 'result', 'id': i, 'row': row})
+                    _receive(stream)
+                    processed += 1
+                # 작업이 계속 끝나더라도 오래 걸리는 작업의 생존 신호는 주기마다 보냄
+                if running and time.monotonic() - last_beat >= heartbeat_seconds:
+                    _send(stream, {'op': 'heartbeat', 'ids': list(running.values())})
+                    _receive(stream)
+                    last_beat = time.monotonic()
+        except ConnectionError:
+            # 코디네이터가 끝났거나 멈춤 (보내지 못한 결과는 코디네이터를 다시 시작하면 다시 나눠 줌)
+            print("코디네이터와 연결이 끊어졌습니다.")
+            for future in running:
+                future.cancel()
+        finally:
+            stream.close()
+            sock.close()
+    print(f"작업 {processed}개를 처리했습니다.")
+    return processed
+
+
+def read_results(path=RESULTS_PATH):
+    """결과 파일의 기록 목록 (마지막 줄이 깨져 있으면 건너뜀)"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="UTF-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def load_results(path=RESULTS_PATH, jobs=None):
+    """
+    결과 파일을 작업 정보와 성과지표가 합쳐진 표로 읽습니다.
+
+    Parameters:
+        jobs (dict): {id: 작업} (지정하면 이 작업들의 결과만)
+
+    Returns:
+        pandas.DataFrame: 작업별 한 행 (strategy, params, ticker, start, end, 성과지표...)
+    """
+    rows = {}
+    for record in read_results(path):
+        if jobs is not None and record['id'] not in jobs:
+            continue
+        if record['id'] in rows and 'error' in record['row']:
+            continue  # 성공한 결과가 있으면 그것을 사용
+        job = record['job']
+        rows[record['id']] = dict(strategy=job['strategy'], params=json.dumps(job['params'], sort_keys=True),
+                                  ticker=job['ticker'], start=job['start'], end=job['end'],
+                                  worker=record['worker'], **record['row'])
+    return pd.DataFrame(list(rows.values()))
+
+
+def _parse_window(text):
+    """'시작일:종료일' -> (시작일, 종료일)"""
+    start, end = text.split(':', 1)
+    return start, end
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='여러 컴퓨터로 나누어 실행하는 백테스트 스윕')
+    sub = parser.add_subparsers(dest='mode', required=True)
+
+    server = sub.add_parser('serve', help='코디네이터 실행')
+    server.add_argument('strategies', nargs='+', choices=sorted(STRATEGIES), help='전략 키')
+    server.add_argument('--tickers', nargs='*', default=[], help='종목 티커 목록')
+    server.add_argument('--tickers-file', help='한 줄에 티커 하나씩 적힌 파일')
+    server.add_argument('--window', action='append', type=_parse_window,
+                        help='백테스트 기간 (예: 2018-01-01:2021-01-01, 여러 번 지정 가능)')
+    server.add_argument('--grid', action='append', help='탐색 범위 (전략이 하나일 때, 예: rsi_upper=65,70,75)')
+    server.add_argument('--host', default='0.0.0.0', help='접속을 받을 주소')
+    server.add_argument('--port', type=int, default=DEFAULT_PORT, help='포트')
+    server.add_argument('--token', help='작업자 접속 암호')
+    server.add_argument('--results', default=RESULTS_PATH, help='결과 파일 (JSON Lines)')
+    server.add_argument('--lease', type=float, default=600, help='작업 제한 시간(초)')
+    server.add_argument('--attempts', type=int, default=3, help='오류 작업 최대 시도 횟수')
+    server.add_argument('--prefetch', action='store_true', help='시작 전에 데이터 캐시를 채움 (공유 폴더)')
+    server.add_argument('--cache-dir', default=CACHE_DIR, help='데이터 캐시 폴더 (--prefetch용)')
+    server.add_argument('--output', help='결과표를 저장할 CSV 파일')
+
+    worker = sub.add_parser('work', help='작업자 실행')
+    worker.add_argument('host', help='코디네이터 주소')
+    worker.add_argument('--port', type=int, default=DEFAULT_PORT, help='포트')
+    worker.add_argument('--token', help='접속 암호')
+    worker.add_argument('--workers', type=int, help='동시에 실행할 프로세스 수')
+    worker.add_argument('--name', help='작업자 이름')
+    worker.add_argument('--cache-dir', default=CACHE_DIR, help='데이터 캐시 폴더 (공유 폴더 권장)')
+    worker.add_argument('--store', help='결과 저장소 폴더 (이미 계산한 결과 재사용)')
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        from Backtest_walkforward import _parse_grid
+
+        tickers = list(args.tickers)
+        if args.tickers_file:
+            tickers += read_tickers(args.tickers_file)
+        grids = None
+        if args.grid:
+            if len(args.strategies) != 1:
+                parser.error('--grid는 전략을 하나만 지정할 때 사용할 수 있습니다.')
+            grids = {args.strategies[0]: _parse_grid(args.grid)}
+        if not tickers:
+            tickers = sorted({get_spec(key)['ticker'] for key in args.strategies})
+        jobs = build_jobs(args.strategies, tickers, args.window, grids)
+
+        if args.prefetch:
+            from Data_cache import load_universe
+            windows = args.window or [(get_spec(k)['start_date'], get_spec(k)['end_date']) for k in args.strategies]
+            for start, end in sorted(set(windows)):
+                load_universe(tickers, start, end, args.cache_dir)
+
+        table = serve(jobs, args.host, args.port, args.results, args.lease, args.attempts, args.token)
+        if 'excess_cagr' in table.columns:
+            print("\n===== 전략별 상위 결과 (excess_cagr) =====")
+            top = table.sort_values('excess_cagr', ascending=False).groupby('strategy').head(5)
+            print(top[['strategy', 'params', 'ticker', 'start', 'end', 'cagr', 'excess_cagr']].to_string(index=False))
+        if args.output:
+            table.to_csv(args.output, index=False)
+            print(f"\n결과를 {args.output}에 저장했습니다.")
+    else:
+        try:
+            run_worker(args.host, args.port, args.workers, args.name, args.token, args.cache_dir, args.store)
+        except KeyboardInterrupt:
+            print("작업자를 종료합니다. 실행 중이던 작업은 코디네이터가 다시 나눠 줍니다.")
@@ -0,0 +1,324 @@
+# StockTrade24.com
+# 증분 야간 백테스트
+#
+# 매일 밤 전체 기간(2018년~오늘)을 처음부터 다시 백테스트하지 않고,
+# 지난 실행의 종료 상태(보유 수량, 현금, 평가금액 곡선, 지표 상태, 마지막 리밸런싱일)를
+# 체크포인트 파일로 저장해 두었다가 새로 추가된 날짜만 이어서 계산합니다.
+#
+# - 단일종목 전략: 스크립트의 지표 함수와 bt.Algo를 그대로 사용합니다.
+#   지표 상태는 최근 tail_bars개 OHLCV로 보관하고, 새 날짜와 합쳐 지표를 다시 계산합니다.
+# - 포트폴리오: Backtest_allocation의 리밸런싱 시뮬레이터를 이어서 실행합니다.
+# - 설정이 바뀌었거나 과거 가격이 수정된 경우(배당 조정 등)에는 자동으로 처음부터 다시 계산합니다.
+#
+# 사용법:
+#   python Backtest_incremental.py                 # 모든 전략/포트폴리오 갱신
+#   python Backtest_incremental.py --full          # 체크포인트 무시하고 처음부터 계산
+#   python Backtest_incremental.py --strategies rsi sma --portfolios allweather
+
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from Backtest_allocation import COMMISSIONS, _prepare, simulate_allocation_array
+from Backtest_stats import calculate_stats
+from Backtest_strategies import (PORTFOLIOS, STRATEGIES, get_portfolio_spec, get_spec,
+                                 load_portfolio_prices, load_strategy_module, portfolio_weights,
+                                 prepare_data, split_params)
+from Data_cache import CACHE_DIR, _safe_name, load_ohlcv
+
+CHECKPOINT_DIR = "checkpoints"  # 체크포인트 저장 폴더
+
+# 야간 리포트에 표시할 지표
+REPORT_STATS = ['total_return', 'cagr', 'daily_sharpe', 'max_drawdown']
+
+
+class _Target:
+    """bt.Strategy 대신 전략 Algo에 넘기는 최소한의 대상 객체 (now, universe, temp)"""
+
+    def __init__(self, now, universe):
+        self.now = now
+        self.universe = universe
+        self.temp = {}
+
+
+def _checkpoint_path(name, checkpoint_dir):
+    return os.path.join(checkpoint_dir, f"{_safe_name(name)}.pkl")
+
+
+def load_checkpoint(name, checkpoint_dir=CHECKPOINT_DIR):
+    """저장된 체크포인트를 읽습니다. 없거나 읽을 수 없으면 None을 반환합니다."""
+    path = _checkpoint_path(name, checkpoint_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"{name}: 체크포인트를 읽을 수 없어 처음부터 계산합니다 ({e})")
+        return None
+
+
+def save_checkpoint(name, checkpoint, checkpoint_dir=CHECKPOINT_DIR):
+    """체크포인트를 저장합니다. 저장 도중 중단되어도 기존 파일이 깨지지 않도록 합니다."""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = _checkpoint_path(name, checkpoint_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _is_valid(checkpoint, config, last_prices):
+    """
+    체크포인트를 이어서 쓸 수 있는지 확인합니다.
+    설정이 같고, 체크포인트 마지막 날의 가격이 지금 데이터와 같아야 합니다.
+
+    Parameters:
+        last_prices (numpy.ndarray 또는 None): 현재 데이터에서 체크포인트 마지막 날의 가격
+    """
+    if checkpoint is None or checkpoint.get('config') != config:
+        return False
+    if last_prices is None:
+        return False  # 체크포인트 마지막 날이 현재 데이터에 없음
+    return np.allclose(last_prices, checkpoint['last_prices'], rtol=1e-6, atol=0)
+
+
+def advance_signal(algo, data, new_bars, shares, cash):
+    """
+    전략 Algo를 새 날짜들의 종가에 차례로 실행하고 평가금액을 계산합니다.
+    목표 비중이 나오면 그 종가로 비중을 맞춥니다. (소수점 주식 수 기준)
+
+    Parameters:
+        algo (bt.Algo): 전략 Algo (이전 포지션 등 상태를 그대로 이어서 사용)
+        data (pandas.DataFrame): 새 날짜를 포함하는 지표 데이터 (prepare_data 결과)
+        new_bars (pandas.DataFrame): 계산할 새 날짜의 OHLCV 데이터
+        shares (float): 시작 보유 수량
+        cash (float): 시작 현금
+
+    Returns:
+        tuple: (날짜별 평가금액 numpy.ndarray, 보유 수량, 현금)
+    """
+    algo.data = data
+    universe = data[['Close']]
+    closes = new_bars['Close'].to_numpy(dtype=float)
+    values = np.empty(len(new_bars))
+    for i, now in enumerate(new_bars.index):
+        price = closes[i]
+        value = cash + shares * price
+        target = _Target(now, universe)
+        if algo(target) and 'weights' in target.temp:
+            shares = float(target.temp['weights'].iloc[0]) * value / price
+            cash = value - shares * price
+        values[i] = value
+    algo.data = None  # 지표 데이터는 체크포인트에 넣지 않습니다
+    return values, shares, cash
+
+
+def update_signal_backtest(key, ohlcv, checkpoint=None, params=None,
+                           initial_capital=1000000.0, tail_bars=500):
+    """
+    단일종목 전략 백테스트를 체크포인트 이후의 새 날짜만 계산해 갱신합니다.
+    매일 종가에 전략 Algo를 실행하고, 목표 비중이 나오면 그 종가로 비중을 맞춥니다.
+    (소수점 주식 수 기준, bt와 같이 스크립트의 trade_commission은 반영하지 않음)
+
+    사용법: equity, checkpoint = update_signal_backtest('rsi', ohlcv, checkpoint)
+
+    Parameters:
+        key (str): 전략 키 ('rsi', 'macd', 'bollinger', 'sma', 'volmomen')
+        ohlcv (pandas.DataFrame): 전체 기간 OHLCV 데이터
+        checkpoint (dict): 이전 실행의 체크포인트 (None이면 처음부터 계산)
+        params (dict): 전략/지표 파라미터 변경값
+        initial_capital (float): 초기 투자금
+        tail_bars (int): 지표 상태로 보관할 최근 OHLCV 개수 (가장 긴 지표 기간보다 충분히 길게)
+
+    Returns:
+        tuple: (평가금액 pandas.Series, 새 체크포인트 dict)
+    """
+    spec = get_spec(key)
+    indicator_params, algo_params = split_params(key, params)
+    config = {'key': key, 'params': dict(params or {}),
+              'initial_capital': initial_capital, 'tail_bars': tail_bars}
+
+    ohlcv = ohlcv.sort_index()
+    last_prices = None
+    if checkpoint is not None and checkpoint['last_date'] in ohlcv.index:
+        last_prices = ohlcv.loc[[checkpoint['last_date']], 'Close'].to_numpy()
+
+    if _is_valid(checkpoint, config, last_prices):
+        new_bars = ohlcv[ohlcv.index > checkpoint['last_date']]
+        history = pd.concat([checkpoint['tail'], new_bars])  # 지표 계산에 필요한 과거 구간 + 새 날짜
+        algo = checkpoint['algo']
+        shares, cash = checkpoint['shares'], checkpoint['cash']
+        equity = checkpoint['equity']
+    else:
+        new_bars = history = ohlcv
+        algo = getattr(load_strategy_module(key), spec['algo'])(**algo_params)
+        shares, cash = 0.0, float(initial_capital)
+        equity = pd.Series(dtype=float, name=spec['name'])
+
+    if len(new_bars):
+        data = prepare_data(key, history, **indicator_params)
+        values, shares, cash = advance_signal(algo, data, new_bars, shares, cash)
+        equity = pd.concat([equity, pd.Series(values, index=new_bars.index, name=spec['name'])])
+
+    new_checkpoint = {
+        'config': config,
+        'algo': algo,
+        'shares': shares,
+        'cash': cash,
+        'equity': equity,
+        'tail': ohlcv.iloc[-tail_bars:],
+        'last_date': ohlcv.index[-1],
+        'last_prices': ohlcv['Close'].to_numpy()[-1:],
+        'new_bars': len(new_bars),
+    }
+    return equity, new_checkpoint
+
+
+def update_allocation_backtest(name, prices, weights, commission_key, checkpoint=None,
+                               rebalance='quarterly', initial_capital=1000000.0):
+    """
+    고정 비중 포트폴리오 백테스트를 체크포인트 이후의 새 날짜만 계산해 갱신합니다.
+
+    사용법: equity, checkpoint = update_allocation_backtest('US ETF Portfolio', data, us_weights, 'US')
+
+    Parameters:
+        name (str): 포트폴리오 이름
+        prices (pandas.DataFrame): 전체 기간 가격 데이터 (download_data 결과 등)
+        weights (pandas.Series): 목표 비중
+        commission_key (str): COMMISSIONS 키 ('US' 또는 'KR')
+        checkpoint (dict): 이전 실행의 체크포인트 (None이면 처음부터 계산)
+        rebalance (str): 'quarterly', 'monthly', 'threshold' 중 하나
+        initial_capital (float): 초기 투자금
+
+    Returns:
+        tuple: (평가금액 pandas.Series, 새 체크포인트 dict)
+    """
+    config = {'weights': weights.to_dict(), 'commission': commission_key,
+              'rebalance': rebalance, 'initial_capital': initial_capital,
+              'dates': 'exchange'}  # 거래소 달력 기준 날짜 (이전의 두 시장 합집합 체크포인트는 다시 계산)
+    panel, w, _ = _prepare(prices, weights)
+
+    last_prices = None
+    if checkpoint is not None and checkpoint['last_date'] in panel.index:
+        last_prices = panel.loc[checkpoint['last_date']].to_numpy(dtype=float)
+
+    if _is_valid(checkpoint, config, last_prices):
+        new_rows = panel[panel.index > checkpoint['last_date']]
+        state = checkpoint['state']
+        equity = checkpoint['equity']
+    else:
+        new_rows = panel
+        state = None
+        equity = pd.Series(dtype=float, name=name)
+
+    values, state = simulate_allocation_array(new_rows.to_numpy(dtype=float), new_rows.index, w,
+                                              rebalance, commission=COMMISSIONS[commission_key],
+                                              initial_capital=initial_capital, state=state)
+    if len(new_rows):
+        equity = pd.concat([equity, pd.Series(values[:, 0], index=new_rows.index, name=name)])
+
+    new_checkpoint = {
+        'config': config,
+        'state': state,
+        'equity': equity,
+        'last_date': panel.index[-1],
+        'last_prices': panel.iloc[-1].to_numpy(dtype=float),
+        'new_bars': len(new_rows),
+    }
+    return equity, new_checkpoint
+
+
+def _run_job(name, update, checkpoint_dir, full):
+    """체크포인트를 읽어 갱신 함수를 실행하고 리포트 한 행을 만듭니다."""
+    row = {'name': name}
+    try:
+        checkpoint = None if full else load_checkpoint(name, checkpoint_dir)
+        start = time.perf_counter()
+        equity, checkpoint = update(checkpoint)
+        row['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        save_checkpoint(name, checkpoint, checkpoint_dir)
+
+        row['last_date'] = equity.index[-1].strftime("%Y-%m-%d")
+        row['new_bars'] = checkpoint['new_bars']
+        stats = calculate_stats(equity.to_frame(name))
+        for col in REPORT_STATS:
+            row[col] = stats.iloc[0][col]
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def run_nightly(strategies=None, portfolios=None, checkpoint_dir=CHECKPOINT_DIR,
+                cache_dir=CACHE_DIR, full=False):
+    """
+    모든 전략과 포트폴리오를 오늘까지 갱신하고 야간 리포트를 만드는 함수입니다.
+
+    Parameters:
+        strategies (list): 갱신할 전략 키 (생략하면 전체)
+        portfolios (list): 갱신할 포트폴리오 키 (생략하면 전체)
+        checkpoint_dir (str): 체크포인트 저장 폴더
+        cache_dir (str): 데이터 캐시 폴더
+        full (bool): True면 체크포인트를 무시하고 처음부터 계산
+
+    Returns:
+        pandas.DataFrame: 전략/포트폴리오별 리포트
+    """
+    end_date = (pd.Timestamp.now() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    rows = []
+
+    for key in (STRATEGIES if strategies is None else strategies):
+        spec = get_spec(key)
+        try:
+            ohlcv = load_ohlcv(spec['ticker'], spec['start_date'], end_date, cache_dir)
+        except Exception as e:
+            rows.append({'name': spec['name'], 'error': str(e)})
+            continue
+        rows.append(_run_job(spec['name'],
+                             lambda checkpoint: update_signal_backtest(key, ohlcv, checkpoint),
+                             checkpoint_dir, full))
+
+    for key in (PORTFOLIOS if portfolios is None else portfolios):
+        spec = get_portfolio_spec(key)
+        try:
+            # 시장마다 자기 거래소 거래일만 사용합니다 (상대 시장 휴장일 행 없음)
+            prices = {market: load_portfolio_prices(key, end_date=end_date, cache_dir=cache_dir,
+                                                    market=market)
+                      for market in spec['names']}
+            weights = portfolio_weights(key)
+        except Exception as e:
+            rows.append({'name': key, 'error': str(e)})
+            continue
+        for market, name in spec['names'].items():
+            rows.append(_run_job(name,
+                                 lambda checkpoint: update_allocation_backtest(
+                                     name, prices[market], weights[market], market, checkpoint),
+                                 checkpoint_dir, full))
+
+    report = pd.DataFrame(rows).set_index('name')
+    if 'error' in report.columns:
+        failed = report['error'].notna()
+        if failed.any():
+            print(f"\n{failed.sum()}개 항목에서 오류가 발생했습니다:")
+            print(report.loc[failed, 'error'])
+        report = report[~failed].drop(columns='error')
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='증분 야간 백테스트')
+    parser.add_argument('--strategies', nargs='*', choices=sorted(STRATEGIES), help='갱신할 전략 키')
+    parser.add_argument('--portfolios', nargs='*', choices=sorted(PORTFOLIOS), help='갱신할 포트폴리오 키')
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR, help='체크포인트 저장 폴더')
+    parser.add_argument('--full', action='store_true', help='체크포인트를 무시하고 처음부터 계산')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = run_nightly(args.strategies, args.portfolios, args.checkpoint_dir, full=args.full)
+    print("\n===== 야간 백테스트 리포트 =====")
+    print(report.round(4).to_string())
+    print(f"\n총 소요 시간: {time.perf_counter() - start:.2f}초")
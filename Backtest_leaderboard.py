@@ -0,0 +1,183 @@
+# StockTrade24.com
+# 단일종목 전략 유니버스 리더보드
+#
+# Strategy_1~5의 전략을 여러 종목(예: 코스피200 전 종목)에 동시에 적용하고,
+# 종목별 매수후 보유 대비 성과를 순위표로 정리합니다.
+# 데이터는 먼저 로컬 캐시에 한 번만 내려받아 공유 메모리 패널에 올리고,
+# 백테스트는 여러 프로세스가 그 패널을 복사 없이 읽으며 병렬로 실행합니다.
+#
+# 사용법:
+#   python Backtest_leaderboard.py rsi --tickers TQQQ QQQ SPY
+#   python Backtest_leaderboard.py sma --tickers-file kospi200.txt --workers 8 --output sma.csv
+#   python Backtest_leaderboard.py rsi --tickers TQQQ --param rsi_upper=75 --param rsi_lower=25
+#   python Backtest_leaderboard.py rsi --tickers-file kospi200.txt --store results   # 이미 계산한 종목은 건너뜀
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from Backtest_stats import calculate_stats
+from Backtest_strategies import STRATEGIES, get_spec, run_strategy, split_params
+from Data_cache import CACHE_DIR, load_ohlcv, load_universe, read_tickers
+from Price_panel import SharedPricePanel, attach_panel, panel_from_universe, ticker_view
+from Result_store import ResultStore
+
+# 리더보드에 표시할 지표
+LEADERBOARD_STATS = ['total_return', 'cagr', 'daily_vol', 'daily_sharpe', 'max_drawdown', 'calmar']
+# 리더보드 한 행의 컬럼 (모든 종목이 실패해도 같은 컬럼의 빈 표를 돌려주기 위해 사용)
+ROW_COLUMNS = (['ticker'] + LEADERBOARD_STATS + [f'bh_{col}' for col in LEADERBOARD_STATS]
+               + ['excess_cagr', 'excess_sharpe', 'bars', 'error'])
+
+_PANEL = None  # 작업 프로세스가 붙어 있는 공유 가격 패널
+_STORES = {}  # 프로세스별로 열어 둔 결과 저장소
+
+
+def evaluate_ticker(key, ticker, start_date, end_date, params=None, cache_dir=CACHE_DIR, store_dir=None):
+    """
+    한 종목에 전략을 적용하고 전략/매수후 보유 지표를 한 행으로 정리합니다.
+    오류가 나도 전체 배치가 멈추지 않도록 오류 내용을 행에 기록합니다.
+    store_dir을 지정하면 같은 조건의 결과가 저장되어 있을 때 다시 계산하지 않습니다.
+
+    Returns:
+        dict: 리더보드 한 행
+    """
+    row = {'ticker': ticker}
+    try:
+        if _PANEL is not None and ticker in _PANEL.columns.get_level_values(0):
+            ohlcv = ticker_view(_PANEL, ticker)
+        else:
+            ohlcv = load_ohlcv(ticker, start_date, end_date, cache_dir)
+        store = None
+        if store_dir is not None:
+            if store_dir not in _STORES:
+                _STORES[store_dir] = ResultStore(store_dir)
+            store = _STORES[store_dir]
+        results = run_strategy(key, ohlcv, params, store)
+        stats = calculate_stats(results.prices)
+        strategy_stats, hold_stats = stats.iloc[0], stats.iloc[1]
+
+        for col in LEADERBOARD_STATS:
+            row[col] = strategy_stats[col]
+        for col in LEADERBOARD_STATS:
+            row[f'bh_{col}'] = hold_stats[col]
+        row['excess_cagr'] = strategy_stats['cagr'] - hold_stats['cagr']
+        row['excess_sharpe'] = strategy_stats['daily_sharpe'] - hold_stats['daily_sharpe']
+        row['bars'] = len(ohlcv)
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def _init_worker(handle):
+    """작업 프로세스 시작 시 공유 가격 패널에 한 번만 붙습니다."""
+    global _PANEL
+    _PANEL = attach_panel(handle)
+
+
+def _evaluate_job(job):
+    """프로세스 풀에서 호출되는 작업 함수 (pickle 가능하도록 모듈 최상위에 둡니다)"""
+    return evaluate_ticker(*job)
+
+
+def build_leaderboard(key, tickers, start_date=None, end_date=None, params=None,
+                      workers=None, sort_by='excess_cagr', cache_dir=CACHE_DIR, dtype='float64',
+                      store_dir=None):
+    """
+    여러 종목에 전략을 병렬로 적용하고 순위표를 만드는 함수입니다.
+
+    사용법: board = build_leaderboard('rsi', ['TQQQ', 'QQQ', 'SPY'])
+
+    Parameters:
+        key (str): 전략 키 ('rsi', 'macd', 'bollinger', 'sma', 'volmomen')
+        tickers (list): 종목 티커 목록
+        start_date (str): 시작일 (생략하면 스크립트 기본값)
+        end_date (str): 종료일 (생략하면 스크립트 기본값)
+        params (dict): 전략/지표 파라미터 변경값
+        workers (int): 병렬 프로세스 수 (생략하면 CPU 코어 수)
+        sort_by (str): 순위 기준 컬럼
+        cache_dir (str): 데이터 캐시 폴더
+        dtype (str): 공유 패널 자료형 ('float32'로 메모리 절반 절약)
+        store_dir (str): 결과 저장소 폴더 (지정하면 이미 계산한 결과는 다시 계산하지 않음)
+
+    Returns:
+        pandas.DataFrame: 종목별 성과 순위표
+    """
+    spec = get_spec(key)
+    start_date = start_date or spec['start_date']
+    end_date = end_date or spec['end_date']
+    split_params(key, params)  # 잘못된 파라미터 이름은 작업 시작 전에 알려줍니다
+
+    # 데이터는 부모 프로세스에서 한 번만 내려받아 캐시에 저장합니다
+    print(f"Preparing data for {len(tickers)} tickers...")
+    universe = load_universe(tickers, start_date, end_date, cache_dir)
+
+    jobs = [(key, ticker, start_date, end_date, params, cache_dir, store_dir) for ticker in tickers]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or not universe:
+        rows = [_evaluate_job(job) for job in jobs]
+    else:
+        # 전 종목 OHLCV를 공유 메모리에 한 번만 올리고 작업 프로세스는 여기에 붙어서 읽습니다
+        with SharedPricePanel(panel_from_universe(universe), dtype=dtype) as panel:
+            del universe
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(panel.handle,)) as pool:
+                chunksize = max(1, len(jobs) // (workers * 4))
+                rows = list(pool.map(_evaluate_job, jobs, chunksize=chunksize))
+
+    board = pd.DataFrame(rows).reindex(columns=ROW_COLUMNS).set_index('ticker')
+    failed = board['error'].notna()
+    if failed.any():
+        print(f"\n{failed.sum()}개 종목에서 오류가 발생했습니다:")
+        print(board.loc[failed, 'error'])
+    board = board[~failed].drop(columns='error')
+
+    board = board.sort_values(sort_by, ascending=False)
+    board.insert(0, 'rank', range(1, len(board) + 1))
+    return board
+
+
+def _parse_params(items):
+    """'이름=값' 형식의 파라미터 목록을 dict로 바꿉니다."""
+    params = {}
+    for item in items or []:
+        name, value = item.split('=', 1)
+        try:
+            value = int(value)
+        except ValueError:
+            value = float(value)
+        params[name] = value
+    return params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='단일종목 전략 유니버스 리더보드')
+    parser.add_argument('strategy', choices=sorted(STRATEGIES), help='전략 키')
+    parser.add_argument('--tickers', nargs='*', default=[], help='종목 티커 목록')
+    parser.add_argument('--tickers-file', help='한 줄에 티커 하나씩 적힌 파일')
+    parser.add_argument('--start', help='시작일 (기본: 스크립트 설정값)')
+    parser.add_argument('--end', help='종료일 (기본: 스크립트 설정값)')
+    parser.add_argument('--param', action='append', help='파라미터 변경 (예: rsi_upper=75)')
+    parser.add_argument('--workers', type=int, help='병렬 프로세스 수')
+    parser.add_argument('--sort-by', default='excess_cagr', help='순위 기준 컬럼')
+    parser.add_argument('--float32', action='store_true', help='공유 패널을 float32로 저장 (메모리 절약)')
+    parser.add_argument('--output', help='결과를 저장할 CSV 파일')
+    parser.add_argument('--store', help='결과 저장소 폴더 (이미 계산한 결과 재사용)')
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        tickers += read_tickers(args.tickers_file)
+    if not tickers:
+        tickers = [get_spec(args.strategy)['ticker']]
+
+    board = build_leaderboard(args.strategy, tickers, args.start, args.end,
+                              _parse_params(args.param), args.workers, args.sort_by,
+                              dtype='float32' if args.float32 else 'float64', store_dir=args.store)
+
+    print(f"\n===== {get_spec(args.strategy)['name']} 리더보드 =====")
+    print(board.round(4).to_string())
+    if args.output:
+        board.to_csv(args.output)
+        print(f"\n결과를 {args.output}에 저장했습니다.")
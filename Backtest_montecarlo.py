@@ -0,0 +1,232 @@
+# StockTrade24.com
+# 블록 부트스트랩 몬테카를로 강건성 분석
+#
+# results.stats와 calculate_annual_returns는 실제로 지나온 한 가지 경로의 성과만 보여줍니다.
+# 이 모듈은 전략(또는 포트폴리오)의 일간 수익률을 블록 단위로 다시 뽑아 이어 붙여
+# 수만 개의 가상 경로를 만들고, 경로별 CAGR, 최대낙폭, 샤프비율의 분포를 계산합니다.
+# - 블록으로 뽑으므로 변동성 군집, 연속 하락 같은 수익률의 시간 구조가 블록 길이만큼 유지됩니다.
+# - 여러 전략을 넘기면 모든 전략이 같은 날짜 블록을 쓰므로(전략 간 상관관계 유지)
+#   "전략이 매수후 보유를 이긴 경로의 비율" 같은 비교가 가능합니다.
+# - 경로 전체를 한 번에 만들지 않고 메모리 한도(max_memory_mb)에 맞는 묶음씩 NumPy로 계산합니다.
+#   (10,000 경로 x 2,000일도 몇 초 안에 끝납니다)
+#
+# 사용법:
+#   samples = bootstrap_stats(results.prices, n_paths=10000, block_size=20, seed=1)
+#   print(summarize_distribution(samples, historical=calculate_stats(results.prices)))
+#
+#   python Backtest_montecarlo.py rsi --paths 10000 --block 20
+#   python Backtest_montecarlo.py allweather --paths 20000 --method circular --output allweather_mc.csv
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from Backtest_stats import TRADING_DAYS
+
+MC_STATS = ['total_return', 'cagr', 'daily_vol', 'daily_sharpe', 'max_drawdown', 'calmar']
+METHODS = ('stationary', 'circular')
+
+
+def _daily_returns(prices):
+    """자산곡선 -> 모든 전략에 값이 있는 날의 일간 수익률 행렬 (날짜 x 전략)"""
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame()
+    returns = prices.astype(float).pct_change().iloc[1:].dropna(how='any')
+    if len(returns) < 2:
+        raise ValueError("부트스트랩할 일간 수익률이 부족합니다.")
+    return returns
+
+
+def _block_indices(rng, n_rows, n_paths, n_days, block_size, method):
+    """
+    부트스트랩 경로의 날짜 위치 (n_paths x n_days). 끝에 닿으면 처음으로 이어집니다(원형).
+
+    circular  : 길이 block_size인 블록을 무작위 위치에서 뽑아 이어 붙임
+    stationary: 날마다 1/block_size 확률로 새 블록을 시작 (블록 길이가 기하분포, 평균 block_size)
+    """
+    if method == 'circular':
+        n_blocks = -(-n_days // block_size)
+        starts = rng.integers(0, n_rows, size=(n_paths, n_blocks, 1), dtype=np.int32)
+        offsets = np.arange(block_size, dtype=np.int32)
+        return ((starts + offsets) % n_rows).reshape(n_paths, -1)[:, :n_days]
+
+    # 새 블록이 시작되는 날에 무작위 시작 위치에서 그날까지의 거리를 빼 두고 앞으로 채우면
+    # 블록 안에서는 (시작 위치 + 블록 안 날짜 수)가 됩니다
+    days = np.arange(n_days, dtype=np.int32)
+    new_block = rng.random((n_paths, n_days)) < 1.0 / block_size
+    new_block[:, 0] = True
+    rows, cols = np.nonzero(new_block)
+    block_of_day = np.zeros((n_paths, n_days), dtype=np.int32)
+    block_of_day[rows, cols] = np.arange(1, len(rows) + 1, dtype=np.int32)
+    np.maximum.accumulate(block_of_day, axis=1, out=block_of_day)
+    shift = np.empty(len(rows) + 1, dtype=np.int32)
+    shift[1:] = rng.integers(0, n_rows, size=len(rows), dtype=np.int32) - cols
+    index = shift[block_of_day]
+    index += days
+    index %= n_rows
+    return index
+
+
+def _path_stats(log_returns, simple_returns, annualization_factor):
+    """
+    경로 묶음의 성과지표를 계산합니다. (전략 하나)
+
+    Parameters:
+        log_returns (numpy.ndarray): 로그수익률 (경로 x 일)
+        simple_returns (numpy.ndarray): 단순 수익률 (경로 x 일)
+
+    Returns:
+        dict: 지표 이름 -> 경로별 배열
+    """
+    n_days = log_returns.shape[1]
+    growth = np.cumsum(log_returns, axis=1, out=log_returns)  # 로그수익률은 더 쓰지 않으므로 그 자리에 누적
+    total_log = growth[:, -1].copy()
+
+    # 최대낙폭: 시작 평가금액(로그 0)을 포함한 직전 최고점 대비 하락
+    peak = np.maximum(growth, 0.0)
+    np.maximum.accumulate(peak, axis=1, out=peak)
+    np.subtract(growth, peak, out=peak)
+    max_drawdown = np.expm1(peak.min(axis=1))
+
+    mean = simple_returns.mean(axis=1)
+    std = simple_returns.std(axis=1, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        cagr = np.expm1(total_log * annualization_factor / n_days)
+        sharpe = np.where(std > 0, mean / std, np.nan) * np.sqrt(annualization_factor)
+        calmar = cagr / np.abs(max_drawdown)
+    return {
+        'total_return': np.expm1(total_log),
+        'cagr': cagr,
+        'daily_vol': std * np.sqrt(annualization_factor),
+        'daily_sharpe': sharpe,
+        'max_drawdown': max_drawdown,
+        'calmar': calmar,
+    }
+
+
+def bootstrap_stats(prices, n_paths=10000, n_days=None, block_size=20, method='stationary', seed=None,
+                    max_memory_mb=256, annualization_factor=TRADING_DAYS):
+    """
+    자산곡선의 일간 수익률을 블록 부트스트랩해 경로별 성과지표를 계산하는 함수입니다.
+
+    사용법: samples = bootstrap_stats(results.prices, n_paths=10000, seed=1)
+            samples['RSI Mean Reversion']['cagr'].quantile(0.05)
+
+    Parameters:
+        prices (pandas.DataFrame 또는 Series): 자산곡선 (날짜 x 전략, 예: results.prices)
+        n_paths (int): 가상 경로 수
+        n_days (int): 경로 길이(일) (생략하면 실제 기간과 같은 길이)
+        block_size (int): 블록 길이(일) (stationary는 평균 길이)
+        method (str): 'stationary' 또는 'circular'
+        seed (int): 난수 시드
+        max_memory_mb (float): 한 묶음 계산에 쓸 최대 메모리
+        annualization_factor (int): 연환산 계수 (기본 252)
+
+    Returns:
+        pandas.DataFrame: 경로별 지표 (행: 경로, 열: (전략, 지표))
+    """
+    if method not in METHODS:
+        raise ValueError(f"method는 {METHODS} 중 하나여야 합니다: {method}")
+    returns = _daily_returns(prices)
+    names = list(returns.columns)
+    simple = np.ascontiguousarray(returns.to_numpy().T)  # (전략 x 날짜), 전략별로 연속된 배열
+    log = np.log1p(simple)
+    n_cols, n_rows = simple.shape
+    n_days = n_days or n_rows
+    block_size = max(1, min(block_size, n_rows))
+
+    # 경로·일당 메모리: 날짜 위치/블록 번호(int32) 2개 + 로그수익률(누적) + 최고점 + 단순 수익률 (float64)
+    bytes_per_path = n_days * (4 * 2 + 8 * 3)
+    chunk = int(max(1, min(n_paths, max_memory_mb * 1024 * 1024 // bytes_per_path)))
+
+    rng = np.random.default_rng(seed)
+    results = np.empty((n_paths, n_cols, len(MC_STATS)))
+    for start in range(0, n_paths, chunk):
+        size = min(chunk, n_paths - start)
+        index = _block_indices(rng, n_rows, size, n_days, block_size, method)
+        for col in range(n_cols):  # 모든 전략이 같은 날짜 위치를 사용
+            stats = _path_stats(log[col].take(index), simple[col].take(index), annualization_factor)
+            for k, stat in enumerate(MC_STATS):
+                results[start:start + size, col, k] = stats[stat]
+
+    columns = pd.MultiIndex.from_product([names, MC_STATS], names=['strategy', 'stat'])
+    frame = pd.DataFrame(results.reshape(n_paths, -1), columns=columns)
+    frame.index.name = 'path'
+    return frame
+
+
+def summarize_distribution(samples, percentiles=(5, 25, 50, 75, 95), historical=None):
+    """
+    부트스트랩 지표 분포를 전략 x 지표별 백분위수 표로 정리합니다.
+
+    Parameters:
+        samples (pandas.DataFrame): bootstrap_stats 결과
+        percentiles (tuple): 표시할 백분위수
+        historical (pandas.DataFrame): 실제 경로 지표 (calculate_stats 결과, 지정하면 'actual' 열과
+            실제 값이 분포의 몇 번째 백분위인지 'actual_pct' 열을 추가)
+
+    Returns:
+        pandas.DataFrame: 행 (전략, 지표), 열 mean, p5, p25, ... (+ actual, actual_pct)
+    """
+    values = samples.to_numpy()
+    table = pd.DataFrame(np.nanpercentile(values, percentiles, axis=0).T,
+                         index=samples.columns, columns=[f"p{p}" for p in percentiles])
+    table.insert(0, 'mean', np.nanmean(values, axis=0))
+    if historical is not None:
+        actual = [historical.loc[name, stat] if name in historical.index and stat in historical.columns
+                  else np.nan for name, stat in samples.columns]
+        table['actual'] = actual
+        table['actual_pct'] = np.nanmean(values <= np.asarray(actual), axis=0) * 100
+    return table
+
+
+def outperform_probability(samples, benchmark, stat='cagr'):
+    """
+    같은 부트스트랩 경로에서 각 전략의 지표가 기준 전략보다 높았던 경로의 비율입니다.
+
+    사용법: outperform_probability(samples, 'Buy & Hold')
+
+    Returns:
+        pandas.Series: 전략별 확률 (0~1)
+    """
+    base = samples[(benchmark, stat)].to_numpy()
+    names = [name for name in samples.columns.get_level_values(0).unique() if name != benchmark]
+    return pd.Series({name: np.mean(samples[(name, stat)].to_numpy() > base) for name in names},
+                     name=f"P({stat} > {benchmark})")
+
+
+if __name__ == "__main__":
+    from Backtest_stats import calculate_stats
+    from Backtest_strategies import PORTFOLIOS, STRATEGIES
+
+    parser = argparse.ArgumentParser(description='블록 부트스트랩 몬테카를로 강건성 분석')
+    parser.add_argument('name', choices=sorted(STRATEGIES) + sorted(PORTFOLIOS), help='전략/포트폴리오 키')
+    parser.add_argument('--paths', type=int, default=10000, help='가상 경로 수')
+    parser.add_argument('--days', type=int, help='경로 길이(일) (기본: 실제 기간)')
+    parser.add_argument('--block', type=int, default=20, help='블록 길이(일)')
+    parser.add_argument('--method', choices=METHODS, default='stationary', help='부트스트랩 방식')
+    parser.add_argument('--seed', type=int, help='난수 시드')
+    parser.add_argument('--max-memory-mb', type=float, default=256, help='한 묶음 최대 메모리(MB)')
+    parser.add_argument('--start', help='시작일 (기본: 스크립트 설정값)')
+    parser.add_argument('--end', help='종료일 (기본: 스크립트 설정값)')
+    parser.add_argument('--output', help='경로별 지표를 저장할 CSV 파일')
+    args = parser.parse_args()
+
+    from Backtest_batch import run_portfolio_job, run_strategy_job
+    job = run_strategy_job if args.name in STRATEGIES else run_portfolio_job
+    results = job(args.name, {}, args.start, args.end)
+
+    started = time.perf_counter()
+    samples = bootstrap_stats(results.prices, args.paths, args.days, args.block, args.method, args.seed,
+                              args.max_memory_mb)
+    print(f"\n{args.paths:,}개 경로 계산 ({time.perf_counter() - started:.2f}초)")
+    summary = summarize_distribution(samples, historical=calculate_stats(results.prices))
+    print("\n===== 부트스트랩 성과 분포 =====")
+    print(summary.round(4).to_string())
+    names = list(results.prices.columns)
+    if len(names) > 1:
+        print(f"\n{outperform_probability(samples, names[-1]).round(4).to_string()}")
+    if args.output:
+        samples.to_csv(args.output)
@@ -0,0 +1,117 @@
+# StockTrade24.com
+# 독립된 백테스트 병렬 실행
+#
+# 스크립트마다 bt.run(전략, 매수후 보유)이나 bt.run(미국, 한국)처럼 서로 영향을 주지 않는 백테스트를
+# 한 코어에서 차례로 실행합니다. run_parallel은 같은 백테스트들을 프로세스마다 하나씩 동시에 실행하고
+# 결과를 bt.run과 똑같은 Result로 합치므로 results.stats, calculate_annual_returns, results.plot()이
+# 그대로 동작합니다. 전체 시간은 가장 오래 걸리는 백테스트 하나와 비슷해집니다.
+# - 작업 프로세스는 fork로 만들어 가격 데이터와 전략 객체를 복사 없이 그대로 물려받습니다.
+# - 돌려받을 때 부모에 이미 있는 데이터와 수수료 함수(lambda 포함)는 이름표만 보내고 부모의 객체로 다시 연결합니다.
+# - fork가 없는 환경(Windows), 이미 작업 프로세스 안에서 호출할 때, Backtest_profiler로 측정 중일 때는
+#   bt.run으로 차례로 실행합니다.
+#
+# 사용법:
+#   results = run_parallel(rsi_backtest, buy_and_hold_backtest)   # bt.run(...) 대신
+#   print(results.stats)
+
+import io
+import multiprocessing
+import os
+import pickle
+
+import pandas as pd
+
+_FORKED = None  # 작업 프로세스가 fork로 물려받는 (백테스트 목록, 공유 객체 목록)
+
+
+def _shared_objects(backtests):
+    """
+    부모와 작업 프로세스가 함께 가지고 있는 큰 객체와 pickle할 수 없는 함수 목록입니다.
+    (가격 데이터, 지표 데이터, 수수료 함수)
+    """
+    shared = []
+    for bkt in backtests:
+        candidates = [bkt.data, getattr(bkt.strategy, 'commission_fn', None)]
+        candidates += list((bkt.additional_data or {}).values())
+        for algo in getattr(getattr(bkt.strategy, 'stack', None), 'algos', ()):
+            candidates += list(vars(algo).values())
+        for value in candidates:
+            if isinstance(value, (pd.DataFrame, pd.Series)) or (callable(value) and not isinstance(value, type)):
+                if not any(value is known for known in shared):
+                    shared.append(value)
+    return shared
+
+
+class _SharedPickler(pickle.Pickler):
+    """공유 객체는 내용 대신 목록 번호만 씁니다."""
+
+    def __init__(self, file, shared):
+        super(_SharedPickler, self).__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared_ids = {id(value): i for i, value in enumerate(shared)}
+
+    def persistent_id(self, obj):
+        return self.shared_ids.get(id(obj))
+
+
+class _SharedUnpickler(pickle.Unpickler):
+    """목록 번호를 부모 프로세스의 객체로 되돌립니다."""
+
+    def __init__(self, file, shared):
+        super(_SharedUnpickler, self).__init__(file)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        return self.shared[pid]
+
+
+def _run_forked(i):
+    """작업 프로세스: i번째 백테스트를 실행하고 실행 결과 상태를 돌려보냅니다."""
+    backtests, shared = _FORKED
+    bkt = backtests[i]
+    bkt.run()
+    buffer = io.BytesIO()
+    _SharedPickler(buffer, shared).dump(bkt.__dict__)
+    return buffer.getvalue()
+
+
+def _can_fork():
+    import bt
+
+    return ('fork' in multiprocessing.get_all_start_methods()
+            and not multiprocessing.current_process().daemon  # 작업 프로세스 안에서는 자식 프로세스를 못 만듦
+            and not hasattr(bt.Backtest.run, '__wrapped__'))  # 프로파일러가 측정 중이면 같은 프로세스에서 실행
+
+
+def run_parallel(*backtests, workers=None):
+    """
+    서로 독립된 백테스트들을 여러 프로세스에서 동시에 실행하고 bt.run과 같은 Result를 반환합니다.
+    실행이 끝난 백테스트 객체는 bt.run을 쓴 것과 같이 결과가 채워집니다.
+
+    사용법: results = run_parallel(rsi_backtest, stock)
+
+    Parameters:
+        backtests (bt.Backtest): 실행할 백테스트들
+        workers (int): 최대 프로세스 수 (생략하면 min(백테스트 수, CPU 코어 수))
+
+    Returns:
+        bt.backtest.Result: 백테스트 결과 (넘긴 순서대로)
+    """
+    import bt
+
+    global _FORKED
+    pending = [i for i, bkt in enumerate(backtests) if not bkt.has_run]
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    if workers < 2 or not _can_fork():
+        return bt.run(*backtests)
+
+    shared = _shared_objects(backtests)
+    _FORKED = (backtests, shared)
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            states = pool.map(_run_forked, pending, chunksize=1)
+    finally:
+        _FORKED = None
+
+    for i, state in zip(pending, states):
+        backtests[i].__dict__.update(_SharedUnpickler(io.BytesIO(state), shared).load())
+    return bt.backtest.Result(*backtests)
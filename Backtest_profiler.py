@@ -0,0 +1,344 @@
+# StockTrade24.com
+# 백테스트 프로파일러
+#
+# 백테스트가 느릴 때 시간이 야후 파이낸스 다운로드, pandas_ta 지표 계산, 전략 Algo의 __call__,
+# bt의 Rebalance, ffn 성과 통계, 그래프 중 어디에 쓰이는지 알 수 있도록
+# 단계별 시간과 메모리(tracemalloc)를 측정합니다.
+# 스크립트를 고치지 않고 실행 중에만 다음 함수들을 감싸서 측정합니다.
+#   download    : yfinance.download, yfinance.Ticker.history
+#   indicator   : pandas_ta 지표 함수 (ta.rsi, ta.macd ...)
+#   backtest    : bt.Backtest.run (그 안에서 Algo별 __call__)
+#   stats       : bt 결과 통계(ffn), Backtest_stats 함수
+#   plot        : results.plot 등 그래프
+# 결과는 단계별 표와 flame graph 도구(flamegraph.pl, speedscope 등)로 볼 수 있는 접힌 스택 파일로 저장합니다.
+#
+# 사용법:
+#   python Backtest_profiler.py Strategy_1_RSI.py                     # 스크립트 실행 후 표 출력
+#   python Backtest_profiler.py "Strategy_Port_2_All Weather.py" --stacks allweather.folded
+#   python Backtest_profiler.py Strategy_2_MACD.py --no-memory        # 메모리 측정 없이 (더 빠름)
+#
+#   with Profiler() as profiler:                                      # 코드 안에서
+#       run_strategy('rsi', ohlcv)
+#   print(profiler.report())
+
+import argparse
+import os
+import runpy
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+MB = 1024 ** 2
+
+
+class _Frame:
+    """측정 중인 단계 하나 (중첩 단계의 최대 메모리를 부모에게 전달하기 위해 사용)"""
+
+    __slots__ = ('path', 'start', 'memory_start', 'peak')
+
+    def __init__(self, path, start, memory_start):
+        self.path = path
+        self.start = start
+        self.memory_start = memory_start
+        self.peak = memory_start
+
+
+class _ProfiledAlgo:
+    """bt Algo를 감싸 __call__ 시간을 측정합니다. 나머지 속성은 원래 Algo로 전달합니다."""
+
+    def __init__(self, algo, profiler):
+        object.__setattr__(self, '_algo', algo)
+        object.__setattr__(self, '_profiler', profiler)
+        object.__setattr__(self, '_label', f"algo:{getattr(algo, 'name', None) or type(algo).__name__}")
+
+    def __call__(self, target):
+        profiler = object.__getattribute__(self, '_profiler')
+        profiler._enter(object.__getattribute__(self, '_label'))
+        try:
+            return object.__getattribute__(self, '_algo')(target)
+        finally:
+            profiler._exit()
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(object.__getattribute__(self, '_algo'), name)
+
+
+class Profiler:
+    """
+    단계별 실행 시간과 메모리를 모으는 프로파일러입니다.
+    with 블록 안(또는 install()~uninstall() 사이)에서는 다운로드, 지표, 백테스트, 통계, 그래프 함수가 자동으로 측정됩니다.
+
+    Parameters:
+        memory (bool): tracemalloc으로 메모리도 측정할지 여부 (실행이 2~3배 느려짐)
+        root (str): 가장 바깥 단계 이름
+    """
+
+    def __init__(self, memory=True, root='total'):
+        self.memory = memory
+        self.root = root
+        self._stats = {}     # 경로 -> [호출 수, 전체 시간, 최대 메모리 증가, 순 메모리 증가]
+        self._stack = []
+        self._patches = []
+        self._started_tracemalloc = False
+
+    # ----- 측정 -----
+
+    def _memory(self):
+        return tracemalloc.get_traced_memory() if self.memory else (0, 0)
+
+    def _enter(self, name):
+        parent = self._stack[-1].path if self._stack else ()
+        current, peak = self._memory()
+        if self._stack:  # 지금까지의 최대 메모리를 부모 단계에 남겨 두고 새로 잽니다
+            self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        if self.memory:
+            tracemalloc.reset_peak()
+        self._stack.append(_Frame(parent + (name,), time.perf_counter(), current))
+
+    def _exit(self):
+        frame = self._stack.pop()
+        elapsed = time.perf_counter() - frame.start
+        current, peak = self._memory()
+        peak = max(frame.peak, peak)
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        stats = self._stats.setdefault(frame.path, [0, 0.0, 0, 0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], peak - frame.memory_start)
+        stats[3] += current - frame.memory_start
+
+    def stage(self, name):
+        """
+        with 블록을 한 단계로 측정합니다.
+
+        사용법:
+            with profiler.stage('prepare'):
+                data = prepare_data(...)
+        """
+        return _Stage(self, name)
+
+    def wrap(self, func, name):
+        """함수 호출을 name 단계로 측정하는 함수를 반환합니다."""
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            profiler._enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler._exit()
+
+        wrapper.__wrapped__ = func
+        wrapper.__name__ = getattr(func, '__name__', name)
+        wrapper.__doc__ = getattr(func, '__doc__', None)
+        return wrapper
+
+    def wrap_strategy(self, strategy):
+        """bt.Strategy의 Algo들을 측정용으로 감쌉니다. (하위 AlgoStack 포함)"""
+        stack = getattr(strategy, 'stack', None)
+        if stack is not None:
+            self._wrap_stack(stack)
+        for child in getattr(strategy, 'children', {}).values():
+            if hasattr(child, 'stack'):
+                self.wrap_strategy(child)
+        return strategy
+
+    def _wrap_stack(self, stack):
+        algos = []
+        for algo in stack.algos:
+            if isinstance(algo, _ProfiledAlgo):
+                algos.append(algo)
+            elif hasattr(algo, 'algos'):
+                self._wrap_stack(algo)
+                algos.append(algo)
+            else:
+                algos.append(_ProfiledAlgo(algo, self))
+        stack.algos = type(stack.algos)(algos) if isinstance(stack.algos, (list, tuple)) else algos
+
+    # ----- 자동 측정 설치 -----
+
+    def _patch(self, owner, attr, name):
+        original = getattr(owner, attr, None)
+        if original is None or hasattr(original, '__wrapped__'):
+            return
+        self._patches.append((owner, attr, original))
+        setattr(owner, attr, self.wrap(original, name))
+
+    def install(self):
+        """다운로드, 지표, 백테스트, 통계, 그래프 함수를 측정용으로 바꿉니다."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._enter(self.root)
+
+        try:
+            import yfinance
+            self._patch(yfinance, 'download', 'download')
+            self._patch(yfinance.Ticker, 'history', 'download')
+        except ImportError:
+            pass
+
+        try:
+            import pandas_ta
+            for attr in dir(pandas_ta):
+                func = getattr(pandas_ta, attr)
+                if not attr.startswith('_') and callable(func) and not isinstance(func, type) \
+                        and getattr(func, '__module__', '').startswith('pandas_ta'):
+                    self._patch(pandas_ta, attr, f"indicator:{attr}")
+        except ImportError:
+            pass
+
+        try:
+            import bt
+            profiler = self
+            original_run = bt.Backtest.run
+
+            def run(backtest):
+                profiler.wrap_strategy(backtest.strategy)  # Backtest가 복사한 전략의 Algo를 감쌉니다
+                profiler._enter(f"backtest:{backtest.name}")
+                try:
+                    return original_run(backtest)
+                finally:
+                    profiler._exit()
+
+            run.__wrapped__ = original_run
+            self._patches.append((bt.Backtest, 'run', original_run))
+            bt.Backtest.run = run
+            self._patch(bt.backtest.Result, '__init__', 'stats')
+            for attr in dir(bt.backtest.Result):
+                if attr.startswith(('plot', 'display')):
+                    self._patch(bt.backtest.Result, attr, 'plot')
+        except ImportError:
+            pass
+
+        import Backtest_stats
+        for attr in ('calculate_stats', 'compound_annual_returns'):
+            self._patch(Backtest_stats, attr, 'stats')
+        return self
+
+    def uninstall(self):
+        """install()로 바꾼 함수를 원래대로 돌려놓습니다."""
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches = []
+        while self._stack:
+            self._exit()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    # ----- 결과 -----
+
+    def report(self):
+        """
+        단계별 측정 결과 표를 만듭니다.
+
+        Returns:
+            pandas.DataFrame: 행은 단계 경로, 컬럼은
+                calls (호출 수), total_s (하위 단계 포함 시간), self_s (하위 단계 제외 시간),
+                pct (전체 대비 %), mean_us (호출당 평균), peak_mb (최대 메모리 증가), alloc_mb (남은 메모리 증가)
+        """
+        rows = []
+        total = sum(stats[1] for path, stats in self._stats.items() if len(path) == 1) or 1.0
+        for path, (calls, elapsed, peak, alloc) in sorted(self._stats.items()):
+            children = sum(stats[1] for child, stats in self._stats.items()
+                           if len(child) == len(path) + 1 and child[:len(path)] == path)
+            rows.append({
+                'stage': "  " * (len(path) - 1) + path[-1],
+                'path': ";".join(path),
+                'calls': calls,
+                'total_s': elapsed,
+                'self_s': max(elapsed - children, 0.0),
+                'pct': 100 * elapsed / total,
+                'mean_us': 1e6 * elapsed / calls,
+                'peak_mb': peak / MB,
+                'alloc_mb': alloc / MB,
+            })
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows).set_index('stage').drop(columns='path')
+
+    def write_collapsed(self, path):
+        """
+        flame graph 도구에서 읽을 수 있는 접힌 스택 파일을 저장합니다.
+        한 줄에 "단계;하위 단계;... 하위 단계 제외 시간(마이크로초)" 형식입니다.
+        """
+        lines = []
+        for stack, (_, elapsed, _, _) in self._stats.items():
+            children = sum(stats[1] for child, stats in self._stats.items()
+                           if len(child) == len(stack) + 1 and child[:len(stack)] == stack)
+            self_us = int(round(1e6 * max(elapsed - children, 0.0)))
+            if self_us > 0:
+                lines.append(";".join(name.replace(";", ",") for name in stack) + f" {self_us}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="UTF-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit()
+
+
+def profile_script(script, memory=True, args=()):
+    """
+    스크립트를 __main__으로 실행하면서 측정합니다. 그래프 창은 띄우지 않습니다.
+
+    Parameters:
+        script (str): 실행할 스크립트 경로
+        memory (bool): 메모리 측정 여부
+        args (list): 스크립트에 넘길 인자
+
+    Returns:
+        Profiler: 측정 결과
+    """
+    os.environ.setdefault('MPLBACKEND', 'Agg')  # results.plot()이 창을 띄우고 멈추지 않게 합니다
+    profiler = Profiler(memory=memory, root=os.path.basename(script))
+    argv = sys.argv
+    sys.argv = [script] + list(args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    try:
+        with profiler:
+            runpy.run_path(script, run_name="__main__")
+    finally:
+        sys.argv = argv
+        sys.path.pop(0)
+    return profiler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='백테스트 단계별 시간/메모리 측정')
+    parser.add_argument('script', help='측정할 전략/포트폴리오 스크립트')
+    parser.add_argument('--stacks', help='접힌 스택 파일 저장 경로 (flame graph용)')
+    parser.add_argument('--output', help='단계별 표를 저장할 CSV 파일')
+    parser.add_argument('--no-memory', action='store_true', help='메모리(tracemalloc) 측정 생략')
+    args, script_args = parser.parse_known_args()  # 나머지 인자는 스크립트에 넘깁니다
+
+    profiler = profile_script(args.script, memory=not args.no_memory, args=script_args)
+    report = profiler.report()
+    print("\n===== 단계별 프로파일 =====")
+    print(report.round(3).to_string())
+    if args.output:
+        report.to_csv(args.output)
+    if args.stacks:
+        print(f"\n접힌 스택 파일: {profiler.write_collapsed(args.stacks)}")
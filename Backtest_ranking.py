@@ -0,0 +1,275 @@
+# StockTrade24.com
+# 유니버스 횡단면 순위 전략 엔진
+#
+# Strategy_1~5는 한 종목의 시계열 신호로 사고팔고, 포트폴리오 스크립트는 고정 비중만 사용합니다.
+# 이 모듈은 리밸런싱일마다 유니버스 전 종목을 점수(모멘텀, 거래량 가중 모멘텀)로 순위를 매겨
+# 상위 N개 종목을 같은 비중으로 보유하는 전략을 계산합니다.
+# - 점수는 (날짜 x 종목) 2차원 배열로 한 번에 계산합니다. (거래량 가중 모멘텀은 Strategy_5의
+#   calculate_signals와 같은 식을 모든 종목 열에 동시에 적용)
+# - 상위 N개 선택은 리밸런싱일 행 전체에 np.argpartition을 한 번 적용해 끝냅니다. (정렬 없이 O(종목 수))
+# - 결과 비중표(리밸런싱일 x 종목)는 bt.algos.WeighTarget에 그대로 넣을 수 있고,
+#   simulate_weights로 리밸런싱 구간 단위 행렬 연산 시뮬레이션도 할 수 있습니다.
+# 2,000종목 x 20년 일봉 순위 계산과 시뮬레이션이 수 초 안에 끝납니다.
+#
+# 사용법:
+#   weights = rank_universe(close, volume, score='volmomen', top_n=20, rebalance='monthly')
+#   curve = simulate_weights(close, weights, fee=0.0018)
+#   bt.Backtest(bt.Strategy('Top 20', [bt.algos.WeighTarget(weights), bt.algos.Rebalance()]), close.ffill(),
+#               integer_positions=False)
+#
+#   python Backtest_ranking.py --tickers-file kospi200.txt --score volmomen --top 20 --start 2005-01-01
+#   python Backtest_ranking.py --synthetic 2000 --bars 5040 --score momentum --top 50
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from Backtest_allocation import _period_keys
+from Backtest_stats import calculate_stats
+
+REBALANCE_MODES = ('monthly', 'quarterly')
+
+
+def momentum_scores(close, momentum_period=20):
+    """
+    모멘텀 점수: momentum_period일 수익률
+
+    Parameters:
+        close (pandas.DataFrame): 종가 (날짜 x 종목, 상장 전/폐지 후는 NaN)
+
+    Returns:
+        pandas.DataFrame: 점수 (날짜 x 종목)
+    """
+    return close / close.shift(momentum_period) - 1
+
+
+def volume_momentum_scores(close, volume, momentum_period=20, volume_period=20, weighting_factor=0.5):
+    """
+    거래량 가중 모멘텀 점수 (Strategy_5 calculate_signals의 combined_signal과 같은 식)
+
+    Parameters:
+        close (pandas.DataFrame): 종가 (날짜 x 종목)
+        volume (pandas.DataFrame): 거래량 (날짜 x 종목)
+        momentum_period (int): 모멘텀 계산 기간
+        volume_period (int): 거래량 평균 계산 기간
+        weighting_factor (float): 거래량 가중치 계수 (0~1)
+
+    Returns:
+        pandas.DataFrame: 점수 (날짜 x 종목)
+    """
+    momentum = close / close.shift(momentum_period) - 1
+    momentum_roll = momentum.rolling(window=momentum_period)
+    momentum_score = (momentum - momentum_roll.mean()) / momentum_roll.std()
+
+    volume_ratio = volume / volume.rolling(window=volume_period).mean()
+    volume_signal = (volume_ratio - 1) / volume_ratio.rolling(window=volume_period).std()
+
+    return (1 - weighting_factor) * momentum_score + weighting_factor * volume_signal
+
+
+SCORES = {
+    'momentum': momentum_scores,
+    'volmomen': volume_momentum_scores,
+}
+
+
+def rebalance_rows(dates, rebalance='monthly'):
+    """주기(월/분기)가 바뀐 첫 거래일의 행 번호 (첫 거래일 포함)"""
+    if rebalance not in REBALANCE_MODES:
+        raise ValueError(f"rebalance는 {REBALANCE_MODES} 중 하나여야 합니다: {rebalance}")
+    keys = _period_keys(dates, rebalance)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def top_n_weights(scores, top_n, min_score=None):
+    """
+    점수 행렬의 각 행에서 상위 top_n개 종목을 골라 같은 비중을 주는 핵심 함수입니다.
+    점수가 NaN인 종목(상장 전, 지표 계산 기간 부족)과 min_score 이하인 종목은 고르지 않고,
+    고를 종목이 top_n개보다 적으면 있는 종목끼리 나눕니다. (하나도 없으면 전부 현금)
+
+    Parameters:
+        scores (numpy.ndarray): 점수 (리밸런싱일 x 종목)
+        top_n (int): 보유 종목 수
+        min_score (float): 이 값보다 점수가 높아야 보유 (예: 0이면 절대 모멘텀 필터)
+
+    Returns:
+        numpy.ndarray: 비중 (리밸런싱일 x 종목), 행 합계 1 또는 0
+    """
+    n_rows, n_cols = scores.shape
+    valid = np.isfinite(scores)
+    if min_score is not None:
+        valid &= scores > min_score
+    ranked = np.where(valid, scores, -np.inf)
+    top_n = min(top_n, n_cols)
+
+    # 행마다 상위 top_n개의 위치 (순서는 정렬하지 않음)
+    if top_n < n_cols:
+        picks = np.argpartition(-ranked, top_n - 1, axis=1)[:, :top_n]
+    else:
+        picks = np.broadcast_to(np.arange(n_cols), (n_rows, n_cols))
+    chosen = np.take_along_axis(valid, picks, axis=1)
+
+    weights = np.zeros((n_rows, n_cols))
+    counts = chosen.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.put_along_axis(weights, picks, np.where(chosen, 1.0 / counts, 0.0), axis=1)
+    return weights
+
+
+def rank_universe(close, volume=None, score='momentum', top_n=20, rebalance='monthly', min_score=None,
+                  **score_params):
+    """
+    리밸런싱일마다 유니버스 순위를 매겨 상위 N개 종목 비중표를 만드는 함수입니다.
+    리밸런싱일 종가까지의 정보로 점수를 계산하고 그날 종가에 매매합니다. (스크립트 전략과 같은 기준)
+
+    사용법: weights = rank_universe(close, volume, score='volmomen', top_n=20)
+            bt.algos.WeighTarget(weights)
+
+    Parameters:
+        close (pandas.DataFrame): 종가 (날짜 x 종목, 상장 전/폐지 후는 NaN)
+        volume (pandas.DataFrame): 거래량 (score='volmomen'일 때 필요)
+        score (str): 점수 종류 ('momentum' 또는 'volmomen')
+        top_n (int): 보유 종목 수
+        rebalance (str): 'monthly' 또는 'quarterly'
+        min_score (float): 이 값보다 점수가 높은 종목만 보유
+        score_params: 점수 함수 파라미터 (예: momentum_period=60)
+
+    Returns:
+        pandas.DataFrame: 비중표 (행: 리밸런싱일, 열: 종목)
+    """
+    if score not in SCORES:
+        raise ValueError(f"알 수 없는 점수입니다: {score} (사용 가능: {', '.join(SCORES)})")
+    if score == 'volmomen':
+        if volume is None:
+            raise ValueError("volmomen 점수에는 거래량(volume)이 필요합니다.")
+        scores = SCORES[score](close, volume.reindex_like(close), **score_params)
+    else:
+        scores = SCORES[score](close, **score_params)
+
+    rows = rebalance_rows(close.index, rebalance)
+    weights = top_n_weights(scores.to_numpy(dtype=float)[rows], top_n, min_score)
+    return pd.DataFrame(weights, index=close.index[rows], columns=close.columns)
+
+
+def simulate_weights(close, weights, fee=0.0018, initial_capital=1000000.0, name='Top N'):
+    """
+    비중표대로 리밸런싱일 종가에 비중을 맞추는 포트폴리오를 시뮬레이션합니다.
+    리밸런싱일 사이에는 보유 수량이 고정이므로 구간마다 (구간 날짜 x 종목) @ (보유 수량) 한 번으로 평가합니다.
+    상장폐지 등으로 가격이 없는 날은 마지막 가격으로 평가합니다. (소수점 주식 수 기준)
+
+    Parameters:
+        close (pandas.DataFrame): 종가 (날짜 x 종목)
+        weights (pandas.DataFrame): rank_universe 결과 (행: 리밸런싱일, 열: 종목)
+        fee (float): 매매 금액 대비 수수료율 (매수/매도 모두)
+        initial_capital (float): 초기 투자금
+        name (str): 결과 이름
+
+    Returns:
+        pandas.Series: 100에서 시작하는 가치 지수 (bt의 results.prices와 같은 기준)
+    """
+    weights = weights.reindex(columns=close.columns, fill_value=0.0)
+    prices = np.nan_to_num(close.ffill().to_numpy(dtype=float), nan=0.0)
+    rows = close.index.get_indexer(weights.index)
+    if (rows < 0).any():
+        raise ValueError("비중표의 리밸런싱일이 가격 데이터에 없습니다.")
+    targets = weights.to_numpy(dtype=float)
+
+    n_rows, n_cols = prices.shape
+    equity = np.full(n_rows, float(initial_capital))
+    shares = np.zeros(n_cols)
+    cash = float(initial_capital)
+    bounds = np.r_[rows, n_rows]
+    for k, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        p = prices[start]
+        value = cash + shares @ p
+        target = np.divide(targets[k] * value, p, out=np.zeros(n_cols), where=p > 0)
+        traded = np.abs(target - shares) @ p
+        value -= traded * fee
+        target *= value / (value + traded * fee)  # 수수료를 낸 뒤 남은 금액 기준으로 비중을 맞춤
+        cash = value - target @ p
+        shares = target
+        equity[start:end] = cash + prices[start:end] @ shares
+
+    return pd.Series(equity / initial_capital * 100, index=close.index, name=name)
+
+
+def create_backtest(close, weights, name='Top N'):
+    """
+    비중표를 bt.algos.WeighTarget으로 사용하는 bt 백테스트를 만듭니다. (결과 확인/그래프용)
+    simulate_weights처럼 소수 주식 수를 허용합니다. (종목이 많으면 정수 주식 수로는 비중이 크게 어긋남)
+
+    Returns:
+        bt.Backtest: 리밸런싱일마다 비중표대로 맞추는 백테스트
+    """
+    import bt
+
+    strategy = bt.Strategy(name, [
+        bt.algos.WeighTarget(weights),
+        bt.algos.Rebalance(),
+    ])
+    return bt.Backtest(strategy, close.ffill(), integer_positions=False)
+
+
+def _load_close_volume(tickers, start_date, end_date):
+    """캐시/야후 파이낸스에서 유니버스를 받아 종가/거래량 행렬로 만듭니다."""
+    from Data_cache import load_universe
+    from Price_panel import panel_from_universe
+
+    panel = panel_from_universe(load_universe(tickers, start_date, end_date), fields=('Close', 'Volume'))
+    return panel.xs('Close', axis=1, level='field'), panel.xs('Volume', axis=1, level='field')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='유니버스 횡단면 순위 전략')
+    parser.add_argument('--tickers', nargs='*', default=[], help='종목 티커 목록')
+    parser.add_argument('--tickers-file', help='한 줄에 티커 하나씩 적힌 파일')
+    parser.add_argument('--synthetic', type=int, help='가상 종목 수 (인터넷 없이 속도 확인)')
+    parser.add_argument('--bars', type=int, default=5040, help='가상 데이터 일수')
+    parser.add_argument('--start', default='2005-01-01', help='시작일')
+    parser.add_argument('--end', default='2025-01-01', help='종료일')
+    parser.add_argument('--score', choices=sorted(SCORES), default='momentum', help='순위 점수')
+    parser.add_argument('--period', type=int, default=20, help='모멘텀 계산 기간')
+    parser.add_argument('--top', type=int, default=20, help='보유 종목 수')
+    parser.add_argument('--rebalance', choices=REBALANCE_MODES, default='monthly', help='리밸런싱 주기')
+    parser.add_argument('--min-score', type=float, help='이 점수보다 높은 종목만 보유 (예: 0)')
+    parser.add_argument('--fee', type=float, default=0.0018, help='매매 수수료율')
+    parser.add_argument('--output', help='비중표를 저장할 CSV 파일')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from Synthetic_market import generate_universe
+        universe = generate_universe(args.synthetic, args.bars, start=args.start, seed=0)
+        close = pd.DataFrame({t: frame['Close'] for t, frame in universe.items()})
+        volume = pd.DataFrame({t: frame['Volume'] for t, frame in universe.items()})
+        del universe
+    else:
+        from Data_cache import read_tickers
+        tickers = list(args.tickers)
+        if args.tickers_file:
+            tickers += read_tickers(args.tickers_file)
+        if not tickers:
+            parser.error("--tickers, --tickers-file 또는 --synthetic 중 하나를 지정하세요.")
+        close, volume = _load_close_volume(tickers, args.start, args.end)
+
+    started = time.perf_counter()
+    weights = rank_universe(close, volume, args.score, args.top, args.rebalance, args.min_score,
+                            momentum_period=args.period)
+    ranked = time.perf_counter()
+    curves = pd.concat([
+        simulate_weights(close, weights, args.fee, name=f'Top {args.top} {args.score}'),
+        simulate_weights(close, rank_universe(close, top_n=close.shape[1], rebalance=args.rebalance),
+                         args.fee, name='Equal Weight'),
+    ], axis=1)
+    finished = time.perf_counter()
+
+    print(f"\n{close.shape[1]}개 종목 x {len(close)}일: 순위 {ranked - started:.2f}초, "
+          f"시뮬레이션 {finished - ranked:.2f}초")
+    print("\n===== 횡단면 순위 전략 성과 =====")
+    print(calculate_stats(curves).round(4).to_string())
+    held = (weights > 0).sum(axis=1)
+    print(f"\n리밸런싱 {len(weights)}회, 평균 보유 종목 수 {held.mean():.1f}")
+    if args.output:
+        weights.to_csv(args.output)
+        print(f"\n비중표를 {args.output}에 저장했습니다.")
@@ -0,0 +1,349 @@
+# StockTrade24.com
+# 백테스트 성과지표 고속 계산 모듈
+#
+# bt/ffn의 results.stats는 전략 하나마다 수십 개의 지표를 pandas로 계산하기 때문에
+# 파라미터 스윕처럼 수천 번 반복하면 매우 느립니다.
+# 이 모듈은 여러 자산곡선(equity curve)을 2차원 행렬로 받아
+# 스크립트에서 실제로 사용하는 지표만 NumPy로 한 번에 계산합니다.
+# 계산 기준(연환산 방식, 표준편차 자유도 등)은 ffn과 동일하게 맞췄습니다.
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252             # 일간 수익률 연환산 기준 (ffn 기본값)
+SECONDS_PER_YEAR = 31557600    # ffn.year_frac과 동일한 1년 길이(365.25일)
+
+# calculate_stats가 반환하는 지표 컬럼 (이름은 results.stats와 동일)
+STAT_COLUMNS = [
+    'total_return',   # 총 수익률
+    'cagr',           # 연평균 수익률
+    'daily_mean',     # 일간 평균 수익률(연환산)
+    'daily_vol',      # 일간 변동성(연환산)
+    'daily_sharpe',   # 일간 샤프비율
+    'max_drawdown',   # 최대낙폭
+    'calmar',         # 수익률/위험 (CAGR / |최대낙폭|)
+    'yearly_mean',    # 연간 평균 수익률
+    'yearly_vol',     # 연간 수익률 변동성
+    'yearly_sharpe',  # 연간 샤프비율
+]
+
+
+def _as_matrix(prices, index=None, names=None):
+    """
+    입력을 (시점 x 전략) float 행렬, 날짜 인덱스, 전략 이름으로 정리합니다.
+    하루에 여러 행이 있으면 ffn처럼 그날의 마지막 값만 사용합니다.
+    """
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame()
+    if isinstance(prices, pd.DataFrame):
+        index = prices.index
+        names = list(prices.columns)
+        values = prices.to_numpy(dtype=float)
+    else:
+        values = np.asarray(prices, dtype=float)
+        if values.ndim == 1:
+            values = values[:, None]
+        if index is None:
+            raise ValueError("NumPy 배열을 넘길 때는 날짜 index가 필요합니다.")
+        if names is None:
+            names = list(range(values.shape[1]))
+
+    index = pd.DatetimeIndex(index)
+    days = index.normalize()
+    if not days.is_unique:
+        last_of_day = np.r_[days[1:] != days[:-1], True]
+        values = values[last_of_day]
+        index = index[last_of_day]
+
+    return values, index, names
+
+
+def _ffill(values):
+    """행 방향(시간축) 전진 채우기"""
+    mask = np.isnan(values)
+    if not mask.any():
+        return values
+    rows = np.where(~mask, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
+
+
+def _year_ends(index):
+    """각 연도의 마지막 행 위치와 해당 연도 배열"""
+    years = np.asarray(index.year)
+    last_of_year = np.r_[years[1:] != years[:-1], True]
+    return np.flatnonzero(last_of_year), years[last_of_year]
+
+
+def _nanstd(values, axis=0):
+    """표본 표준편차(ddof=1). 관측치가 2개 미만이면 NaN"""
+    count = np.sum(~np.isnan(values), axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(values, axis=axis)
+        sq = np.nansum((values - mean) ** 2, axis=axis)
+        std = np.sqrt(sq / (count - 1))
+    return np.where(count >= 2, std, np.nan)
+
+
+def calculate_stats_array(values, index, annualization_factor=TRADING_DAYS):
+    """
+    자산곡선 행렬로부터 성과지표를 계산하는 핵심 함수입니다.
+    (시점 x 전략) 형태의 NumPy 배열을 받아 지표별 1차원 배열을 돌려줍니다.
+
+    Parameters:
+        values (numpy.ndarray): 자산곡선 행렬 (시점 x 전략), 결측치는 NaN
+        index (pandas.DatetimeIndex): 각 행의 날짜
+        annualization_factor (int): 일간 지표 연환산 계수
+
+    Returns:
+        dict: STAT_COLUMNS 이름을 키로 하는 지표 배열
+    """
+    n_rows, n_cols = values.shape
+    cols = np.arange(n_cols)
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+
+    # 전략별 첫/마지막 관측 위치 (상장일이 다른 자산도 각자 구간으로 계산)
+    first = np.where(has_data, valid.argmax(axis=0), 0)
+    last = np.where(has_data, n_rows - 1 - valid[::-1].argmax(axis=0), 0)
+    first_value = values[first, cols]
+    last_value = values[last, cols]
+
+    stamps = np.asarray((index - index[0]).total_seconds(), dtype=float)
+    years = (stamps[last] - stamps[first]) / SECONDS_PER_YEAR
+
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        total_return = last_value / first_value - 1
+        cagr = np.where(years > 0, (last_value / first_value) ** (1 / years) - 1, np.nan)
+
+        # 일간 수익률 통계
+        returns = values[1:] / values[:-1] - 1
+        count = np.sum(~np.isnan(returns), axis=0)
+        daily_mean = np.nanmean(returns, axis=0)
+        daily_std = _nanstd(returns)
+        daily_sharpe = np.where(daily_std > 0, daily_mean / daily_std, np.nan) * np.sqrt(annualization_factor)
+        daily_mean = daily_mean * annualization_factor
+        daily_vol = daily_std * np.sqrt(annualization_factor)
+
+        # 최대낙폭: 직전 최고점 대비 하락률의 최솟값 (NaN은 최고점 계산에서 제외)
+        peak = np.fmax.accumulate(values, axis=0)
+        max_drawdown = np.nanmin(values / peak - 1, axis=0)
+        calmar = cagr / np.abs(max_drawdown)
+
+        # 연간 수익률 통계 (연말 종가 기준, ffn과 동일하게 첫 해는 제외)
+        year_rows, _ = _year_ends(index)
+        year_prices = _ffill(values)[year_rows]
+        yearly_returns = year_prices[1:] / year_prices[:-1] - 1
+        yearly_mean = np.nanmean(yearly_returns, axis=0) if len(yearly_returns) else np.full(n_cols, np.nan)
+        yearly_vol = _nanstd(yearly_returns)
+        yearly_sharpe = np.where(yearly_vol > 0, yearly_mean / yearly_vol, np.nan)
+
+    # 데이터가 너무 짧으면 ffn처럼 NaN으로 남깁니다
+    short = count < 2
+    for arr in (daily_mean, daily_vol, daily_sharpe):
+        arr[short] = np.nan
+
+    return {
+        'total_return': total_return,
+        'cagr': cagr,
+        'daily_mean': daily_mean,
+        'daily_vol': daily_vol,
+        'daily_sharpe': daily_sharpe,
+        'max_drawdown': max_drawdown,
+        'calmar': calmar,
+        'yearly_mean': yearly_mean,
+        'yearly_vol': yearly_vol,
+        'yearly_sharpe': yearly_sharpe,
+    }
+
+
+def calculate_stats(prices, index=None, names=None, annualization_factor=TRADING_DAYS):
+    """
+    여러 전략의 자산곡선을 한 번에 받아 성과지표 표를 만드는 함수입니다.
+    results.stats 대신 사용할 수 있으며, 값은 숫자 그대로 반환합니다.
+
+    사용법: stats = calculate_stats(results.prices)
+            stats.loc['Buy & Hold', 'cagr']
+
+    Parameters:
+        prices (pandas.DataFrame 또는 numpy.ndarray): 자산곡선 (시점 x 전략)
+        index (pandas.DatetimeIndex): prices가 NumPy 배열일 때의 날짜
+        names (list): prices가 NumPy 배열일 때의 전략 이름
+        annualization_factor (int): 일간 지표 연환산 계수 (기본 252)
+
+    Returns:
+        pandas.DataFrame: 행은 전략, 열은 STAT_COLUMNS
+    """
+    values, index, names = _as_matrix(prices, index, names)
+    stats = calculate_stats_array(values, index, annualization_factor)
+    return pd.DataFrame(stats, index=pd.Index(names), columns=STAT_COLUMNS)
+
+
+def compound_annual_returns(prices, index=None, names=None):
+    """
+    연도별 수익률(%)을 모든 전략에 대해 한 번에 계산하는 함수입니다.
+    일간 수익률을 연도별로 복리 누적한 값으로,
+    기존 calculate_annual_returns의 groupby(...).prod() 결과와 같습니다.
+
+    Parameters:
+        prices (pandas.DataFrame 또는 numpy.ndarray): 자산곡선 (시점 x 전략)
+        index (pandas.DatetimeIndex): prices가 NumPy 배열일 때의 날짜
+        names (list): prices가 NumPy 배열일 때의 전략 이름
+
+    Returns:
+        pandas.DataFrame: 행은 연도, 열은 전략 (단위: %)
+    """
+    values, index, names = _as_matrix(prices, index, names)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        growth = values[1:] / values[:-1]
+    growth = np.where(np.isfinite(growth), growth, 1.0)
+
+    # 연도가 바뀌는 지점마다 (1 + 일간수익률)을 곱해 누적 (첫 행은 수익률이 없으므로 1)
+    growth = np.vstack([np.ones((1, values.shape[1])), growth])
+    years = np.asarray(index.year)
+    year_starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+    yearly = (np.multiply.reduceat(growth, year_starts, axis=0) - 1) * 100
+
+    return pd.DataFrame(yearly, index=pd.Index(years[year_starts]), columns=names)
+
+
+class StreamingStats:
+    """
+    자산곡선을 구간별로 나눠 받아 calculate_stats와 같은 지표를 계산하는 누적기입니다.
+    전체 곡선을 메모리에 두지 않고 시작/직전 값, 최고점, 최대낙폭, 일간 수익률의 개수·평균·편차제곱합,
+    연말 값만 보관하므로 수십 년치 분봉 곡선도 일정한 메모리로 계산할 수 있습니다.
+    구간은 시간 순서대로 넘겨야 하며, 모든 행에 모든 전략의 값이 있어야 합니다.
+
+    사용법: stats = StreamingStats(['RSI Mean Reversion', 'Buy & Hold'])
+            for chunk in chunks:
+                stats.update(chunk)
+            print(stats.result())
+
+    Parameters:
+        names (list): 전략 이름 (열 순서)
+        annualization_factor (int): 일간 지표 연환산 계수 (기본 252)
+    """
+
+    def __init__(self, names, annualization_factor=TRADING_DAYS):
+        self.names = list(names)
+        self.annualization_factor = annualization_factor
+        self.first_value = None
+        self.first_time = None
+        self.prev_value = None
+        self.last_time = None
+        self.peak = None
+        self.max_drawdown = None
+        self.count = 0
+        self.mean = np.zeros(len(self.names))
+        self.m2 = np.zeros(len(self.names))
+        self.year_values = []   # 마지막 해를 뺀 각 연도의 연말 값
+        self.year = None
+        self._pending = None    # 같은 날 행이 다음 구간에 더 올 수 있어 보류한 마지막 행 (값, 시각)
+
+    def update(self, prices, index=None):
+        """
+        다음 구간의 자산곡선을 반영합니다.
+
+        Parameters:
+            prices (pandas.DataFrame 또는 numpy.ndarray): 자산곡선 구간 (시점 x 전략)
+            index (pandas.DatetimeIndex): prices가 NumPy 배열일 때의 날짜
+        """
+        values, index, _ = _as_matrix(prices, index, self.names)
+        if len(values) == 0:
+            return
+        if self._pending is not None:
+            # 하루의 마지막 값만 쓰므로 구간 경계의 날짜가 같으면 앞 구간의 마지막 행은 버립니다
+            pending_value, pending_time = self._pending
+            if pending_time.normalize() != index[0].normalize():
+                self._process(pending_value[None, :], pd.DatetimeIndex([pending_time]))
+        self._process(values[:-1], index[:-1])
+        self._pending = (values[-1], index[-1])
+
+    def _process(self, values, index):
+        """날짜가 확정된 행들을 누적합니다."""
+        if len(values) == 0:
+            return
+        if self.first_value is None:
+            self.first_value = values[0]
+            self.first_time = index[0]
+            self.peak = values[0]
+            self.max_drawdown = np.zeros(len(self.names))
+            self.year = index[0].year
+            self.prev_value = values[0]
+            returns = values[1:] / values[:-1] - 1
+        else:
+            returns = values / np.vstack([self.prev_value[None, :], values[:-1]]) - 1
+
+        if len(returns):
+            # 구간별 평균/편차제곱합을 합치는 방식 (Chan 등의 병렬 분산 공식)
+            n = len(returns)
+            mean = returns.mean(axis=0)
+            m2 = ((returns - mean) ** 2).sum(axis=0)
+            total = self.count + n
+            delta = mean - self.mean
+            self.m2 = self.m2 + m2 + delta ** 2 * self.count * n / total
+            self.mean = self.mean + delta * n / total
+            self.count = total
+
+        peak = np.maximum.accumulate(np.vstack([self.peak[None, :], values]), axis=0)[1:]
+        self.max_drawdown = np.minimum(self.max_drawdown, (values / peak - 1).min(axis=0))
+        self.peak = peak[-1]
+
+        years = np.asarray(index.year)
+        if years[0] != self.year:
+            self.year_values.append(self.prev_value)
+        for i in np.flatnonzero(years[1:] != years[:-1]):
+            self.year_values.append(values[i])
+        self.year = years[-1]
+        self.prev_value = values[-1]
+        self.last_time = index[-1]
+
+    def result(self):
+        """
+        지금까지 받은 구간 전체의 성과지표를 계산합니다.
+
+        Returns:
+            pandas.DataFrame: 행은 전략, 열은 STAT_COLUMNS (calculate_stats와 같은 형식)
+        """
+        if self._pending is not None:
+            pending_value, pending_time = self._pending
+            self._process(pending_value[None, :], pd.DatetimeIndex([pending_time]))
+            self._pending = None
+        n_cols = len(self.names)
+        if self.first_value is None:
+            return pd.DataFrame(np.nan, index=pd.Index(self.names), columns=STAT_COLUMNS)
+
+        af = self.annualization_factor
+        years = (self.last_time - self.first_time).total_seconds() / SECONDS_PER_YEAR
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            growth = self.prev_value / self.first_value
+            cagr = growth ** (1 / years) - 1 if years > 0 else np.full(n_cols, np.nan)
+            if self.count >= 2:
+                daily_std = np.sqrt(self.m2 / (self.count - 1))
+                daily_sharpe = np.where(daily_std > 0, self.mean / daily_std, np.nan) * np.sqrt(af)
+                daily_mean = self.mean * af
+                daily_vol = daily_std * np.sqrt(af)
+            else:
+                daily_mean = daily_vol = daily_sharpe = np.full(n_cols, np.nan)
+
+            # 연간 수익률 (연말 값 기준, 첫 해 제외)
+            year_prices = np.vstack(self.year_values + [self.prev_value])
+            yearly_returns = year_prices[1:] / year_prices[:-1] - 1
+            yearly_mean = yearly_returns.mean(axis=0) if len(yearly_returns) else np.full(n_cols, np.nan)
+            yearly_vol = _nanstd(yearly_returns)
+            yearly_sharpe = np.where(yearly_vol > 0, yearly_mean / yearly_vol, np.nan)
+
+            stats = {
+                'total_return': growth - 1,
+                'cagr': cagr,
+                'daily_mean': daily_mean,
+                'daily_vol': daily_vol,
+                'daily_sharpe': daily_sharpe,
+                'max_drawdown': self.max_drawdown,
+                'calmar': cagr / np.abs(self.max_drawdown),
+                'yearly_mean': yearly_mean,
+                'yearly_vol': yearly_vol,
+                'yearly_sharpe': yearly_sharpe,
+            }
+        return pd.DataFrame(stats, index=pd.Index(self.names), columns=STAT_COLUMNS)
@@ -0,0 +1,353 @@
+# StockTrade24.com
+# 전략/포트폴리오 스크립트 목록
+#
+# Strategy_1~5 스크립트의 지표 계산 함수, bt.Algo 클래스, 기본 파라미터와
+# 포트폴리오 스크립트의 티커/가중치를 한곳에 모아 두어 다른 도구(리더보드, 배치 실행 등)가
+# 스크립트를 수정하지 않고도 원하는 종목에 전략을 적용할 수 있게 합니다.
+
+import importlib
+import importlib.util
+import os
+
+import pandas as pd
+
+# 전략 키별 설정
+#   module: 전략이 정의된 스크립트 모듈
+#   name: 백테스트 결과에 표시되는 전략 이름 (스크립트와 동일)
+#   ticker / start_date / end_date: 스크립트에 고정되어 있던 기본 종목과 기간
+#   indicators / indicator_params: 지표 계산 함수와 기본 파라미터
+#   algo / algo_params: bt.Algo 클래스와 기본 파라미터
+STRATEGIES = {
+    'rsi': {
+        'module': 'Strategy_1_RSI',
+        'name': 'RSI Mean Reversion',
+        'ticker': 'TQQQ',
+        'start_date': '2018-01-22',
+        'end_date': '2024-11-22',
+        'indicators': 'calculate_rsi',
+        'indicator_params': {'length': 14},
+        'algo': 'RSIStrategy',
+        'algo_params': {'rsi_upper': 70, 'rsi_lower': 30},
+    },
+    'macd': {
+        'module': 'Strategy_2_MACD',
+        'name': 'MACD Strategy',
+        'ticker': 'AGG',
+        'start_date': '2018-01-01',
+        'end_date': '2024-11-30',
+        'indicators': 'calculate_macd',
+        'indicator_params': {'fast': 12, 'slow': 26, 'signal': 9},
+        'algo': 'MACDStrategy',
+        'algo_params': {},
+    },
+    'bollinger': {
+        'module': 'Strategy_3_Bollinger',
+        'name': 'Bollinger Bands Strategy',
+        'ticker': 'TQQQ',
+        'start_date': '2018-01-01',
+        'end_date': '2024-11-30',
+        'indicators': 'calculate_bbands',
+        'indicator_params': {'length': 20, 'std': 2.0},
+        'algo': 'BollingerStrategy',
+        'algo_params': {'bb_length': 20, 'bb_std': 2.0},
+    },
+    'sma': {
+        'module': 'Strategy_4_SMA',
+        'name': 'MA Crossover',
+        'ticker': '005930.KS',
+        'start_date': '2020-01-01',
+        'end_date': '2024-02-29',
+        'indicators': 'calculate_sma',
+        'indicator_params': {'short_period': 20, 'long_period': 60},
+        'algo': 'MACrossStrategy',
+        'algo_params': {'short_period': 20, 'long_period': 60},
+    },
+    'volmomen': {
+        'module': 'Strategy_5_volMomen',
+        'name': 'Volume Weighted Momentum',
+        'ticker': 'BND',
+        'start_date': '2018-01-01',
+        'end_date': '2024-12-01',
+        'indicators': 'calculate_signals',
+        'indicator_params': {'momentum_period': 20, 'volume_period': 20, 'weighting_factor': 0.5},
+        'algo': 'VolumeWeightedMomentumStrategy',
+        'algo_params': {'momentum_period': 20, 'volume_period': 20, 'weighting_factor': 0.5},
+    },
+}
+
+
+# 포트폴리오 키별 설정
+#   script: 포트폴리오 스크립트 파일 (파일 이름에 공백이 있어 경로로 불러옵니다)
+#   names: 시장별 백테스트 이름 (스크립트와 동일)
+#   start_date / end_date: 스크립트의 기본 기간 (end_date가 None이면 오늘까지)
+#   fill: 결측치 처리 방식 (스크립트의 download_data와 동일)
+PORTFOLIOS = {
+    'allweather': {
+        'script': 'Strategy_Port_2_All Weather.py',
+        'names': {'US': 'US Inflation Portfolio', 'KR': 'KR Inflation Portfolio'},
+        'start_date': '2023-01-01',
+        'end_date': None,
+        'fill': 'ffill',
+    },
+    'kenfisher': {
+        'script': 'Strategy_Port_3_Ken fisher.py',
+        'names': {'US': 'US Global ETF Portfolio', 'KR': 'KR Global ETF Portfolio'},
+        'start_date': '2018-01-01',
+        'end_date': '2024-11-22',
+        'fill': 'ffill_bfill',
+    },
+    'peterlynch': {
+        'script': 'Stratesy_Port_1_Peter Linchy.py',
+        'names': {'US': 'US ETF Portfolio', 'KR': 'KR ETF Portfolio'},
+        'start_date': '2018-01-01',
+        'end_date': '2024-11-22',
+        'fill': 'ffill',
+    },
+}
+
+# 포트폴리오 시장별 거래소 (Trading_calendar 달력 이름)
+MARKET_EXCHANGES = {'US': 'NYSE', 'KR': 'KRX'}
+
+
+def get_spec(key):
+    """전략 키에 해당하는 설정을 반환합니다."""
+    if key not in STRATEGIES:
+        raise ValueError(f"알 수 없는 전략입니다: {key} (사용 가능: {', '.join(STRATEGIES)})")
+    return STRATEGIES[key]
+
+
+def load_strategy_module(key):
+    """전략 스크립트를 모듈로 불러옵니다. (스크립트의 백테스트는 실행되지 않음)"""
+    return importlib.import_module(get_spec(key)['module'])
+
+
+def split_params(key, params):
+    """
+    하나로 받은 파라미터를 지표용/전략용으로 나눕니다.
+    두 곳 모두에서 쓰는 이름(예: short_period)은 양쪽에 모두 적용합니다.
+
+    Returns:
+        tuple: (indicator_params, algo_params)
+    """
+    spec = get_spec(key)
+    indicator_params = dict(spec['indicator_params'])
+    algo_params = dict(spec['algo_params'])
+    for name, value in (params or {}).items():
+        matched = False
+        if name in indicator_params:
+            indicator_params[name] = value
+            matched = True
+        if name in algo_params:
+            algo_params[name] = value
+            matched = True
+        if not matched:
+            raise ValueError(f"{key} 전략에 없는 파라미터입니다: {name}")
+    return indicator_params, algo_params
+
+
+def prepare_data(key, ohlcv, **indicator_params):
+    """
+    OHLCV 데이터에 전략이 사용하는 지표 컬럼을 계산해 붙입니다.
+
+    Parameters:
+        key (str): 전략 키 ('rsi', 'macd', 'bollinger', 'sma', 'volmomen')
+        ohlcv (pandas.DataFrame): OHLCV 데이터
+        indicator_params: 지표 파라미터 (생략하면 스크립트 기본값)
+
+    Returns:
+        pandas.DataFrame: Close와 지표 컬럼이 포함된 데이터
+    """
+    spec = get_spec(key)
+    module = load_strategy_module(key)
+    params = dict(spec['indicator_params'], **indicator_params)
+    return getattr(module, spec['indicators'])(ohlcv.copy(), **params)
+
+
+def create_backtest(key, data, name=None, **algo_params):
+    """
+    지표가 계산된 데이터로 전략 백테스트 객체를 만듭니다.
+
+    Parameters:
+        key (str): 전략 키
+        data (pandas.DataFrame): prepare_data 결과
+        name (str): 백테스트 이름 (생략하면 스크립트의 전략 이름)
+        algo_params: 전략 파라미터 (생략하면 스크립트 기본값)
+
+    Returns:
+        bt.Backtest: 종가만 자산으로 사용하는 백테스트
+    """
+    import bt
+
+    spec = get_spec(key)
+    module = load_strategy_module(key)
+    params = dict(spec['algo_params'], **algo_params)
+    algo = getattr(module, spec['algo'])(data=data, **params)
+    strategy = bt.Strategy(name or spec['name'],
+        [bt.algos.SelectAll(),
+         algo,
+         bt.algos.Rebalance()])
+    return bt.Backtest(strategy, data[['Close']])
+
+
+def buy_and_hold(data, name='Buy & Hold'):
+    """단순 매수후 보유 벤치마크 백테스트 (각 스크립트의 buy_and_hold와 동일)"""
+    import bt
+
+    strategy = bt.Strategy(name, [
+        bt.algos.SelectAll(),
+        bt.algos.WeighEqually(),
+        bt.algos.RunOnce(),
+        bt.algos.Rebalance()
+    ])
+    return bt.Backtest(strategy, data[['Close']])
+
+
+def run_strategy(key, ohlcv, params=None, store=None):
+    """
+    한 종목에 대해 전략과 매수후 보유 벤치마크를 함께 백테스트합니다.
+    store를 넘기면 같은 전략 코드/파라미터/데이터의 결과가 저장되어 있을 때 다시 계산하지 않습니다.
+
+    사용법: results = run_strategy('rsi', ohlcv, {'rsi_upper': 75})
+
+    Parameters:
+        key (str): 전략 키
+        ohlcv (pandas.DataFrame): OHLCV 데이터
+        params (dict): 전략/지표 파라미터 변경값
+        store (Result_store.ResultStore): 결과 저장소 (생략하면 항상 계산)
+
+    Returns:
+        bt.backtest.Result (store가 있으면 Result_store.StoredRun): 전략, Buy & Hold 순서
+    """
+    from Backtest_parallel import run_parallel
+
+    indicator_params, algo_params = split_params(key, params)
+
+    def run():
+        data = prepare_data(key, ohlcv, **indicator_params)
+        return run_parallel(create_backtest(key, data, **algo_params), buy_and_hold(data))
+
+    if store is None:
+        return run()
+
+    from Result_store import describe
+
+    spec = get_spec(key)
+    module = load_strategy_module(key)
+    strategy = f"{describe(getattr(module, spec['algo']))}+{describe(getattr(module, spec['indicators']))}"
+    return store.fetch_or_run(strategy, dict(indicator_params, **algo_params), None, ohlcv, run)
+
+
+def get_portfolio_spec(key):
+    """포트폴리오 키에 해당하는 설정을 반환합니다."""
+    if key not in PORTFOLIOS:
+        raise ValueError(f"알 수 없는 포트폴리오입니다: {key} (사용 가능: {', '.join(PORTFOLIOS)})")
+    return PORTFOLIOS[key]
+
+
+def load_portfolio_module(key):
+    """포트폴리오 스크립트를 모듈로 불러옵니다. (스크립트의 백테스트는 실행되지 않음)"""
+    module_name = f"portfolio_{key}"
+    module = importlib.sys.modules.get(module_name)
+    if module is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), get_portfolio_spec(key)['script'])
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        importlib.sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+def portfolio_weights(key):
+    """
+    포트폴리오 스크립트에 정의된 시장별 가중치를 반환합니다.
+
+    Returns:
+        dict: {'US': pandas.Series, 'KR': pandas.Series}
+    """
+    module = load_portfolio_module(key)
+    us_weights, kr_weights = module.create_weights(module.TICKERS)
+    return {'US': us_weights, 'KR': kr_weights}
+
+
+def portfolio_yahoo_tickers(key):
+    """
+    포트폴리오의 컬럼 이름과 야후 파이낸스 티커를 짝지어 반환합니다.
+
+    Returns:
+        dict: {컬럼 이름(예: 'KR_305080'): 야후 티커(예: '305080.KS')}
+    """
+    tickers = load_portfolio_module(key).TICKERS
+    columns = {}
+    for market, suffix in (('US', ''), ('KR', '.KS')):
+        for value in tickers[market].values():
+            for ticker in (value if isinstance(value, list) else [value]):
+                columns[f"{market}_{ticker}"] = f"{ticker}{suffix}"
+    return columns
+
+
+def market_prices(data, market):
+    """
+    두 시장을 합친 가격 데이터에서 한 시장의 컬럼만 골라 그 시장 거래소의 거래일에 맞춥니다.
+    상대 시장만 열린 날의 행은 지우고, 거래일의 빈 칸만 직전 값으로 채웁니다.
+
+    사용법: us_data = market_prices(data, 'US')
+
+    Parameters:
+        data (pandas.DataFrame): 컬럼이 'US_티커', 'KR_티커'인 가격 데이터
+        market (str): 'US' 또는 'KR'
+
+    Returns:
+        pandas.DataFrame: 해당 시장 컬럼만 남은 거래일 기준 데이터
+    """
+    from Trading_calendar import align_to_calendar
+
+    columns = [column for column in data.columns if str(column).startswith(f"{market}_")]
+    return align_to_calendar(data[columns], MARKET_EXCHANGES[market])
+
+
+def load_portfolio_prices(key, start_date=None, end_date=None, cache_dir=None, market=None):
+    """
+    포트폴리오 스크립트의 download_data와 같은 형태의 가격 데이터를 캐시에서 만듭니다.
+    (수정주가 종가 기준, 각 시장의 현지 날짜 사용)
+
+    market을 주면 그 시장 종목만 골라 해당 거래소 거래일에 맞춘 데이터를 반환합니다.
+    두 시장 날짜를 합치지 않으므로 상대 시장 휴장일에 채워 넣은 가짜 행이 생기지 않습니다.
+
+    Parameters:
+        market (str): 'US' 또는 'KR' (생략하면 두 시장을 합친 스크립트와 같은 데이터)
+
+    Returns:
+        pandas.DataFrame: 컬럼이 'US_티커', 'KR_티커'인 가격 데이터
+    """
+    from Data_cache import CACHE_DIR, load_ohlcv
+
+    spec = get_portfolio_spec(key)
+    start_date = start_date or spec['start_date']
+    end_date = end_date or spec['end_date'] or (pd.Timestamp.now() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+    tickers = portfolio_yahoo_tickers(key)
+    if market is not None:
+        tickers = {column: t for column, t in tickers.items() if column.startswith(f"{market}_")}
+
+    closes = {}
+    for column, yahoo_ticker in tickers.items():
+        try:
+            close = load_ohlcv(yahoo_ticker, start_date, end_date, cache_dir or CACHE_DIR)['Close']
+        except Exception as e:
+            print(f"Error downloading {yahoo_ticker}: {e}")
+            continue
+        if close.index.tz is not None:
+            close.index = close.index.tz_localize(None)
+        closes[column] = close
+
+    if not closes:
+        raise ValueError("No data was downloaded. Please check the ticker symbols.")
+
+    data = pd.DataFrame(closes).sort_index()
+    if market is not None:
+        data = market_prices(data, market)
+    else:
+        data = data.ffill()
+    if spec['fill'] == 'ffill_bfill':
+        data = data.bfill()
+    return data
@@ -0,0 +1,288 @@
+# StockTrade24.com
+# 워크포워드 최적화
+#
+# 스크립트의 RSI 70/30, 이동평균 20/60, 볼린저밴드 20/2 같은 파라미터는
+# 성과를 보고하는 기간과 같은 기간에서 고른 값이라 실전 성과를 보여주지 못합니다.
+# 이 모듈은 전체 기간을 학습/검증 구간이 이어지는 여러 폴드로 나누고,
+# 폴드마다 학습 구간에서 가장 좋은 파라미터를 고른 뒤 바로 다음 검증 구간에서만 성과를 측정합니다.
+# - 지표는 파라미터 조합별로 전체 기간에 한 번만 계산해 공유 메모리 패널에 올리고
+#   모든 폴드가 그 패널을 잘라서 씁니다. (지표는 과거 값만 사용하므로 잘라 써도 결과가 같음)
+# - 폴드는 여러 프로세스에서 병렬로 실행합니다.
+#
+# 사용법:
+#   python Backtest_walkforward.py rsi --ticker TQQQ
+#   python Backtest_walkforward.py sma --train-bars 756 --test-bars 126 --grid short_period=10,20 --grid long_period=50,100
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Backtest_stats import STAT_COLUMNS, calculate_stats
+from Backtest_strategies import STRATEGIES, create_backtest, buy_and_hold, get_spec, prepare_data, split_params
+from Data_cache import CACHE_DIR, load_ohlcv
+from Price_panel import SharedPricePanel, attach_panel
+
+# 전략별 기본 탐색 범위 (스크립트 기본값을 포함)
+PARAM_GRIDS = {
+    'rsi': {'rsi_upper': [65, 70, 75, 80], 'rsi_lower': [20, 25, 30, 35]},
+    'macd': {'fast': [8, 12, 16], 'slow': [21, 26, 34], 'signal': [7, 9]},
+    'bollinger': {'bb_length': [15, 20, 25], 'bb_std': [1.5, 2.0, 2.5]},
+    'sma': {'short_period': [10, 20, 30], 'long_period': [50, 60, 100, 120]},
+    'volmomen': {'momentum_period': [10, 20, 40], 'volume_period': [10, 20], 'weighting_factor': [0.3, 0.5, 0.7]},
+}
+
+# 볼린저밴드 전략은 Algo와 지표의 파라미터 이름이 달라 함께 맞춰 줍니다
+LINKED_PARAMS = {
+    'bollinger': {'bb_length': 'length', 'bb_std': 'std'},
+}
+
+_PANEL = None  # 작업 프로세스가 붙어 있는 지표 패널
+
+
+def make_folds(n_bars, train_bars=504, test_bars=126, step=None, anchored=False):
+    """
+    학습/검증 구간 위치를 만듭니다. 검증 구간은 서로 겹치지 않고 이어집니다.
+
+    Parameters:
+        n_bars (int): 전체 봉 개수
+        train_bars (int): 학습 구간 길이 (기본 약 2년)
+        test_bars (int): 검증 구간 길이 (기본 약 6개월)
+        step (int): 다음 폴드로 이동하는 봉 수 (생략하면 test_bars)
+        anchored (bool): True면 학습 구간 시작을 처음으로 고정 (구간이 점점 길어짐)
+
+    Returns:
+        list: [(train_start, train_end, test_start, test_end), ...] (end는 포함하지 않음)
+    """
+    step = step or test_bars
+    folds = []
+    train_end = train_bars
+    while train_end + test_bars <= n_bars:
+        train_start = 0 if anchored else train_end - train_bars
+        folds.append((train_start, train_end, train_end, train_end + test_bars))
+        train_end += step
+    if not folds:
+        raise ValueError(f"데이터가 너무 짧습니다: {n_bars}봉 < 학습 {train_bars} + 검증 {test_bars}")
+    return folds
+
+
+def expand_grid(key, grid=None):
+    """
+    탐색 범위의 모든 조합을 만들고 지표용/전략용 파라미터로 나눕니다.
+
+    Returns:
+        list: [(params, indicator_params, algo_params), ...]
+    """
+    grid = grid or PARAM_GRIDS[key]
+    names = list(grid)
+    combos = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        indicator_params, algo_params = split_params(key, params)
+        for algo_name, indicator_name in LINKED_PARAMS.get(key, {}).items():
+            if algo_name in params:
+                indicator_params[indicator_name] = params[algo_name]
+        combos.append((params, indicator_params, algo_params))
+    return combos
+
+
+def build_indicator_panel(key, ohlcv, combos):
+    """
+    지표 파라미터 조합별로 전체 기간 지표를 한 번씩 계산해 하나의 패널로 합칩니다.
+
+    Returns:
+        tuple: (패널 DataFrame (컬럼: (지표 id, 컬럼)), 조합별 지표 id 목록)
+    """
+    frames = {}
+    ids = {}
+    combo_ids = []
+    for _, indicator_params, _ in combos:
+        signature = tuple(sorted(indicator_params.items()))
+        if signature not in ids:
+            ids[signature] = f"ind{len(ids)}"
+            frames[ids[signature]] = prepare_data(key, ohlcv, **indicator_params).astype(float)
+        combo_ids.append(ids[signature])
+    panel = pd.concat(frames, axis=1, names=['indicator', 'column'])
+    if panel.index.tz is not None:
+        panel.index = panel.index.tz_localize(None)
+    return panel, combo_ids
+
+
+def _equity(results, index):
+    """
+    백테스트별 평가금액 지수를 구간 전체(index)에 맞춰 꺼냅니다.
+    bt의 results.prices는 첫 매매 하루 전부터 잘려 있으므로 전략 객체의 prices를 사용하고,
+    첫 매매 전 날짜는 시작값 100으로 채웁니다.
+    """
+    frame = pd.DataFrame({name: bkt.strategy.prices for name, bkt in results.backtests.items()})
+    return frame.reindex(index).ffill().fillna(100.0)
+
+
+def _score(results, index):
+    """bt 결과에서 전략(첫 번째)과 매수후 보유(두 번째)의 성과지표를 꺼냅니다. (index 구간 전체 기준)"""
+    stats = calculate_stats(_equity(results, index))
+    return stats.iloc[0], (stats.iloc[1] if len(stats) > 1 else None)
+
+
+def _backtest(key, data, algo_params, with_benchmark=False):
+    import bt
+
+    backtests = [create_backtest(key, data, **algo_params)]
+    if with_benchmark:
+        backtests.append(buy_and_hold(data))
+    return bt.run(*backtests)
+
+
+def run_fold(key, fold_number, fold, combos, combo_ids, objective='daily_sharpe'):
+    """
+    폴드 하나를 실행합니다. 학습 구간에서 objective가 가장 높은 조합을 골라 검증 구간에서 평가합니다.
+
+    Returns:
+        dict: 폴드 결과 (선택된 파라미터, 학습 점수, 검증 성과, 검증 구간 평가금액)
+    """
+    train_start, train_end, test_start, test_end = fold
+    row = {'fold': fold_number}
+    try:
+        best = None
+        for (params, _, algo_params), indicator_id in zip(combos, combo_ids):
+            train = _PANEL[indicator_id].iloc[train_start:train_end].dropna(subset=['Close'])
+            stats, _ = _score(_backtest(key, train, algo_params), train.index)
+            score = stats[objective]
+            if np.isfinite(score) and (best is None or score > best[0]):
+                best = (score, params, algo_params, indicator_id)
+        if best is None:
+            raise ValueError("학습 구간에서 유효한 점수를 낸 파라미터가 없습니다.")
+
+        score, params, algo_params, indicator_id = best
+        test = _PANEL[indicator_id].iloc[test_start:test_end].dropna(subset=['Close'])
+        results = _backtest(key, test, algo_params, with_benchmark=True)
+        test_stats, hold_stats = _score(results, test.index)
+
+        row.update({
+            'train_start': _PANEL.index[train_start],
+            'train_end': _PANEL.index[train_end - 1],
+            'test_start': test.index[0],
+            'test_end': test.index[-1],
+            'params': params,
+            f'train_{objective}': score,
+        })
+        for col in STAT_COLUMNS:
+            row[f'test_{col}'] = test_stats[col]
+        row[f'bh_test_{objective}'] = hold_stats[objective]
+        row['bh_test_total_return'] = hold_stats['total_return']
+        row['equity'] = _equity(results, test.index).iloc[:, 0]
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def _init_worker(handle):
+    """작업 프로세스 시작 시 공유 지표 패널에 한 번만 붙습니다."""
+    global _PANEL
+    _PANEL = attach_panel(handle)
+
+
+def _run_fold_job(job):
+    return run_fold(*job)
+
+
+def walk_forward(key, ohlcv, grid=None, train_bars=504, test_bars=126, step=None, anchored=False,
+                 objective='daily_sharpe', workers=None):
+    """
+    워크포워드 최적화를 실행하는 함수입니다.
+
+    사용법: folds, oos = walk_forward('rsi', ohlcv, {'rsi_upper': [70, 75], 'rsi_lower': [25, 30]})
+
+    Parameters:
+        key (str): 전략 키 ('rsi', 'macd', 'bollinger', 'sma', 'volmomen')
+        ohlcv (pandas.DataFrame): OHLCV 데이터
+        grid (dict): {파라미터 이름: 후보 값 목록} (생략하면 PARAM_GRIDS)
+        train_bars / test_bars / step / anchored: make_folds 인자
+        objective (str): 학습 구간에서 최대화할 지표 (STAT_COLUMNS 중 하나)
+        workers (int): 병렬 프로세스 수 (생략하면 CPU 코어 수)
+
+    Returns:
+        tuple: (폴드별 결과 DataFrame, 검증 구간을 이어 붙인 평가금액 지수 Series)
+    """
+    global _PANEL
+    if objective not in STAT_COLUMNS:
+        raise ValueError(f"objective는 {STAT_COLUMNS} 중 하나여야 합니다: {objective}")
+
+    combos = expand_grid(key, grid)
+    panel, combo_ids = build_indicator_panel(key, ohlcv, combos)
+    folds = make_folds(len(panel), train_bars, test_bars, step, anchored)
+    print(f"{len(folds)}개 폴드 x {len(combos)}개 조합 (지표 계산 {len(set(combo_ids))}회)")
+
+    jobs = [(key, i, fold, combos, combo_ids, objective) for i, fold in enumerate(folds)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        _PANEL = panel
+        try:
+            rows = [_run_fold_job(job) for job in jobs]
+        finally:
+            _PANEL = None
+    else:
+        with SharedPricePanel(panel) as shared:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared.handle,)) as pool:
+                rows = list(pool.map(_run_fold_job, jobs))
+
+    table = pd.DataFrame(rows).set_index('fold')
+    if 'error' in table.columns:
+        failed = table['error'].notna()
+        if failed.any():
+            print(f"\n{failed.sum()}개 폴드에서 오류가 발생했습니다:")
+            print(table.loc[failed, 'error'])
+        table = table[~failed].drop(columns='error')
+
+    # 검증 구간 수익률을 이어 붙여 하나의 표본 외(out-of-sample) 곡선을 만듭니다
+    returns = [equity.pct_change().iloc[1:] for equity in table.pop('equity')]
+    oos = (1 + pd.concat(returns)).cumprod() * 100 if returns else pd.Series(dtype=float)
+    oos = oos[~oos.index.duplicated(keep='first')]
+    oos.name = f"{get_spec(key)['name']} (Walk-Forward)"
+    return table, oos
+
+
+def _parse_grid(items):
+    """'이름=값1,값2' 형식의 탐색 범위 목록을 dict로 바꿉니다."""
+    grid = {}
+    for item in items or []:
+        name, values = item.split('=', 1)
+        parsed = []
+        for value in values.split(','):
+            try:
+                parsed.append(int(value))
+            except ValueError:
+                parsed.append(float(value))
+        grid[name] = parsed
+    return grid or None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='워크포워드 최적화')
+    parser.add_argument('strategy', choices=sorted(STRATEGIES), help='전략 키')
+    parser.add_argument('--ticker', help='종목 티커 (기본: 스크립트 설정값)')
+    parser.add_argument('--start', help='시작일 (기본: 스크립트 설정값)')
+    parser.add_argument('--end', help='종료일 (기본: 스크립트 설정값)')
+    parser.add_argument('--grid', action='append', help='탐색 범위 (예: rsi_upper=65,70,75)')
+    parser.add_argument('--train-bars', type=int, default=504, help='학습 구간 봉 개수')
+    parser.add_argument('--test-bars', type=int, default=126, help='검증 구간 봉 개수')
+    parser.add_argument('--anchored', action='store_true', help='학습 구간 시작을 처음으로 고정')
+    parser.add_argument('--objective', default='daily_sharpe', help='학습 구간 최적화 지표')
+    parser.add_argument('--workers', type=int, help='병렬 프로세스 수')
+    args = parser.parse_args()
+
+    spec = get_spec(args.strategy)
+    ohlcv = load_ohlcv(args.ticker or spec['ticker'], args.start or spec['start_date'],
+                       args.end or spec['end_date'], CACHE_DIR)
+    folds, oos = walk_forward(args.strategy, ohlcv, _parse_grid(args.grid), args.train_bars,
+                              args.test_bars, anchored=args.anchored, objective=args.objective,
+                              workers=args.workers)
+
+    print(f"\n===== {spec['name']} 워크포워드 결과 =====")
+    print(folds.round(4).to_string())
+    print("\n===== 표본 외 성과 (검증 구간 연결) =====")
+    print(calculate_stats(oos.to_frame()).round(4).T.to_string())
@@ -0,0 +1,258 @@
+# StockTrade24.com
+# 오프라인 백테스트 벤치마크
+#
+# Synthetic_market의 가상 데이터로 단일종목 전략 5개(RSI, MACD, 볼린저밴드, 이동평균, 거래량 모멘텀)와
+# 포트폴리오 3개(올웨더, 켄 피셔, 피터 린치)의 백테스트 시간을 측정합니다.
+# - 봉 개수 변화: 1종목 x 1천/1만/100만 봉
+# - 종목 수 변화: 1천 봉 x 1/10/100/1,000종목 (전략은 종목별 백테스트, 포트폴리오는 자산 수)
+# 각 측정은 새 프로세스에서 실행해 실행 시간과 최대 메모리(RSS)를 기록하고,
+# 저장된 기준값(baseline)보다 느려지거나 메모리를 더 쓰면 REGRESSION으로 표시합니다.
+# 작은 크기의 결과로 추정한 시간이 --max-seconds를 넘는 측정은 건너뜁니다.
+#
+# 사용법:
+#   python Benchmark_suite.py --save-baseline                    # 기준값 저장
+#   python Benchmark_suite.py                                    # 기준값과 비교 (느려지면 종료 코드 1)
+#   python Benchmark_suite.py --cases rsi allweather --bars 1000 10000 --tickers 1 10
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Backtest_strategies import PORTFOLIOS, STRATEGIES
+from Synthetic_market import generate_prices, generate_universe
+
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+DEFAULT_BARS = [1000, 10000, 1000000]
+DEFAULT_TICKERS = [1, 10, 100, 1000]
+TICKER_SWEEP_BARS = 1000  # 종목 수를 늘릴 때 종목별 봉 개수
+SEED = 20240101
+
+
+def _peak_rss_mb():
+    """이 프로세스의 최대 메모리 사용량(MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024  # macOS는 바이트, 리눅스는 KB
+
+
+def build_cases(names=None, bars=DEFAULT_BARS, tickers=DEFAULT_TICKERS):
+    """
+    측정할 항목 목록을 만듭니다.
+
+    Parameters:
+        names (list): 전략/포트폴리오 키 (생략하면 전체)
+        bars (list): 1종목 기준으로 측정할 봉 개수
+        tickers (list): TICKER_SWEEP_BARS 봉 기준으로 측정할 종목 수
+
+    Returns:
+        list: 측정 항목 dict 목록
+    """
+    names = names or list(STRATEGIES) + list(PORTFOLIOS)
+    cases = {}
+    for name in names:
+        kind = 'strategy' if name in STRATEGIES else 'portfolio'
+        if kind == 'portfolio' and name not in PORTFOLIOS:
+            raise ValueError(f"알 수 없는 전략/포트폴리오입니다: {name}")
+        sizes = [(n, None) for n in bars] + [(TICKER_SWEEP_BARS, n) for n in tickers]
+        for n_bars, n_tickers in sizes:
+            sweep = 'bars' if n_tickers is None else 'tickers'
+            if kind == 'portfolio' and n_tickers is None:
+                n_tickers = len(_portfolio_weights(name))  # 봉 개수 측정은 스크립트의 자산 수로
+            case_id = f"{name}:bars={n_bars}:tickers={n_tickers or 1}"
+            cases.setdefault(case_id, {
+                'id': case_id,
+                'kind': kind,
+                'name': name,
+                'sweep': sweep,
+                'bars': n_bars,
+                'tickers': n_tickers or 1,
+            })
+    return list(cases.values())
+
+
+def _portfolio_weights(key):
+    """포트폴리오 스크립트의 미국 시장 가중치"""
+    from Backtest_strategies import portfolio_weights
+    return portfolio_weights(key)['US']
+
+
+def _run_strategy_case(case):
+    import bt  # noqa: F401  임포트 시간은 측정에서 제외합니다
+
+    from Backtest_strategies import load_strategy_module, run_strategy
+
+    load_strategy_module(case['name'])
+    universe = generate_universe(case['tickers'], case['bars'], jump_intensity=2.0, seed=SEED)
+    start = time.perf_counter()
+    for ohlcv in universe.values():
+        run_strategy(case['name'], ohlcv)
+    return time.perf_counter() - start
+
+
+def _run_portfolio_case(case):
+    import bt
+
+    from Backtest_allocation import COMMISSIONS
+    from Backtest_strategies import load_portfolio_module
+
+    # 스크립트의 비중을 종목 수만큼 반복해 나누어 씁니다 (합계는 그대로 1)
+    base = _portfolio_weights(case['name']).to_numpy()
+    n = case['tickers']
+    repeats = np.bincount(np.arange(n) % len(base), minlength=len(base))
+    weights = np.array([base[i % len(base)] / repeats[i % len(base)] for i in range(n)])
+    prices = generate_prices(case['bars'], n_assets=n, correlation=0.3, jump_intensity=1.0, seed=SEED)
+    weights = pd.Series(weights, index=prices.columns)
+
+    module = load_portfolio_module(case['name'])
+    start = time.perf_counter()
+    strategy = module.create_strategy(case['name'], weights)
+    bt.run(bt.Backtest(strategy, prices, commissions=COMMISSIONS['US']))
+    return time.perf_counter() - start
+
+
+def run_case(case):
+    """
+    측정 항목 하나를 실행하고 결과를 반환합니다. (데이터 생성 시간은 제외)
+
+    Returns:
+        dict: {'id', 'wall', 'peak_mb', 'error'}
+    """
+    result = {'id': case['id'], 'wall': np.nan, 'peak_mb': np.nan, 'error': None}
+    try:
+        runner = _run_strategy_case if case['kind'] == 'strategy' else _run_portfolio_case
+        result['wall'] = runner(case)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['peak_mb'] = _peak_rss_mb()
+    return result
+
+
+def _run_isolated(case):
+    """새 프로세스에서 측정해 이전 측정의 메모리 사용량이 섞이지 않게 합니다."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_case, case).result()
+
+
+def _estimate(case, done):
+    """같은 전략의 더 작은 측정 결과로 이번 측정 시간을 선형으로 추정합니다."""
+    size = case['bars'] * case['tickers']
+    best = None
+    for other, result in done:
+        if other['name'] != case['name'] or not np.isfinite(result['wall']):
+            continue
+        other_size = other['bars'] * other['tickers']
+        if other_size < size and (best is None or other_size > best[0]):
+            best = (other_size, result['wall'])
+    return None if best is None else best[1] * size / best[0]
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="UTF-8") as f:
+        return json.load(f)
+
+
+def save_baseline(report, path=BASELINE_PATH):
+    """측정 결과를 기준값으로 저장합니다. (기존 기준값에 없는 항목은 추가, 있는 항목은 갱신)"""
+    baseline = load_baseline(path)
+    for case_id, row in report.iterrows():
+        if row['status'] not in ('skipped', 'error'):
+            baseline[case_id] = {'wall': float(row['wall']), 'peak_mb': float(row['peak_mb'])}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="UTF-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def run_benchmarks(cases, baseline=None, max_seconds=600.0, tolerance=0.25, isolate=True):
+    """
+    측정 항목을 작은 것부터 실행하고 기준값과 비교한 표를 만듭니다.
+
+    Parameters:
+        cases (list): build_cases 결과
+        baseline (dict): 기준값 {측정 id: {'wall', 'peak_mb'}}
+        max_seconds (float): 추정 시간이 이보다 긴 측정은 건너뜀
+        tolerance (float): 기준값보다 이 비율 이상 느리거나 메모리를 더 쓰면 REGRESSION
+        isolate (bool): 측정마다 새 프로세스에서 실행할지 여부
+
+    Returns:
+        pandas.DataFrame: 측정 결과 (행: 측정 id)
+    """
+    baseline = baseline or {}
+    done = []
+    rows = []
+    for case in sorted(cases, key=lambda c: (c['name'], c['bars'] * c['tickers'])):
+        row = {'id': case['id'], 'name': case['name'], 'sweep': case['sweep'],
+               'bars': case['bars'], 'tickers': case['tickers']}
+        estimate = _estimate(case, done)
+        if estimate is not None and estimate > max_seconds:
+            row.update(wall=np.nan, peak_mb=np.nan, status='skipped',
+                       note=f"예상 {estimate:.0f}초 > {max_seconds:.0f}초")
+            rows.append(row)
+            continue
+
+        print(f"Running {case['id']}...", flush=True)
+        result = _run_isolated(case) if isolate else run_case(case)
+        done.append((case, result))
+        row.update(wall=result['wall'], peak_mb=result['peak_mb'])
+
+        reference = baseline.get(case['id'])
+        if result['error']:
+            row.update(status='error', note=result['error'])
+        elif reference is None:
+            row.update(status='new', note='')
+        else:
+            wall_ratio = result['wall'] / reference['wall'] if reference['wall'] else np.nan
+            memory_ratio = result['peak_mb'] / reference['peak_mb'] if reference['peak_mb'] else np.nan
+            row['wall_vs_baseline'] = wall_ratio
+            row['memory_vs_baseline'] = memory_ratio
+            if wall_ratio > 1 + tolerance or memory_ratio > 1 + tolerance:
+                row.update(status='REGRESSION', note='')
+            elif wall_ratio < 1 - tolerance:
+                row.update(status='faster', note='')
+            else:
+                row.update(status='ok', note='')
+        rows.append(row)
+
+    return pd.DataFrame(rows).set_index('id')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='오프라인 백테스트 벤치마크')
+    parser.add_argument('--cases', nargs='*', choices=sorted(STRATEGIES) + sorted(PORTFOLIOS),
+                        help='측정할 전략/포트폴리오 (기본: 전체)')
+    parser.add_argument('--bars', nargs='*', type=int, default=DEFAULT_BARS, help='1종목 기준 봉 개수')
+    parser.add_argument('--tickers', nargs='*', type=int, default=DEFAULT_TICKERS,
+                        help=f'{TICKER_SWEEP_BARS}봉 기준 종목 수')
+    parser.add_argument('--max-seconds', type=float, default=600.0, help='측정 하나의 최대 예상 시간(초)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='REGRESSION 판단 허용 비율')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='기준값 파일')
+    parser.add_argument('--save-baseline', action='store_true', help='이번 결과를 기준값으로 저장')
+    parser.add_argument('--in-process', action='store_true', help='새 프로세스 없이 측정 (메모리 값은 누적됨)')
+    parser.add_argument('--output', help='결과를 저장할 CSV 파일')
+    args = parser.parse_args()
+
+    cases = build_cases(args.cases, args.bars, args.tickers)
+    report = run_benchmarks(cases, load_baseline(args.baseline), args.max_seconds,
+                            args.tolerance, isolate=not args.in_process)
+
+    print("\n===== 벤치마크 결과 =====")
+    print(report.round(3).to_string())
+    if args.output:
+        report.to_csv(args.output)
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        print(f"\n기준값을 {args.baseline}에 저장했습니다.")
+
+    regressions = report.index[report['status'] == 'REGRESSION']
+    if len(regressions):
+        print(f"\n{len(regressions)}개 항목이 기준값보다 느려졌거나 메모리를 더 사용합니다:")
+        print("\n".join(regressions))
+        sys.exit(1)
@@ -0,0 +1,157 @@
+# StockTrade24.com
+# 주가 데이터 로컬 캐시 모듈
+#
+# 야후 파이낸스에서 받은 OHLCV 데이터를 종목별 파일로 저장해 두고
+# 같은 기간을 다시 요청하면 네트워크 없이 바로 읽어옵니다.
+# 기존 기간 뒤로 날짜만 늘어난 경우에는 새로 생긴 구간만 받아서 이어붙입니다.
+
+import json
+import os
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get("STOCKTRADE_CACHE_DIR", "data_cache")  # 캐시 저장 폴더
+
+try:
+    import pyarrow  # noqa: F401  parquet 저장이 가능하면 사용합니다
+    FRAME_FORMAT = "parquet"
+except ImportError:
+    FRAME_FORMAT = "pkl"
+
+
+def write_frame(df, path):
+    """
+    DataFrame을 파일로 저장합니다. (pyarrow가 있으면 parquet, 없으면 pickle)
+
+    Parameters:
+        df (pandas.DataFrame): 저장할 데이터
+        path (str): 확장자를 뺀 저장 경로
+
+    Returns:
+        str: 실제로 저장된 파일 경로
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    full_path = f"{path}.{FRAME_FORMAT}"
+    tmp_path = f"{full_path}.tmp"
+    if FRAME_FORMAT == "parquet":
+        df.to_parquet(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, full_path)  # 저장 도중 중단되어도 기존 파일이 깨지지 않도록
+    return full_path
+
+
+def read_frame(path):
+    """
+    write_frame으로 저장한 DataFrame을 읽습니다. 파일이 없으면 None을 반환합니다.
+
+    Parameters:
+        path (str): 확장자를 뺀 저장 경로
+    """
+    if os.path.exists(f"{path}.parquet"):
+        return pd.read_parquet(f"{path}.parquet")
+    if os.path.exists(f"{path}.pkl"):
+        return pd.read_pickle(f"{path}.pkl")
+    return None
+
+
+def _safe_name(ticker):
+    """파일 이름으로 쓸 수 없는 문자를 바꿉니다. (예: ^KS11 -> _KS11)"""
+    return "".join(c if c.isalnum() or c in ".-" else "_" for c in str(ticker))
+
+
+def _ohlcv_path(ticker, cache_dir):
+    return os.path.join(cache_dir, "ohlcv", _safe_name(ticker))
+
+
+def _slice_dates(df, start, end):
+    """[start, end) 구간만 잘라냅니다. (yfinance와 같이 end는 포함하지 않음)"""
+    index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+    mask = (index >= pd.Timestamp(start)) & (index < pd.Timestamp(end))
+    return df[mask]
+
+
+def _download(ticker, start, end):
+    """야후 파이낸스에서 OHLCV 데이터를 내려받습니다."""
+    import yfinance as yf  # 캐시만 읽을 때는 yfinance를 불러오지 않습니다
+    return yf.Ticker(ticker).history(start=start, end=end)
+
+
+def load_ohlcv(ticker, start_date, end_date, cache_dir=CACHE_DIR, refresh=False):
+    """
+    종목의 OHLCV 데이터를 캐시에서 읽고, 없으면 내려받아 저장하는 함수입니다.
+
+    사용법: ohlcv = load_ohlcv("TQQQ", "2018-01-01", "2024-11-30")
+
+    Parameters:
+        ticker (str): 야후 파이낸스 티커 (예: "TQQQ", "005930.KS")
+        start_date (str): 시작일
+        end_date (str): 종료일 (포함하지 않음)
+        cache_dir (str): 캐시 저장 폴더
+        refresh (bool): True면 캐시를 무시하고 다시 내려받음
+
+    Returns:
+        pandas.DataFrame: OHLCV 데이터
+    """
+    path = _ohlcv_path(ticker, cache_dir)
+    meta_path = f"{path}.json"
+    start = pd.Timestamp(start_date).strftime("%Y-%m-%d")
+    end = pd.Timestamp(end_date).strftime("%Y-%m-%d")
+
+    cached = None if refresh else read_frame(path)
+    meta = None
+    if cached is not None and os.path.exists(meta_path):
+        with open(meta_path, encoding="UTF-8") as f:
+            meta = json.load(f)
+
+    if meta is not None and meta["start"] <= start and end <= meta["end"]:
+        return _slice_dates(cached, start, end)  # 캐시 적중
+
+    if meta is not None and meta["start"] <= start and meta["end"] < end:
+        # 캐시 이후에 새로 생긴 구간만 내려받아 이어붙입니다
+        new_rows = _download(ticker, meta["end"], end)
+        data = pd.concat([cached, new_rows])
+        data = data[~data.index.duplicated(keep="last")]
+        meta["end"] = end
+    else:
+        data = _download(ticker, start, end)
+        meta = {"start": start, "end": end}
+
+    if data.empty:
+        raise ValueError(f"{ticker}: 데이터가 없습니다. 티커 심볼을 확인하세요.")
+
+    write_frame(data, path)
+    with open(meta_path, "w", encoding="UTF-8") as f:
+        json.dump(meta, f)
+    return _slice_dates(data, start, end)
+
+
+def load_universe(tickers, start_date, end_date, cache_dir=CACHE_DIR, refresh=False):
+    """
+    여러 종목을 한꺼번에 캐시에 준비합니다. 실패한 종목은 건너뛰고 알려줍니다.
+
+    Returns:
+        dict: {티커: OHLCV DataFrame}
+    """
+    universe = {}
+    for ticker in tickers:
+        try:
+            universe[ticker] = load_ohlcv(ticker, start_date, end_date, cache_dir, refresh)
+        except Exception as e:
+            print(f"Error downloading {ticker}: {e}")
+    return universe
+
+
+def read_tickers(path):
+    """
+    티커 목록 파일을 읽습니다. 한 줄에 하나씩 적고, '#' 뒤는 주석으로 무시합니다.
+
+    사용법: tickers = read_tickers("kospi200.txt")
+    """
+    tickers = []
+    with open(path, encoding="UTF-8") as f:
+        for line in f:
+            ticker = line.split("#", 1)[0].strip()
+            if ticker:
+                tickers.append(ticker)
+    return tickers
@@ -0,0 +1,110 @@
+# StockTrade24.com
+# 빠른 bt.Algo 기본 클래스
+#
+# Strategy_1~5의 전략 Algo는 봉마다 지표 DataFrame에서 source.loc[현재 날짜, 컬럼]으로 값을 찾고
+# pd.Series(0, index=selected)로 비중을 새로 만듭니다. 날짜 라벨 검색과 Series 생성이
+# 매 봉 반복되어 전략 계산보다 이 준비 작업에 시간이 더 걸립니다.
+# FastAlgo는 처음 한 번만 지표 컬럼을 NumPy 배열로 꺼내 두고, 날짜 -> 행 번호 표를 만들어
+# 봉마다 정수 위치로 값을 읽으며, 비중 Series는 포지션이 바뀔 때만 값을 고쳐 다시 사용합니다.
+# 이전 포지션을 기억하는 전략(MACD 크로스 유지 등)도 매매 로직은 그대로 두고 상속만 바꾸면 됩니다.
+#
+# 사용법:
+#   class RSIStrategy(FastAlgo):
+#       columns = ('RSI',)
+#       def __call__(self, target):
+#           i = self.row(target)
+#           if i is None:
+#               return False
+#           rsi = self.arrays['RSI'][i]
+#           ...
+#           self.set_position(target, new_position)
+#           return True
+
+import bt
+import numpy as np
+import pandas as pd
+
+
+class FastAlgo(bt.Algo):
+    """
+    지표 배열과 날짜별 행 번호를 미리 만들어 두는 전략 Algo 기본 클래스입니다.
+
+    하위 클래스에서 정하는 값:
+        columns (tuple): 배열로 꺼낼 지표 컬럼 (self.arrays[컬럼]으로 읽음)
+        commission (float): 포지션 변경 1단위당 수수료율 (target.temp['trade_commission'])
+
+    Parameters:
+        data (pandas.DataFrame): 지표 데이터 (없으면 source()가 반환하는 데이터 사용)
+    """
+
+    columns = ()
+    commission = 0.0018
+
+    def __init__(self, data=None):
+        super(FastAlgo, self).__init__()
+        self.data = data
+        self.last_position = 0
+        self.arrays = {}
+        self._bound = None      # 배열을 만든 지표 데이터
+        self._rows = {}         # 날짜(나노초 정수) -> 행 번호
+        self._columns = None    # 비중 Series를 만든 종목 컬럼
+        self._weights = None
+        self._weights_position = None
+
+    def __getstate__(self):
+        """체크포인트에 저장할 때 지표 배열과 날짜 표는 빼고 저장합니다. (다음 실행 때 다시 만듦)"""
+        state = self.__dict__.copy()
+        state.update(arrays={}, _bound=None, _rows={}, _columns=None, _weights=None,
+                     _weights_position=None)
+        return state
+
+    def __setstate__(self, state):
+        FastAlgo.__init__(self, state.get('data'))  # 이전 버전에서 저장한 객체에 없는 속성 채우기
+        self.__dict__.update(state)
+
+    def source(self):
+        """지표 데이터를 반환합니다. (스크립트 전역 data를 쓰는 전략은 다시 정의)"""
+        return self.data
+
+    def bind(self, source):
+        """지표 컬럼을 NumPy 배열로 꺼내고 날짜 -> 행 번호 표를 만듭니다."""
+        self.arrays = {column: source[column].to_numpy(dtype=float) for column in self.columns}
+        index = pd.DatetimeIndex(source.index).as_unit('ns')  # Timestamp.value와 같은 나노초 단위
+        self._rows = dict(zip(index.asi8.tolist(), range(len(source))))
+        self._bound = source
+
+    def row(self, target):
+        """
+        target.now에 해당하는 지표 데이터의 행 번호를 반환합니다. 지표 데이터에 없는 날짜면 None.
+        """
+        source = self.source()
+        if source is not self._bound:
+            if source is None:
+                return None
+            self.bind(source)
+        return self._rows.get(target.now.value)
+
+    def previous(self, column, i):
+        """i번째 행 바로 전 값 (첫 행이면 NaN, DataFrame.shift(1)과 동일)"""
+        return self.arrays[column][i - 1] if i > 0 else np.nan
+
+    def set_position(self, target, new_position):
+        """
+        새 포지션으로 비중과 거래 수수료를 설정합니다.
+        포지션 변경시에만 수수료를 부과하고, 비중 Series는 값이 바뀔 때만 고칩니다.
+        """
+        if new_position != self.last_position:
+            target.temp['trade_commission'] = abs(new_position - self.last_position) * self.commission
+        else:
+            target.temp['trade_commission'] = 0
+        self.last_position = new_position
+
+        columns = target.universe.columns
+        if self._weights is None or (columns is not self._columns and not columns.equals(self._columns)):
+            self._columns = columns
+            self._weights = pd.Series(0, index=columns)
+            self._weights_position = 0
+        if new_position != self._weights_position:
+            self._weights[:] = new_position
+            self._weights_position = new_position
+        target.temp['weights'] = self._weights
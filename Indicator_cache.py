@@ -0,0 +1,184 @@
+# StockTrade24.com
+# 지표 계산 결과 캐시
+#
+# 파라미터 스윕(예: RSI 상단/하단 기준값 수백 가지)을 돌리면
+# 같은 데이터의 같은 14일 RSI가 매번 다시 계산됩니다.
+# 이 모듈은 (지표 함수, 파라미터, 입력 데이터 지문)이 같으면 지표를 한 번만 계산하도록
+# 결과를 메모리(LRU, 용량 제한)와 선택적으로 디스크에 저장해 둡니다.
+# 디스크 캐시를 켜면 여러 실행과 여러 작업 프로세스가 같은 결과를 함께 씁니다.
+#
+# 사용법:
+#   @memoize_indicator
+#   def calculate_rsi(ohlcv, length=14): ...
+#
+#   configure(max_bytes=512 * 1024 ** 2, cache_dir="data_cache")   # 디스크 캐시 사용
+#   INDICATOR_CACHE.info()                                          # 적중률 확인
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+from collections import OrderedDict
+
+import pandas as pd
+
+from Data_cache import read_frame, write_frame
+from Result_store import data_fingerprint, describe
+
+DEFAULT_MAX_BYTES = int(os.environ.get("STOCKTRADE_INDICATOR_CACHE_MB", "256")) * 1024 ** 2
+DEFAULT_CACHE_DIR = os.environ.get("STOCKTRADE_INDICATOR_CACHE_DIR")  # 지정하면 디스크 캐시 사용
+
+
+def _size_of(value):
+    """캐시 항목이 차지하는 메모리 크기(바이트)를 추정합니다."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    """호출한 쪽에서 결과를 수정해도 캐시가 바뀌지 않도록 복사본을 만듭니다."""
+    return value.copy() if hasattr(value, 'copy') else value
+
+
+class IndicatorCache:
+    """
+    지표 결과를 저장하는 캐시입니다.
+
+    Parameters:
+        max_bytes (int): 메모리 캐시 최대 용량 (넘으면 가장 오래 쓰지 않은 항목부터 삭제)
+        cache_dir (str): 디스크 캐시 폴더 (None이면 메모리 캐시만 사용)
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=DEFAULT_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._items = OrderedDict()  # 키 -> (결과, 크기)
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, "indicators", key[:2], key)
+
+    def _remember(self, key, value):
+        """메모리 캐시에 넣고 용량을 넘으면 오래된 항목을 지웁니다."""
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return  # 용량보다 큰 결과는 메모리에 두지 않습니다
+        if key in self._items:
+            self._bytes -= self._items.pop(key)[1]
+        self._items[key] = (value, size)
+        self._bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._items:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self._bytes -= evicted
+
+    def get(self, key):
+        """저장된 결과를 반환합니다. 없으면 None을 반환합니다."""
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return _copy(self._items[key][0])
+
+        if self.cache_dir is not None:
+            try:
+                value = read_frame(self._disk_path(key))
+            except Exception:
+                value = None  # 다른 프로세스가 쓰는 중이거나 손상된 파일은 다시 계산합니다
+            if value is not None:
+                self.disk_hits += 1
+                self._remember(key, value)
+                return _copy(value)
+        return None
+
+    def put(self, key, value):
+        """결과를 저장합니다. (디스크 캐시는 DataFrame 결과만 저장)"""
+        value = _copy(value)
+        self._remember(key, value)
+        if self.cache_dir is not None and isinstance(value, pd.DataFrame):
+            try:
+                write_frame(value, self._disk_path(key))
+            except Exception as e:
+                print(f"지표 캐시를 디스크에 저장하지 못했습니다: {e}")
+
+    def compute(self, func, data, *args, **kwargs):
+        """
+        func(data, *args, **kwargs)의 결과를 캐시에서 찾고, 없으면 계산해 저장합니다.
+
+        사용법: data = INDICATOR_CACHE.compute(calculate_rsi, ohlcv, length=14)
+
+        Returns:
+            func의 결과 (캐시의 복사본)
+        """
+        bound = inspect.signature(func).bind(data, *args, **kwargs)
+        bound.apply_defaults()
+        params = dict(list(bound.arguments.items())[1:])  # 첫 번째 인자(데이터)는 지문으로 대신합니다
+
+        payload = json.dumps({
+            'indicator': describe(func),
+            'params': params,
+            'data': data_fingerprint(data),
+        }, sort_keys=True, default=repr)
+        key = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+        value = self.get(key)
+        if value is None:
+            self.misses += 1
+            value = func(data, *args, **kwargs)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """메모리 캐시를 비웁니다. (디스크 캐시는 그대로 둠)"""
+        self._items.clear()
+        self._bytes = 0
+
+    def info(self):
+        """캐시 사용 현황을 반환합니다."""
+        return {
+            'items': len(self._items),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'cache_dir': self.cache_dir,
+        }
+
+
+INDICATOR_CACHE = IndicatorCache()  # 모든 지표 함수가 함께 쓰는 캐시
+
+
+def configure(max_bytes=None, cache_dir=None):
+    """
+    공용 지표 캐시의 설정을 바꿉니다. 기존 메모리 캐시 내용은 유지합니다.
+
+    Parameters:
+        max_bytes (int): 메모리 캐시 최대 용량
+        cache_dir (str): 디스크 캐시 폴더 (지정하면 디스크 캐시 사용)
+    """
+    if max_bytes is not None:
+        INDICATOR_CACHE.max_bytes = max_bytes
+        INDICATOR_CACHE._evict()
+    if cache_dir is not None:
+        INDICATOR_CACHE.cache_dir = cache_dir
+
+
+def memoize_indicator(func):
+    """
+    지표 계산 함수의 결과를 공용 캐시에 저장하는 데코레이터입니다.
+    첫 번째 인자는 입력 데이터(DataFrame/Series)여야 합니다.
+    """
+    @functools.wraps(func)
+    def wrapper(data, *args, **kwargs):
+        return INDICATOR_CACHE.compute(func, data, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,257 @@
+# StockTrade24.com
+# 분봉으로 자동매매 프로그램(StockAuto_basic) 일정 그대로 백테스트
+#
+# StockAuto_basic의 하루:
+#   09:05 ~ 15:15  현재가가 목표가(당일 시가 + 전일 변동폭 x 0.5)를 넘으면 시장가 매수
+#                  (symbol_list 순서로 확인, 최대 target_buy_count 종목, 종목당 현금의 buy_percent)
+#   15:15          보유 종목 모두 시장가 매도
+# 일봉으로 흉내 내면 목표가에 샀다고 가정할 수밖에 없지만, 실제로는 분봉이 목표가 위에서 시작해
+# (갭) 더 비싸게 사는 날이 있습니다. 이 모듈은 Minute_store에 저장한 분봉으로
+# 종목 x 날짜마다 목표가를 처음 넘는 분을 찾아 그 분의 가격으로 체결합니다.
+# 분 단위로 하나씩 돌지 않고, 종목별로 (날짜 x 분) 행렬을 만들어 모든 날짜의 첫 돌파 분을
+# 한 번에 찾습니다(argmax). 날짜를 따라 도는 부분은 현금 잔고 계산뿐입니다.
+#
+# 체결 가격:
+#   돌파한 분의 시가가 이미 목표가보다 높으면(갭) 그 시가, 아니면 목표가 바로 위 호가
+#   매도는 15:15 분봉의 시가 (없으면 그 전 마지막 체결가)
+# 봇은 종목을 1초 간격으로 차례로 확인하므로 실제 체결은 몇 초 늦을 수 있습니다.
+#
+# 사용법:
+#   minutes = {code: load_minutes(code, "2022-01-01", "2025-01-01") for code in codes}
+#   trades, equity = simulate_breakout(minutes, symbol_list=codes)
+#   print(summarize(trades, equity))
+#
+#   python Intraday_backtest.py 005930 035720 000660 069500 --start 2022-01-01 --end 2025-01-01 --backfill
+
+import argparse
+import datetime
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from Backtest_stats import calculate_stats
+from Minute_store import backfill_minutes, load_minutes
+from Synthetic_market import krx_tick_size
+
+BOT_SCHEDULE = {
+    'start': datetime.time(9, 5),    # 매수 시작
+    'sell': datetime.time(15, 15),   # 일괄 매도
+}
+
+
+def _minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def _minute_grid(minutes):
+    """
+    한 종목의 분봉을 (날짜 x 분) 행렬로 펼칩니다. 없는 분은 NaN입니다.
+
+    Returns:
+        tuple: (날짜 인덱스, 첫 열의 분(0시 기준), {'Open': 행렬, 'High': ..., 'Low': ..., 'Close': ...})
+    """
+    index = pd.DatetimeIndex(minutes.index)
+    day = index.normalize()
+    days = day.unique().sort_values()
+    minute = np.asarray(index.hour * 60 + index.minute)
+    first = int(minute.min()) if len(minute) else 0
+    width = int(minute.max()) - first + 1 if len(minute) else 0
+
+    rows = days.get_indexer(day)
+    cols = minute - first
+    grid = {}
+    for column in ('Open', 'High', 'Low', 'Close'):
+        values = np.full((len(days), width), np.nan)
+        values[rows, cols] = minutes[column].to_numpy(dtype=float)
+        grid[column] = values
+    return days, first, grid
+
+
+def _first_valid(mask):
+    """행마다 처음 True인 열 번호와 True가 있는지 여부"""
+    return mask.argmax(axis=1), mask.any(axis=1)
+
+
+def crossing_table(minutes, k=0.5, daily=None, start=BOT_SCHEDULE['start'], sell=BOT_SCHEDULE['sell']):
+    """
+    한 종목의 날짜별 목표가, 첫 돌파 시각, 매수/매도 체결 가격을 계산합니다.
+
+    Parameters:
+        minutes (pandas.DataFrame): 분봉 (Open, High, Low, Close, 인덱스: 시각)
+        k (float): 변동폭 계수 (목표가 = 당일 시가 + 전일 변동폭 x k)
+        daily (pandas.DataFrame): 일봉 (Open, High, Low). 생략하면 분봉을 모아 만듭니다.
+        start (datetime.time): 매수 시작 시각
+        sell (datetime.time): 일괄 매도 시각
+
+    Returns:
+        pandas.DataFrame: 날짜별 target, cross_minute(돌파 분, 없으면 NaN), entry, exit, gapped
+    """
+    days, first, grid = _minute_grid(minutes)
+    opens, highs, lows, closes = grid['Open'], grid['High'], grid['Low'], grid['Close']
+    rows = np.arange(len(days))
+    minute = first + np.arange(opens.shape[1])
+
+    if daily is None:
+        open_col, has_open = _first_valid(~np.isnan(opens))
+        day_open = opens[rows, open_col]
+        day_open[~has_open] = np.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # 분봉이 없는 날은 NaN
+            day_high = np.nanmax(highs, axis=1)
+            day_low = np.nanmin(lows, axis=1)
+    else:
+        aligned = daily.reindex(days)
+        day_open = aligned['Open'].to_numpy(dtype=float)
+        day_high = aligned['High'].to_numpy(dtype=float)
+        day_low = aligned['Low'].to_numpy(dtype=float)
+    prev_range = np.r_[np.nan, (day_high - day_low)[:-1]]
+    target = day_open + prev_range * k
+
+    # 매수 시간대에 고가가 목표가를 넘은 첫 분 (봇의 조건: 목표가 < 현재가)
+    window = (minute >= _minute_of_day(start)) & (minute < _minute_of_day(sell))
+    with np.errstate(invalid='ignore'):
+        crossed = (highs > target[:, None]) & window
+    cross_col, has_cross = _first_valid(crossed)
+    open_at = opens[rows, cross_col]
+    tick = krx_tick_size(np.nan_to_num(target))
+    above_target = (np.floor(target / tick) + 1) * tick   # 목표가 바로 위 호가
+    gapped = open_at > target
+    entry = np.where(gapped, open_at, above_target)
+
+    # 15:15 분봉 시가에 매도, 그 분봉이 없으면 그 전 마지막 종가
+    after_sell = ~np.isnan(opens) & (minute >= _minute_of_day(sell))
+    sell_col, has_sell = _first_valid(after_sell)
+    last_col = closes.shape[1] - 1 - (~np.isnan(closes))[:, ::-1].argmax(axis=1)
+    exit_price = np.where(has_sell, opens[rows, sell_col], closes[rows, last_col])
+
+    cross_minute = np.where(has_cross, minute[cross_col], np.nan)
+    return pd.DataFrame({
+        'target': target,
+        'cross_minute': cross_minute,
+        'entry': np.where(has_cross, entry, np.nan),
+        'exit': exit_price,
+        'gapped': has_cross & gapped,
+    }, index=days)
+
+
+def simulate_breakout(minutes, symbol_list=None, k=0.5, target_buy_count=3, buy_percent=0.33,
+                      initial_cash=10000000, fee=0.00015, tax=0.0018, daily=None,
+                      start=BOT_SCHEDULE['start'], sell=BOT_SCHEDULE['sell']):
+    """
+    StockAuto_basic의 하루 일정을 분봉으로 재현하는 백테스트입니다.
+    같은 분에 여러 종목이 돌파하면 symbol_list 순서대로 매수합니다. (봇이 그 순서로 확인하므로)
+
+    Parameters:
+        minutes (dict): {종목코드: 분봉 DataFrame}
+        symbol_list (list): 매수 희망 종목 (봇의 확인 순서, 생략하면 minutes 순서)
+        k (float): 변동폭 계수
+        target_buy_count (int): 하루 최대 매수 종목 수
+        buy_percent (float): 종목당 매수 금액 비율 (장 시작 전 현금 기준)
+        initial_cash (float): 시작 현금
+        fee (float): 매수/매도 수수료율
+        tax (float): 매도 세금율
+        daily (dict): {종목코드: 일봉 DataFrame} (생략하면 분봉으로 시가/고가/저가를 만듦)
+
+    Returns:
+        tuple: (trades DataFrame, 일별 자산 Series)
+    """
+    symbol_list = list(symbol_list or minutes.keys())
+    tables = [crossing_table(minutes[code], k, (daily or {}).get(code), start, sell) for code in symbol_list]
+    days = tables[0].index
+    for table in tables[1:]:
+        days = days.union(table.index)
+    aligned = [table.reindex(days) for table in tables]
+    cross = np.column_stack([t['cross_minute'].to_numpy() for t in aligned])   # (날짜 x 종목)
+    entry = np.column_stack([t['entry'].to_numpy() for t in aligned])
+    exit_price = np.column_stack([t['exit'].to_numpy() for t in aligned])
+
+    # 돌파 시각, 같은 시각이면 종목 순서로 줄을 세움
+    n_codes = len(symbol_list)
+    has_trade = ~np.isnan(cross) & ~np.isnan(exit_price)
+    key = np.where(has_trade, np.nan_to_num(cross) * n_codes + np.arange(n_codes), np.inf)
+    order = key.argsort(axis=1)
+
+    # 현금 흐름: 종목당 매수 금액은 그날 아침 현금으로 정해지므로 날짜 순서대로 계산
+    cash = float(initial_cash)
+    equity = np.empty(len(days))
+    qty = np.zeros(has_trade.shape)
+    for i in range(len(days)):
+        if has_trade[i].any():
+            buy_amount = cash * buy_percent
+            affordable = np.where(has_trade[i], np.floor(buy_amount / np.where(has_trade[i], entry[i], 1.0)), 0.0)
+            # 0주인(한 주도 못 사는) 종목은 매수 수에 세지 않고 다음 순서 종목으로 넘어감
+            chosen = order[i][affordable[order[i]] > 0][:target_buy_count]
+            q = np.zeros(n_codes)
+            q[chosen] = affordable[chosen]
+            cost = np.sum(q * np.nan_to_num(entry[i]) * (1 + fee))
+            proceeds = np.sum(q * np.nan_to_num(exit_price[i]) * (1 - fee - tax))
+            cash += proceeds - cost
+            qty[i] = q
+        equity[i] = cash
+
+    day_pos, code_pos = np.nonzero(qty > 0)
+    entries = entry[day_pos, code_pos]
+    exits = exit_price[day_pos, code_pos]
+    q = qty[day_pos, code_pos]
+    targets = np.column_stack([t['target'].to_numpy() for t in aligned])[day_pos, code_pos]
+    gapped = np.column_stack([t['gapped'].fillna(False).to_numpy(dtype=bool) for t in aligned])
+    minute = cross[day_pos, code_pos].astype(int)
+    trades = pd.DataFrame({
+        'date': days[day_pos],
+        'code': np.asarray(symbol_list)[code_pos],
+        'time': [f"{m // 60:02d}:{m % 60:02d}" for m in minute],
+        'target': targets,
+        'entry': entries,
+        'exit': exits,
+        'qty': q.astype(int),
+        'pnl': q * (exits * (1 - fee - tax) - entries * (1 + fee)),
+        'gapped': gapped[day_pos, code_pos],
+        'slippage_bps': (entries / targets - 1) * 10000,   # 목표가 대비 더 비싸게 산 정도
+    })
+    return trades, pd.Series(equity, index=days, name='Breakout')
+
+
+def summarize(trades, equity):
+    """
+    성과지표와 체결 통계를 한 표로 정리합니다.
+
+    Returns:
+        pandas.Series: cagr, max_drawdown 등 성과지표와 trades, win_rate, gapped_pct, mean_slippage_bps
+    """
+    stats = calculate_stats(equity.to_frame()).iloc[0]
+    stats['trades'] = len(trades)
+    stats['win_rate'] = (trades['pnl'] > 0).mean() if len(trades) else np.nan
+    stats['gapped_pct'] = trades['gapped'].mean() * 100 if len(trades) else np.nan
+    stats['mean_slippage_bps'] = trades['slippage_bps'].mean() if len(trades) else np.nan
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='분봉으로 자동매매 프로그램 일정 백테스트')
+    parser.add_argument('codes', nargs='+', help='매수 희망 종목코드 (봇의 확인 순서)')
+    parser.add_argument('--start', required=True, help='시작일')
+    parser.add_argument('--end', required=True, help='종료일 (포함하지 않음)')
+    parser.add_argument('--k', type=float, default=0.5, help='변동폭 계수')
+    parser.add_argument('--count', type=int, default=3, help='하루 최대 매수 종목 수')
+    parser.add_argument('--buy-percent', type=float, default=0.33, help='종목당 매수 금액 비율')
+    parser.add_argument('--cash', type=float, default=10000000, help='시작 현금')
+    parser.add_argument('--backfill', action='store_true', help='먼저 분봉 저장소를 채움 (API 호출)')
+    parser.add_argument('--trades', help='체결 내역을 저장할 CSV 파일')
+    args = parser.parse_args()
+
+    if args.backfill:
+        backfill_minutes(args.codes, args.start, args.end)
+    minutes = {code: load_minutes(code, args.start, args.end) for code in args.codes}
+    empty = [code for code, frame in minutes.items() if frame.empty]
+    if empty:
+        print(f"분봉이 없는 종목: {', '.join(empty)} (--backfill로 먼저 받으세요)")
+        minutes = {code: frame for code, frame in minutes.items() if not frame.empty}
+    if minutes:
+        trades, equity = simulate_breakout(minutes, [c for c in args.codes if c in minutes], k=args.k,
+                                           target_buy_count=args.count, buy_percent=args.buy_percent,
+                                           initial_cash=args.cash)
+        print("\n===== 분봉 백테스트 =====")
+        print(summarize(trades, equity).round(4).to_string())
+        if args.trades:
+            trades.to_csv(args.trades, index=False)
@@ -0,0 +1,273 @@
+# StockTrade24.com
+# 한국투자증권 API 응답 해석
+#
+# 자동매매 함수들은 같은 응답을 res.json()으로 여러 번 다시 해석하고(get_target_price는 3번),
+# 결과를 중첩 dict 그대로 다루며 필요할 때마다 int(...)로 바꿉니다.
+# 이 모듈은 응답 본문을 한 번만 해석하고(orjson이 있으면 사용), 필요한 필드만 가진
+# 작은 레코드(Quote, DailyBar, MinuteBar, Holding, OrderAck)로 감쌉니다.
+# 숫자 변환은 그 필드를 실제로 읽을 때만 하고, 오류 응답(rt_cd != '0')은 모두 KISError로 알려줍니다.
+#
+# 사용법:
+#   quote = parse_quote(res)        # res: requests.Response
+#   quote.price, quote.volume
+#   bars = parse_daily_bars(res)    # 최근 날짜부터
+#   holdings, summary = parse_balance(res)
+
+import json
+
+try:
+    import orjson  # 더 빠른 JSON 해석기가 있으면 사용합니다
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+class KISError(Exception):
+    """
+    한국투자증권 API 오류 응답 (rt_cd가 '0'이 아님)
+
+    Attributes:
+        rt_cd (str): 성공 여부 코드
+        msg_cd (str): 메시지 코드 (예: EGW00123 토큰 만료)
+        msg (str): 오류 메시지
+        body (dict): 응답 본문 전체
+    """
+
+    def __init__(self, body):
+        self.rt_cd = body.get('rt_cd')
+        self.msg_cd = body.get('msg_cd', '')
+        self.msg = body.get('msg1', '').strip()
+        self.body = body
+        super(KISError, self).__init__(f"[{self.msg_cd}] {self.msg} (rt_cd={self.rt_cd})")
+
+
+def decode(res):
+    """
+    응답 본문을 한 번 해석합니다. rt_cd가 있는 응답에서 오류면 KISError를 냅니다.
+    (토큰, 해시키 응답처럼 rt_cd가 없는 응답은 그대로 반환)
+
+    Parameters:
+        res (requests.Response): API 응답
+
+    Returns:
+        dict: 응답 본문
+    """
+    body = _loads(res.content)
+    if 'rt_cd' in body and body['rt_cd'] != '0':
+        raise KISError(body)
+    return body
+
+
+class _Record:
+    """응답 필드 dict를 감싸는 레코드. 필드는 읽을 때 숫자로 바꿉니다."""
+
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def _int(self, key):
+        return int(self._raw[key])
+
+    def _float(self, key):
+        return float(self._raw[key])
+
+    @property
+    def raw(self):
+        """원래 응답 필드 dict"""
+        return self._raw
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+class Quote(_Record):
+    """현재가 조회 결과 (inquire-price output)"""
+
+    __slots__ = ()
+    _fields = ('price', 'open', 'high', 'low', 'volume')
+
+    @property
+    def price(self):
+        return self._int('stck_prpr')   # 현재가
+
+    @property
+    def open(self):
+        return self._int('stck_oprc')   # 시가
+
+    @property
+    def high(self):
+        return self._int('stck_hgpr')   # 고가
+
+    @property
+    def low(self):
+        return self._int('stck_lwpr')   # 저가
+
+    @property
+    def volume(self):
+        return self._int('acml_vol')    # 누적 거래량
+
+
+class DailyBar(_Record):
+    """일봉 (inquire-daily-price output 한 줄)"""
+
+    __slots__ = ()
+    _fields = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+    @property
+    def date(self):
+        return self._raw['stck_bsop_date']  # 영업일 (YYYYMMDD)
+
+    @property
+    def open(self):
+        return self._int('stck_oprc')
+
+    @property
+    def high(self):
+        return self._int('stck_hgpr')
+
+    @property
+    def low(self):
+        return self._int('stck_lwpr')
+
+    @property
+    def close(self):
+        return self._int('stck_clpr')
+
+    @property
+    def volume(self):
+        return self._int('acml_vol')
+
+
+class MinuteBar(_Record):
+    """분봉 (inquire-time-itemchartprice / inquire-time-dailychartprice output2 한 줄)"""
+
+    __slots__ = ()
+    _fields = ('date', 'time', 'open', 'high', 'low', 'close', 'volume')
+
+    @property
+    def date(self):
+        return self._raw['stck_bsop_date']  # 영업일 (YYYYMMDD)
+
+    @property
+    def time(self):
+        return self._raw['stck_cntg_hour']  # 체결 시각 (HHMMSS, 그 분의 마지막 시각)
+
+    @property
+    def open(self):
+        return self._int('stck_oprc')
+
+    @property
+    def high(self):
+        return self._int('stck_hgpr')
+
+    @property
+    def low(self):
+        return self._int('stck_lwpr')
+
+    @property
+    def close(self):
+        return self._int('stck_prpr')   # 그 분의 마지막 체결가
+
+    @property
+    def volume(self):
+        return self._int('cntg_vol')    # 그 분의 체결 거래량
+
+
+class Holding(_Record):
+    """보유 종목 (inquire-balance output1 한 줄)"""
+
+    __slots__ = ()
+    _fields = ('code', 'name', 'qty')
+
+    @property
+    def code(self):
+        return self._raw['pdno']
+
+    @property
+    def name(self):
+        return self._raw['prdt_name']
+
+    @property
+    def qty(self):
+        return self._int('hldg_qty')          # 보유 수량
+
+    @property
+    def avg_price(self):
+        return self._float('pchs_avg_pric')   # 매입 평균가
+
+    @property
+    def eval_amount(self):
+        return self._int('evlu_amt')          # 평가 금액
+
+
+class AccountSummary(_Record):
+    """계좌 평가 요약 (inquire-balance output2 첫 줄)"""
+
+    __slots__ = ()
+    _fields = ('stock_eval', 'profit_loss', 'total_eval')
+
+    @property
+    def stock_eval(self):
+        return self._int('scts_evlu_amt')       # 주식 평가 금액
+
+    @property
+    def profit_loss(self):
+        return self._int('evlu_pfls_smtl_amt')  # 평가 손익 합계
+
+    @property
+    def total_eval(self):
+        return self._int('tot_evlu_amt')        # 총 평가 금액
+
+
+class OrderAck(_Record):
+    """주문 접수 결과 (order-cash 응답 본문 전체)"""
+
+    __slots__ = ()
+    _fields = ('order_no', 'order_time', 'msg')
+
+    @property
+    def order_no(self):
+        return self._raw.get('output', {}).get('ODNO', '')   # 주문 번호
+
+    @property
+    def order_time(self):
+        return self._raw.get('output', {}).get('ORD_TMD', '')  # 주문 시각 (HHMMSS)
+
+    @property
+    def msg(self):
+        return self._raw.get('msg1', '').strip()
+
+
+def parse_quote(res):
+    """현재가 조회 응답 -> Quote"""
+    return Quote(decode(res)['output'])
+
+
+def parse_daily_bars(res):
+    """일봉 조회 응답 -> DailyBar 목록 (최근 날짜부터)"""
+    return [DailyBar(row) for row in decode(res)['output']]
+
+
+def parse_minute_bars(res):
+    """분봉 조회 응답 -> MinuteBar 목록 (최근 시각부터, 빈 줄은 제외)"""
+    return [MinuteBar(row) for row in decode(res)['output2'] if row.get('stck_cntg_hour')]
+
+
+def parse_balance(res):
+    """
+    잔고 조회 응답 -> (Holding 목록, AccountSummary)
+    """
+    body = decode(res)
+    return [Holding(row) for row in body['output1']], AccountSummary(body['output2'][0])
+
+
+def parse_orderable_cash(res):
+    """매수 가능 조회 응답 -> 주문 가능 현금 (int)"""
+    return int(decode(res)['output']['ord_psbl_cash'])
+
+
+def parse_order(res):
+    """주문 응답 -> OrderAck (주문이 거부되면 KISError)"""
+    return OrderAck(decode(res))
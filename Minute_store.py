@@ -0,0 +1,297 @@
+# StockTrade24.com
+# 한국투자증권 분봉 로컬 저장소
+#
+# 자동매매 프로그램(StockAuto_basic)은 장중 목표가를 넘는 순간 매수하고 15:15에 매도합니다.
+# 일봉으로는 목표가 근처에서 체결됐는지, 갭으로 훨씬 위에서 샀는지 알 수 없으므로
+# 한국투자증권 분봉 조회 API로 분봉을 받아 종목/연도별 파일로 저장해 둡니다.
+# (data_cache/minute/<종목코드>/<연도>, 받은 날짜는 같은 이름의 .json에 기록)
+#
+# 분봉 API는 한 번에 30개(당일) 또는 120개(지난 날짜)씩 지정한 시각부터 거꾸로 돌려주므로
+# 하루치를 받으려면 여러 페이지가 필요합니다. 페이지 시작 시각은 장 마감 시각에서 미리 계산할 수 있어
+# 종목 x 날짜 x 페이지 요청을 모두 스레드 풀에 한꺼번에 넣고, 초당 호출 수만 제한합니다.
+# 체결이 없는 분이 있어 페이지 사이가 비면 빈 구간만 다시 요청합니다.
+# 이미 받은 날짜는 다시 요청하지 않으므로 매일 장 마감 후 실행하면 저장소가 계속 이어집니다.
+#
+# 사용법:
+#   backfill_minutes(["005930", "035720"], "2024-01-01", "2024-12-31")
+#   minutes = load_minutes("005930", "2024-01-01", "2024-12-31")   # 분봉 OHLCV (시각 인덱스)
+#
+#   python Minute_store.py 005930 035720 --start 2024-01-01 --end 2024-12-31
+
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from Data_cache import CACHE_DIR, read_frame, write_frame
+from Trading_calendar import get_calendar
+
+PAGE_SIZE_TODAY = 30    # 당일분봉조회 한 페이지 분봉 수
+PAGE_SIZE_PAST = 120    # 일별분봉조회 한 페이지 분봉 수
+MINUTE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _minute_path(code, year, cache_dir):
+    return os.path.join(cache_dir, "minute", str(code), str(year))
+
+
+def _read_days(path):
+    """저장된 날짜 목록 (YYYY-MM-DD)"""
+    if not os.path.exists(f"{path}.json"):
+        return set()
+    with open(f"{path}.json", encoding="UTF-8") as f:
+        return set(json.load(f)["days"])
+
+
+def stored_days(code, year, cache_dir=CACHE_DIR):
+    """
+    저장소에 이미 받아 둔 날짜를 반환합니다.
+
+    Returns:
+        set: datetime.date 집합
+    """
+    return {datetime.date.fromisoformat(d) for d in _read_days(_minute_path(code, year, cache_dir))}
+
+
+def load_minutes(code, start_date, end_date, cache_dir=CACHE_DIR):
+    """
+    저장소에서 종목의 분봉을 읽습니다. (내려받지 않으므로 먼저 backfill_minutes를 실행하세요)
+
+    사용법: minutes = load_minutes("005930", "2024-01-01", "2024-12-31")
+
+    Parameters:
+        code (str): 종목코드
+        start_date (str): 시작일
+        end_date (str): 종료일 (포함하지 않음)
+
+    Returns:
+        pandas.DataFrame: Open, High, Low, Close, Volume (인덱스: 분봉 시각)
+    """
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    frames = []
+    for year in range(start.year, end.year + 1):
+        frame = read_frame(_minute_path(code, year, cache_dir))
+        if frame is not None:
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=MINUTE_COLUMNS, index=pd.DatetimeIndex([]), dtype=float)
+    minutes = pd.concat(frames)
+    return minutes[(minutes.index >= start) & (minutes.index < end)]
+
+
+def bars_to_frame(day, bars):
+    """
+    MinuteBar 목록을 분봉 DataFrame으로 바꿉니다. (시각 순서로 정렬, 중복 시각은 하나만)
+    """
+    if not bars:
+        return pd.DataFrame(columns=MINUTE_COLUMNS, index=pd.DatetimeIndex([]), dtype=float)
+    index = pd.to_datetime([f"{day:%Y-%m-%d} {bar.time[:2]}:{bar.time[2:4]}:{bar.time[4:6]}" for bar in bars])
+    frame = pd.DataFrame({
+        'Open': [bar.open for bar in bars],
+        'High': [bar.high for bar in bars],
+        'Low': [bar.low for bar in bars],
+        'Close': [bar.close for bar in bars],
+        'Volume': [bar.volume for bar in bars],
+    }, index=index, dtype=float)
+    frame = frame[~frame.index.duplicated(keep='first')]
+    return frame.sort_index()
+
+
+def _store(code, day_frames, cache_dir):
+    """받은 날짜들의 분봉을 연도별 파일에 합쳐 저장하고 날짜 목록을 갱신합니다."""
+    by_year = {}
+    for day, frame in day_frames.items():
+        by_year.setdefault(day.year, {})[day] = frame
+    for year, frames in by_year.items():
+        path = _minute_path(code, year, cache_dir)
+        days = _read_days(path)
+        stored = read_frame(path)
+        parts = ([stored] if stored is not None else []) + [f for f in frames.values() if not f.empty]
+        if parts:
+            data = pd.concat(parts)
+            data = data[~data.index.duplicated(keep='last')].sort_index()
+            write_frame(data, path)
+        days.update(day.isoformat() for day in frames)
+        with open(f"{path}.json", "w", encoding="UTF-8") as f:
+            json.dump({"days": sorted(days)}, f)
+
+
+class _RateLimiter:
+    """여러 스레드가 함께 쓰는 초당 호출 수 제한"""
+
+    def __init__(self, max_per_second):
+        self.gap = 1.0 / max_per_second
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.gap
+        time.sleep(max(0.0, slot - now))
+
+
+def _cursors(open_time, close_time, page_size):
+    """장 마감부터 page_size분 간격으로 거꾸로 내려가는 페이지 시작 시각"""
+    cursors = []
+    cursor = close_time
+    while cursor > open_time:
+        cursors.append(cursor)
+        cursor -= datetime.timedelta(minutes=page_size)
+    return cursors
+
+
+def _missing_cursors(pages, open_time, page_size):
+    """
+    받은 페이지들이 덮지 못한 구간의 페이지 시작 시각을 찾습니다.
+
+    Parameters:
+        pages (dict): {페이지 시작 시각: 받은 분봉 시각 목록}
+    """
+    covered = []
+    for cursor, times in pages.items():
+        if len(times) < page_size:  # 덜 찼으면 장 시작까지 다 받은 페이지
+            covered.append((open_time, cursor))
+        else:
+            covered.append((min(times), cursor))
+    covered.sort(key=lambda span: span[1], reverse=True)
+
+    missing = []
+    lower = None
+    for start, end in covered:
+        if lower is not None and end < lower - datetime.timedelta(minutes=1):
+            missing.append(lower - datetime.timedelta(minutes=1))
+        lower = start if lower is None else min(lower, start)
+    if lower is not None and lower > open_time:
+        missing.append(lower - datetime.timedelta(minutes=1))
+    return [cursor for cursor in missing if cursor not in pages]
+
+
+def _kis_fetch():
+    """StockAuto_basic의 분봉 조회 함수 (접근 토큰을 발급하고 12시간마다 갱신)"""
+    import StockAuto_basic as kis
+    kis.refresh_token()
+    lock = threading.Lock()
+
+    def fetch(code, day, hour):
+        with lock:
+            if datetime.datetime.now() - kis.TOKEN_ISSUED_AT > datetime.timedelta(hours=12):
+                kis.refresh_token()
+        return kis.get_minute_bars(code, day, hour)
+    return fetch
+
+
+def backfill_minutes(codes, start_date, end_date, cache_dir=CACHE_DIR, max_workers=4,
+                     max_requests_per_second=15, fetch=None, page_size=None, refresh=False):
+    """
+    종목들의 분봉을 한국투자증권 API로 받아 저장소에 채웁니다. 이미 받은 날짜는 건너뜁니다.
+    연도 단위로 받아서 저장하므로 중간에 멈춰도 그 전 연도까지는 남습니다.
+
+    Parameters:
+        codes (list): 종목코드 목록
+        start_date (str): 시작일
+        end_date (str): 종료일 (포함하지 않음)
+        max_workers (int): 동시 요청 스레드 수
+        max_requests_per_second (float): 초당 최대 API 호출 수 (계좌 호출 한도보다 낮게)
+        fetch (callable): (종목코드, 날짜, 'HHMMSS') -> MinuteBar 목록 (생략하면 StockAuto_basic.get_minute_bars)
+        page_size (int): 한 페이지 분봉 수 (생략하면 당일 30, 지난 날짜 120)
+        refresh (bool): True면 이미 받은 날짜도 다시 받음
+
+    Returns:
+        dict: {종목코드: 새로 받은 날짜 수}
+    """
+    calendar = get_calendar('KRX')
+    today = datetime.date.today()
+    now = datetime.datetime.now()
+    # 오늘은 장이 끝난 뒤에만 받습니다 (장중에 받으면 반쪽짜리 날짜가 저장됨)
+    sessions = [day for day in calendar.sessions_between(start_date, end_date)
+                if day < pd.Timestamp(end_date).date()
+                and (day < today or (day == today and now >= calendar.session_hours(day)[1]))]
+    fetch = fetch or _kis_fetch()
+    limiter = _RateLimiter(max_requests_per_second)
+    added = {code: 0 for code in codes}
+
+    def request(code, day, cursor):
+        limiter.wait()
+        return fetch(code, day, cursor.strftime("%H%M%S"))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for year in sorted({day.year for day in sessions}):
+            # (종목, 날짜)별 받은 페이지: {페이지 시작 시각: 분봉 목록}
+            pages = {}
+            hours = {}
+            for code in codes:
+                done = set() if refresh else stored_days(code, year, cache_dir)
+                for day in sessions:
+                    if day.year == year and day not in done:
+                        pages[(code, day)] = {}
+                        hours[(code, day)] = calendar.session_hours(day)
+            if not pages:
+                continue
+            print(f"{year}년 분봉 받는 중: {len(pages)}개 (종목 x 날짜)")
+
+            failed = set()
+            sizes = {key: page_size or (PAGE_SIZE_TODAY if key[1] == today else PAGE_SIZE_PAST)
+                     for key in pages}
+            todo = {key: _cursors(*hours[key], sizes[key]) for key in pages}
+            while todo:
+                jobs = {pool.submit(request, code, day, cursor): (code, day, cursor)
+                        for (code, day), cursors in todo.items() for cursor in cursors}
+                for job, (code, day, cursor) in jobs.items():
+                    try:
+                        pages[(code, day)][cursor] = job.result()
+                    except Exception as e:
+                        print(f"{code} {day} {cursor:%H%M%S} 분봉 조회 실패: {e}")
+                        failed.add((code, day))
+
+                # 체결이 없는 분 때문에 비어 있는 구간만 다시 요청합니다
+                todo = {}
+                for key in {(code, day) for code, day, _ in jobs.values()}:
+                    if key in failed:
+                        continue
+                    day_pages = {cursor: [_bar_time(key[1], bar) for bar in bars]
+                                 for cursor, bars in pages[key].items()}
+                    missing = _missing_cursors(day_pages, hours[key][0], sizes[key])
+                    if missing:
+                        todo[key] = missing
+
+            for code in codes:
+                day_frames = {day: bars_to_frame(day, [bar for bars in day_pages.values() for bar in bars])
+                              for (c, day), day_pages in pages.items()
+                              if c == code and (c, day) not in failed}
+                if day_frames:
+                    _store(code, day_frames, cache_dir)
+                    added[code] += len(day_frames)
+    return added
+
+
+def _bar_time(day, bar):
+    """MinuteBar의 체결 시각 -> datetime"""
+    return datetime.datetime.combine(day, datetime.time(int(bar.time[:2]), int(bar.time[2:4]),
+                                                        int(bar.time[4:6])))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='한국투자증권 분봉 저장소 채우기')
+    parser.add_argument('codes', nargs='+', help='종목코드')
+    parser.add_argument('--start', required=True, help='시작일')
+    parser.add_argument('--end', default=None, help='종료일 (포함하지 않음, 기본: 내일)')
+    parser.add_argument('--workers', type=int, default=4, help='동시 요청 스레드 수')
+    parser.add_argument('--max-rps', type=float, default=15, help='초당 최대 API 호출 수')
+    parser.add_argument('--refresh', action='store_true', help='이미 받은 날짜도 다시 받음')
+    args = parser.parse_args()
+
+    end = args.end or (datetime.date.today() + datetime.timedelta(days=1)).isoformat()
+    try:
+        added = backfill_minutes(args.codes, args.start, end, max_workers=args.workers,
+                                 max_requests_per_second=args.max_rps, refresh=args.refresh)
+        for code, count in added.items():
+            print(f"{code}: {count}일 추가")
+    except KeyboardInterrupt:
+        print("중단했습니다. 다 받은 연도까지는 저장되어 있습니다.")
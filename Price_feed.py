@@ -0,0 +1,356 @@
+# StockTrade24.com
+# 공유 메모리 현재가 피드
+#
+# 자동매매 프로그램, 모니터링 스크립트, 노트북이 각자 get_current_price를 호출하면
+# 계좌의 API 호출 한도를 금방 넘깁니다.
+# 이 모듈은 피더(feeder) 프로세스 하나만 한국투자증권 API로 현재가를 조회해 공유 메모리 표에 쓰고,
+# 같은 컴퓨터의 다른 프로세스는 네트워크 호출 없이 그 표를 읽도록 합니다.
+#
+# - 종목마다 칸(slot)이 하나씩 있고, 칸마다 순번(seq)으로 시퀀스 락(seqlock)을 겁니다.
+#   피더가 쓰는 동안에는 순번이 홀수이고, 읽는 쪽은 읽기 전후 순번이 같은 짝수일 때만 값을 씁니다.
+#   쓰는 쪽이 하나뿐이라 락 없이도 읽는 쪽이 쓰다 만 값을 보지 않습니다.
+# - 새 종목은 구독 파일에 한 줄씩 덧붙여 요청하고, 피더가 다음 주기에 칸을 배정합니다.
+# - 표준 라이브러리만 사용합니다. (자동매매 프로그램과 같은 의존성)
+#
+# 사용법:
+#   python Price_feed.py 005930 035720 --interval 1       # 피더 실행
+#   feed = PriceFeedClient()                              # 다른 프로세스에서
+#   feed.subscribe(["000660"])
+#   feed.get_price("005930", max_age=3)                   # 3초 안에 갱신된 현재가 (없으면 None)
+
+import argparse
+import datetime
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+FEED_NAME = "stocktrade24_price_feed"  # 공유 메모리 이름
+SUBSCRIPTION_FILE = os.path.join("feed", "subscriptions.txt")
+MAGIC = b"ST24FEED"
+VERSION = 1
+
+# 머리 부분: 식별자, 버전, 칸 수, 사용 중인 칸 수, 피더 시작 번호, 피더 마지막 동작 시각
+HEADER = struct.Struct("<8sIIIxxxxQd")
+# 칸: 순번, 종목코드, 현재가, 누적 거래량, 갱신 시각(epoch 초)
+SLOT = struct.Struct("<Q12sxxxxdqd")
+SEQ = struct.Struct("<Q")
+MAX_READ_RETRIES = 1000
+
+
+def _open_shared_memory(name):
+    """
+    기존 공유 메모리에 붙습니다. 이 프로세스가 끝나도 메모리가 지워지지 않도록 합니다.
+    (Python 3.13 미만은 붙을 때 resource_tracker 등록을 건너뜁니다. 붙은 뒤 등록을 해제하면
+    같은 tracker를 쓰는 피더 쪽 등록까지 지워지기 때문입니다.)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+
+    from multiprocessing import resource_tracker
+
+    register = resource_tracker.register
+
+    def skip_this_segment(resource_name, rtype):
+        if rtype != 'shared_memory' or resource_name.lstrip('/') != name.lstrip('/'):
+            register(resource_name, rtype)
+
+    resource_tracker.register = skip_this_segment
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _slot_offset(index):
+    return HEADER.size + index * SLOT.size
+
+
+def subscribe(codes, path=SUBSCRIPTION_FILE):
+    """
+    피더에 종목 구독을 요청합니다. (피더가 실행 중이 아니어도 다음 실행 때 반영)
+
+    Parameters:
+        codes (list): 종목코드 목록
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="UTF-8") as f:
+        f.write("".join(f"{code}\n" for code in codes))
+
+
+def read_subscriptions(path=SUBSCRIPTION_FILE):
+    """구독 파일의 종목코드 목록 (중복 제거, 요청 순서 유지)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="UTF-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+class PriceFeedWriter:
+    """
+    현재가 표를 공유 메모리에 만들고 값을 쓰는 쪽입니다. 한 프로세스에서만 사용해야 합니다.
+
+    Parameters:
+        capacity (int): 최대 종목 수
+        name (str): 공유 메모리 이름
+    """
+
+    def __init__(self, capacity=256, name=FEED_NAME):
+        try:
+            stale = _open_shared_memory(name)
+        except FileNotFoundError:
+            stale = None
+        if stale is not None:
+            magic, _, _, _, _, heartbeat = HEADER.unpack_from(stale.buf, 0)
+            if magic == MAGIC and time.time() - heartbeat < 60:
+                stale.close()
+                raise RuntimeError(f"이미 실행 중인 피더가 있습니다: {name}")
+            stale.close()
+            # 죽은 피더가 남긴 표: 등록된 핸들로 지워야 unlink의 등록 해제와 짝이 맞음
+            dead = shared_memory.SharedMemory(name=name)
+            dead.close()
+            dead.unlink()
+
+        self.capacity = capacity
+        self.name = name
+        self._shm = shared_memory.SharedMemory(name=name, create=True,
+                                               size=HEADER.size + capacity * SLOT.size)
+        self._slots = {}
+        self._generation = time.time_ns()
+        self._write_header()
+
+    def _write_header(self):
+        HEADER.pack_into(self._shm.buf, 0, MAGIC, VERSION, self.capacity, len(self._slots),
+                         self._generation, time.time())
+
+    def heartbeat(self):
+        """피더가 살아 있음을 표시합니다."""
+        self._write_header()
+
+    def add(self, code):
+        """종목 칸을 배정합니다. 이미 있으면 기존 칸 번호를 반환합니다."""
+        if code in self._slots:
+            return self._slots[code]
+        if len(self._slots) >= self.capacity:
+            raise ValueError(f"현재가 표가 가득 찼습니다 (최대 {self.capacity}종목)")
+        index = len(self._slots)
+        SLOT.pack_into(self._shm.buf, _slot_offset(index), 0, code.encode("ascii"), 0.0, 0, 0.0)
+        self._slots[code] = index
+        self._write_header()  # 칸을 다 쓴 뒤에 사용 중인 칸 수를 늘립니다
+        return index
+
+    def update(self, code, price, volume=0, timestamp=None):
+        """종목의 현재가를 씁니다. (순번을 홀수로 올리고, 값을 쓰고, 다시 짝수로 올림)"""
+        offset = _slot_offset(self.add(code))
+        buf = self._shm.buf
+        seq = SEQ.unpack_from(buf, offset)[0]
+        SEQ.pack_into(buf, offset, seq + 1)
+        SLOT.pack_into(buf, offset, seq + 1, code.encode("ascii"), float(price), int(volume),
+                       timestamp or time.time())
+        SEQ.pack_into(buf, offset, seq + 2)
+
+    def codes(self):
+        return list(self._slots)
+
+    def close(self):
+        """표를 해제합니다."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PriceFeedClient:
+    """
+    공유 메모리 현재가 표를 읽는 쪽입니다. 여러 프로세스에서 동시에 사용할 수 있습니다.
+
+    Parameters:
+        name (str): 공유 메모리 이름
+        subscription_file (str): 구독 요청 파일
+    """
+
+    def __init__(self, name=FEED_NAME, subscription_file=SUBSCRIPTION_FILE):
+        self.name = name
+        self.subscription_file = subscription_file
+        self._shm = _open_shared_memory(name)
+        magic, version, _, _, _, _ = HEADER.unpack_from(self._shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self._shm.close()
+            raise RuntimeError(f"{name}은(는) 현재가 표가 아닙니다.")
+        self._generation = None
+        self._index = {}
+
+    def _header(self):
+        _, _, capacity, count, generation, heartbeat = HEADER.unpack_from(self._shm.buf, 0)
+        return capacity, count, generation, heartbeat
+
+    def _find(self, code):
+        """종목의 칸 번호 (피더가 다시 시작하면 칸 번호를 새로 찾습니다)"""
+        _, count, generation, _ = self._header()
+        if generation != self._generation:
+            self._generation = generation
+            self._index = {}
+        if code not in self._index:
+            key = code.encode("ascii")
+            for index in range(len(self._index), count):
+                slot_code = SLOT.unpack_from(self._shm.buf, _slot_offset(index))[1].rstrip(b"\0")
+                self._index[slot_code.decode("ascii")] = index
+                if slot_code == key:
+                    break
+        return self._index.get(code)
+
+    def read(self, code):
+        """
+        종목의 최신 값을 읽습니다.
+
+        Returns:
+            tuple: (현재가, 누적 거래량, 갱신 시각 epoch 초) 또는 None (표에 없거나 아직 값이 없음)
+        """
+        index = self._find(code)
+        if index is None:
+            return None
+        offset = _slot_offset(index)
+        buf = self._shm.buf
+        for _ in range(MAX_READ_RETRIES):
+            seq_before = SEQ.unpack_from(buf, offset)[0]
+            if seq_before & 1:
+                continue  # 피더가 쓰는 중
+            _, _, price, volume, timestamp = SLOT.unpack_from(buf, offset)
+            if SEQ.unpack_from(buf, offset)[0] == seq_before:
+                return None if seq_before == 0 else (price, volume, timestamp)
+        return None
+
+    def get_price(self, code, max_age=None):
+        """
+        종목의 현재가를 반환합니다.
+
+        Parameters:
+            code (str): 종목코드
+            max_age (float): 이 시간(초)보다 오래된 값은 None으로 처리
+
+        Returns:
+            float: 현재가 (없거나 오래되었으면 None)
+        """
+        value = self.read(code)
+        if value is None or (max_age is not None and time.time() - value[2] > max_age):
+            return None
+        return value[0]
+
+    def is_alive(self, max_silence=10):
+        """피더가 max_silence초 안에 동작했는지 확인합니다."""
+        return time.time() - self._header()[3] <= max_silence
+
+    def subscribe(self, codes):
+        """피더에 종목 구독을 요청합니다."""
+        subscribe(codes, self.subscription_file)
+
+    def snapshot(self):
+        """표에 있는 모든 종목의 최신 값 {종목코드: (현재가, 누적 거래량, 갱신 시각)}"""
+        _, count, _, _ = self._header()
+        codes = [SLOT.unpack_from(self._shm.buf, _slot_offset(i))[1].rstrip(b"\0").decode("ascii")
+                 for i in range(count)]
+        return {code: self.read(code) for code in codes}
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+
+def connect(name=FEED_NAME, max_silence=10):
+    """
+    실행 중인 피더에 붙습니다. 피더가 없거나 멈춰 있으면 None을 반환합니다.
+
+    사용법: feed = connect()  # None이면 직접 API를 호출
+    """
+    try:
+        client = PriceFeedClient(name)
+    except (FileNotFoundError, RuntimeError):
+        return None
+    if not client.is_alive(max_silence):
+        client.close()
+        return None
+    return client
+
+
+def run_feeder(codes, interval=1.0, max_requests_per_second=15, capacity=256, name=FEED_NAME,
+               subscription_file=SUBSCRIPTION_FILE, fetch=None):
+    """
+    구독 종목의 현재가를 한국투자증권 API로 반복 조회해 공유 메모리 표에 씁니다.
+
+    Parameters:
+        codes (list): 처음부터 구독할 종목코드
+        interval (float): 전체 종목을 한 번 도는 최소 주기(초)
+        max_requests_per_second (float): 초당 최대 API 호출 수 (계좌 호출 한도보다 낮게)
+        fetch (callable): 종목코드 -> (현재가, 누적 거래량) (생략하면 StockAuto_basic.get_quote)
+    """
+    if fetch is None:
+        import StockAuto_basic as kis
+        kis.refresh_token()
+
+        def fetch(code):
+            if datetime.datetime.now() - kis.TOKEN_ISSUED_AT > datetime.timedelta(hours=12):
+                kis.refresh_token()
+            return kis.get_quote(code)
+
+    subscribe(codes, subscription_file)
+    min_gap = 1.0 / max_requests_per_second
+    subscription_mtime = None
+    with PriceFeedWriter(capacity, name) as writer:
+        print(f"현재가 피더를 시작합니다: {name}")
+        while True:
+            cycle_start = time.monotonic()
+            mtime = os.path.getmtime(subscription_file) if os.path.exists(subscription_file) else None
+            if mtime != subscription_mtime:  # 구독 파일이 바뀌었을 때만 다시 읽습니다
+                subscription_mtime = mtime
+                for code in read_subscriptions(subscription_file):
+                    if code not in writer.codes():
+                        writer.add(code)
+                        print(f"구독 추가: {code}")
+            writer.heartbeat()  # 구독 종목이 없어도 살아 있음을 표시
+
+            for code in writer.codes():
+                request_start = time.monotonic()
+                try:
+                    price, volume = fetch(code)
+                    writer.update(code, price, volume)
+                except Exception as e:
+                    print(f"{code} 현재가 조회 실패: {e}")
+                writer.heartbeat()
+                time.sleep(max(0.0, min_gap - (time.monotonic() - request_start)))
+            time.sleep(max(0.0, interval - (time.monotonic() - cycle_start)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='공유 메모리 현재가 피더')
+    parser.add_argument('codes', nargs='*', help='구독할 종목코드')
+    parser.add_argument('--interval', type=float, default=1.0, help='전체 종목 조회 주기(초)')
+    parser.add_argument('--max-rps', type=float, default=15, help='초당 최대 API 호출 수')
+    parser.add_argument('--capacity', type=int, default=256, help='최대 종목 수')
+    parser.add_argument('--show', action='store_true', help='실행 중인 피더의 표를 출력하고 종료')
+    args = parser.parse_args()
+
+    if args.show:
+        feed = connect()
+        if feed is None:
+            print("실행 중인 피더가 없습니다.")
+        else:
+            for code, value in feed.snapshot().items():
+                if value is None:
+                    print(f"{code}: 값 없음")
+                else:
+                    updated = datetime.datetime.fromtimestamp(value[2])
+                    print(f"{code}: {value[0]:,.0f}원 거래량 {value[1]:,} ({updated:%H:%M:%S})")
+    else:
+        try:
+            run_feeder(args.codes, args.interval, args.max_rps, args.capacity)
+        except KeyboardInterrupt:
+            print("피더를 종료합니다.")
@@ -0,0 +1,223 @@
+# StockTrade24.com
+# 공유 메모리 가격 패널
+#
+# 백테스트를 여러 프로세스로 병렬 실행하면 프로세스마다 가격 DataFrame이
+# pickle로 복사되어 메모리 사용량이 프로세스 수만큼 늘어납니다.
+# 이 모듈은 가격 데이터를 공유 메모리(또는 메모리 매핑 파일)에 한 번만 올려두고,
+# 각 프로세스가 복사 없이 읽기 전용 NumPy/pandas 뷰로 붙어서 읽도록 합니다.
+#
+# 사용법:
+#   with SharedPricePanel(data, dtype='float32') as panel:
+#       handle = panel.handle               # 작은 설명 정보만 다른 프로세스로 전달
+#       ...
+#   (작업 프로세스에서) prices = attach_panel(handle)
+
+import os
+import uuid
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+BACKENDS = ('shm', 'mmap')
+
+_ATTACHED = {}  # 붙어 있는 공유 메모리 객체 (뷰가 살아있는 동안 유지해야 함)
+
+
+def _layout(n_rows, n_cols, dtype):
+    """블록 구성: [날짜(int64) n_rows개][가격 n_rows x n_cols]"""
+    index_bytes = n_rows * 8
+    value_bytes = n_rows * n_cols * np.dtype(dtype).itemsize
+    return index_bytes, max(index_bytes + value_bytes, 1)
+
+
+def _views(buffer, n_rows, n_cols, dtype):
+    """버퍼 위에 날짜 배열과 가격 행렬 뷰를 만듭니다."""
+    index_bytes, _ = _layout(n_rows, n_cols, dtype)
+    index = np.ndarray((n_rows,), dtype=np.int64, buffer=buffer, offset=0)
+    values = np.ndarray((n_rows, n_cols), dtype=dtype, buffer=buffer, offset=index_bytes)
+    return index, values
+
+
+class SharedPricePanel:
+    """
+    가격 DataFrame을 공유 메모리에 올리는 클래스입니다.
+    이 객체를 만든 프로세스가 데이터의 주인이며, close()를 호출하면 메모리가 해제됩니다.
+
+    Parameters:
+        df (pandas.DataFrame): 날짜 인덱스를 가진 가격 데이터 (숫자 컬럼만)
+        dtype (str): 저장 자료형 ('float64' 또는 메모리를 절반으로 줄이는 'float32')
+        backend (str): 'shm'(공유 메모리) 또는 'mmap'(메모리 매핑 파일)
+        path (str): 'mmap' 방식일 때 파일 경로 (생략하면 임시 폴더에 생성)
+    """
+
+    def __init__(self, df, dtype='float64', backend='shm', path=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend는 {BACKENDS} 중 하나여야 합니다: {backend}")
+
+        index = pd.DatetimeIndex(df.index)
+        n_rows, n_cols = df.shape
+        _, total_bytes = _layout(n_rows, n_cols, dtype)
+
+        self._shm = None
+        self._path = None
+        if backend == 'shm':
+            self._shm = shared_memory.SharedMemory(create=True, size=total_bytes)
+            buffer = self._shm.buf
+            location = self._shm.name
+        else:
+            self._path = path or os.path.join(os.environ.get('TMPDIR', '/tmp'),
+                                              f"price_panel_{uuid.uuid4().hex}.bin")
+            buffer = np.memmap(self._path, dtype=np.uint8, mode='w+', shape=(total_bytes,))
+            location = self._path
+
+        index_view, values_view = _views(buffer, n_rows, n_cols, dtype)
+        index_view[:] = index.tz_localize(None).as_unit('ns').asi8 if index.tz is not None \
+            else index.as_unit('ns').asi8
+        values_view[:] = df.to_numpy(dtype=dtype)
+        if backend == 'mmap':
+            buffer.flush()
+        del index_view, values_view, buffer
+
+        # 다른 프로세스로 넘길 설명 정보 (데이터 자체는 포함하지 않음)
+        self.handle = {
+            'backend': backend,
+            'location': location,
+            'shape': (n_rows, n_cols),
+            'dtype': np.dtype(dtype).str,
+            'tz': str(index.tz) if index.tz is not None else None,
+            'index_name': index.name,
+            'columns': list(df.columns),
+            'column_names': list(df.columns.names),
+        }
+
+    def close(self):
+        """공유 메모리(또는 매핑 파일)를 해제합니다."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        if self._path is not None:
+            if os.path.exists(self._path):
+                os.remove(self._path)
+            self._path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _open_shared_memory(name):
+    """
+    기존 공유 메모리에 붙습니다. 작업 프로세스가 끝나도 메모리가 지워지지 않도록 합니다.
+    Python 3.13 미만에서는 붙기만 해도 resource_tracker에 등록되는데, spawn/fork 작업 프로세스는
+    만든 프로세스와 같은 tracker를 쓰므로 붙은 뒤 등록을 해제하면 만든 쪽 등록까지 지워집니다.
+    (종료 시 KeyError, 비정상 종료 시 메모리 누수) 그래서 붙을 때 등록 자체를 하지 않습니다.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+
+    from multiprocessing import resource_tracker
+
+    register = resource_tracker.register
+
+    def skip_this_segment(resource_name, rtype):
+        if rtype != 'shared_memory' or resource_name.lstrip('/') != name.lstrip('/'):
+            register(resource_name, rtype)
+
+    resource_tracker.register = skip_this_segment
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def attach_array(handle):
+    """
+    공유된 패널에 붙어 날짜(datetime64[ns])와 가격 행렬을 읽기 전용 배열로 반환합니다.
+
+    Returns:
+        tuple: (numpy.ndarray 날짜, numpy.ndarray 가격 행렬)
+    """
+    n_rows, n_cols = handle['shape']
+    dtype = np.dtype(handle['dtype'])
+    location = handle['location']
+
+    if handle['backend'] == 'shm':
+        if location not in _ATTACHED:
+            _ATTACHED[location] = _open_shared_memory(location)
+        buffer = _ATTACHED[location].buf
+    else:
+        _, total_bytes = _layout(n_rows, n_cols, dtype)
+        buffer = np.memmap(location, dtype=np.uint8, mode='r', shape=(total_bytes,))
+
+    index, values = _views(buffer, n_rows, n_cols, dtype)
+    index.flags.writeable = False
+    values.flags.writeable = False
+    return index.view('datetime64[ns]'), values
+
+
+def attach_panel(handle):
+    """
+    공유된 패널을 복사 없이 읽기 전용 DataFrame으로 반환합니다.
+
+    사용법: prices = attach_panel(handle)
+
+    Parameters:
+        handle (dict): SharedPricePanel.handle
+
+    Returns:
+        pandas.DataFrame: 가격 데이터 (값은 공유 메모리를 직접 가리킴)
+    """
+    index, values = attach_array(handle)
+    index = pd.DatetimeIndex(index, name=handle['index_name'])
+    if handle['tz'] is not None:
+        index = index.tz_localize(handle['tz'])
+
+    columns = handle['columns']
+    if columns and isinstance(columns[0], tuple):
+        columns = pd.MultiIndex.from_tuples(columns, names=handle['column_names'])
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+def detach_all():
+    """이 프로세스에서 붙었던 공유 메모리 연결을 모두 닫습니다. (해제는 하지 않음)"""
+    for shm in _ATTACHED.values():
+        try:
+            shm.close()
+        except BufferError:
+            pass  # 아직 사용 중인 뷰가 있으면 프로세스 종료 시 정리됩니다
+    _ATTACHED.clear()
+
+
+def panel_from_universe(universe, fields=('Open', 'High', 'Low', 'Close', 'Volume')):
+    """
+    종목별 OHLCV dict를 하나의 패널(컬럼: (티커, 항목))로 합칩니다.
+    시간대가 다른 시장을 섞어도 날짜가 밀리지 않도록 각 종목의 현지 날짜를 사용합니다.
+
+    Parameters:
+        universe (dict): {티커: OHLCV DataFrame}
+        fields (tuple): 패널에 포함할 항목
+
+    Returns:
+        pandas.DataFrame: MultiIndex 컬럼 (ticker, field) 패널
+    """
+    frames = {}
+    for ticker, ohlcv in universe.items():
+        frame = ohlcv[[f for f in fields if f in ohlcv.columns]].astype(float)
+        if frame.index.tz is not None:
+            frame = frame.set_axis(frame.index.tz_localize(None), axis=0)
+        frames[ticker] = frame
+    panel = pd.concat(frames, axis=1, names=['ticker', 'field']).sort_index()
+    return panel
+
+
+def ticker_view(panel, ticker):
+    """패널에서 한 종목의 OHLCV만 꺼냅니다. (그 종목이 거래되지 않은 날은 제외)"""
+    frame = panel[ticker]
+    traded = frame['Close'].notna() if 'Close' in frame.columns else frame.notna().any(axis=1)
+    return frame if traded.all() else frame[traded]
@@ -0,0 +1,299 @@
+# StockTrade24.com
+# 백테스트 결과 저장소
+#
+# 전략, 파라미터, 수수료 모델, 입력 데이터가 모두 같은 백테스트는 결과도 같으므로
+# 이 네 가지로 만든 해시 키로 결과(평가금액 곡선, 보유 수량, 성과지표)를 저장해 두고
+# 같은 실험을 다시 실행하면 계산 없이 저장된 결과를 바로 돌려줍니다.
+# 실행 정보와 성과지표는 SQLite에, 곡선과 보유 수량은 Parquet(없으면 pickle) 파일에 저장합니다.
+#
+# 사용법:
+#   store = ResultStore()
+#   run = store.fetch_or_run('RSIStrategy', params, None, data, lambda: bt.run(backtest))
+#   table = store.query(strategy='RSIStrategy')   # 파라미터 스윕 결과 비교
+
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from Backtest_stats import STAT_COLUMNS, calculate_stats
+from Data_cache import read_frame, write_frame
+
+RESULT_DIR = os.environ.get("STOCKTRADE_RESULT_DIR", "results")  # 결과 저장 폴더
+QUERY_CHUNK = 500  # query에서 한 번에 조회할 결과 키 수
+
+
+def data_fingerprint(data):
+    """
+    입력 데이터(날짜, 컬럼, 값)의 지문을 만듭니다. 값이 하나라도 바뀌면 지문이 달라집니다.
+
+    Parameters:
+        data (pandas.DataFrame 또는 Series): 가격/지표 데이터
+
+    Returns:
+        str: 16진수 해시 문자열
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    columns = data.columns if isinstance(data, pd.DataFrame) else [data.name]
+    digest.update(repr(list(columns)).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def describe(obj):
+    """
+    전략 클래스나 수수료 함수를 키에 넣을 수 있는 문자열로 바꿉니다.
+    함수/클래스는 이름과 소스 코드 해시를 함께 사용하므로 코드를 고치면 키도 바뀝니다.
+    클래스는 bt 라이브러리 클래스(bt.Algo 등)에 닿기 전까지의 부모 클래스 소스도 함께 해시합니다.
+    (예: FastAlgo를 고치면 이를 상속한 전략들의 키도 바뀜)
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if callable(obj):
+        name = f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}"
+        parts = obj.__mro__ if isinstance(obj, type) else (obj,)
+        digest = hashlib.blake2b(digest_size=8)
+        for part in parts:
+            if isinstance(obj, type) and (part is object or part.__module__.split('.')[0] == 'bt'):
+                break
+            try:
+                digest.update(inspect.getsource(part).encode())
+            except (OSError, TypeError):
+                if part is obj:
+                    return name
+        return f"{name}@{digest.hexdigest()}"
+    return repr(obj)
+
+
+def run_key(strategy, params, commission, fingerprint):
+    """
+    전략, 파라미터, 수수료 모델, 데이터 지문으로 결과 키를 만듭니다.
+
+    Returns:
+        str: 결과 키 (16진수 해시 문자열)
+    """
+    payload = json.dumps({
+        'strategy': describe(strategy),
+        'params': params or {},
+        'commission': describe(commission),
+        'data': fingerprint,
+    }, sort_keys=True, default=repr)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class StoredRun:
+    """
+    저장소에 보관된 백테스트 결과 하나입니다.
+
+    Attributes:
+        key (str): 결과 키
+        prices (pandas.DataFrame): 전략별 가치 지수 (bt의 results.prices와 같은 형태)
+        positions (pandas.DataFrame): 보유 수량 (컬럼: (전략 이름, 자산))
+        stats (pandas.DataFrame): 성과지표 (행: 전략, 열: STAT_COLUMNS)
+        info (dict): 전략, 파라미터, 수수료, 데이터 지문, 저장 시각, 계산 시간
+        cached (bool): 저장된 결과를 읽어온 것인지 여부
+    """
+
+    def __init__(self, key, prices, positions, stats, info, cached):
+        self.key = key
+        self.prices = prices
+        self.positions = positions
+        self.stats = stats
+        self.info = info
+        self.cached = cached
+
+
+class ResultStore:
+    """
+    백테스트 결과 저장소입니다. 여러 프로세스가 같은 폴더를 함께 써도 됩니다.
+
+    Parameters:
+        path (str): 저장 폴더 (SQLite 파일과 곡선 파일이 저장됨)
+    """
+
+    def __init__(self, path=RESULT_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, "results.sqlite"), timeout=30)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                key TEXT PRIMARY KEY,
+                strategy TEXT,
+                params TEXT,
+                commission TEXT,
+                data_fingerprint TEXT,
+                created_at TEXT,
+                elapsed REAL
+            );
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT,
+                name TEXT,
+                stat TEXT,
+                value REAL,
+                PRIMARY KEY (key, name, stat)
+            );
+            CREATE INDEX IF NOT EXISTS runs_strategy ON runs (strategy);
+        """)
+        self._conn.commit()
+
+    def _frame_path(self, key, kind):
+        return os.path.join(self.path, key[:2], f"{key}_{kind}")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, key):
+        """
+        결과 키로 저장된 결과를 읽습니다. 없으면 None을 반환합니다.
+
+        Returns:
+            StoredRun 또는 None
+        """
+        row = self._conn.execute(
+            "SELECT strategy, params, commission, data_fingerprint, created_at, elapsed "
+            "FROM runs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        prices = read_frame(self._frame_path(key, "prices"))
+        if prices is None:
+            return None  # 파일이 지워진 경우 다시 계산합니다
+        positions = read_frame(self._frame_path(key, "positions"))
+
+        stats = pd.DataFrame(
+            self._conn.execute("SELECT name, stat, value FROM stats WHERE key = ?", (key,)).fetchall(),
+            columns=['name', 'stat', 'value'])
+        stats = stats.pivot(index='name', columns='stat', values='value')
+        stats = stats.reindex(index=list(prices.columns), columns=STAT_COLUMNS).rename_axis(index=None, columns=None)
+
+        info = dict(zip(['strategy', 'params', 'commission', 'data_fingerprint', 'created_at', 'elapsed'], row))
+        info['params'] = json.loads(info['params'])
+        return StoredRun(key, prices, positions, stats, info, cached=True)
+
+    def put(self, key, prices, positions=None, strategy=None, params=None, commission=None,
+            fingerprint=None, elapsed=None):
+        """
+        결과를 저장합니다. 같은 키가 있으면 덮어씁니다.
+
+        Parameters:
+            key (str): 결과 키 (run_key 결과)
+            prices (pandas.DataFrame): 전략별 가치 지수
+            positions (pandas.DataFrame): 보유 수량 (생략 가능)
+            strategy, params, commission, fingerprint: 결과 키를 만든 값 (조회용으로 기록)
+            elapsed (float): 계산에 걸린 시간(초)
+
+        Returns:
+            StoredRun: 저장된 결과
+        """
+        write_frame(prices, self._frame_path(key, "prices"))
+        if positions is not None:
+            write_frame(positions, self._frame_path(key, "positions"))
+        stats = calculate_stats(prices)
+
+        info = {
+            'strategy': describe(strategy),
+            'params': json.loads(json.dumps(params or {}, sort_keys=True, default=repr)),
+            'commission': describe(commission),
+            'data_fingerprint': fingerprint,
+            'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'elapsed': elapsed,
+        }
+        with self._conn:
+            self._conn.execute("DELETE FROM stats WHERE key = ?", (key,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, info['strategy'], json.dumps(info['params'], sort_keys=True), info['commission'],
+                 fingerprint, info['created_at'], elapsed))
+            self._conn.executemany(
+                "INSERT INTO stats VALUES (?, ?, ?, ?)",
+                [(key, str(name), stat, None if pd.isna(value) else float(value))
+                 for name, values in stats.iterrows() for stat, value in values.items()])
+        return StoredRun(key, prices, positions, stats, info, cached=False)
+
+    def fetch_or_run(self, strategy, params, commission, data, run):
+        """
+        같은 실험의 결과가 있으면 바로 돌려주고, 없으면 run()을 실행해 저장합니다.
+
+        사용법: result = store.fetch_or_run(RSIStrategy, {'rsi_upper': 70}, None, data,
+                                            lambda: bt.run(backtest, benchmark))
+
+        Parameters:
+            strategy: 전략 클래스 또는 이름 (클래스면 소스 코드가 키에 포함됨)
+            params (dict): 전략 파라미터
+            commission: 수수료 함수 또는 설명 문자열 (없으면 None)
+            data (pandas.DataFrame): 백테스트 입력 데이터
+            run (function): bt.Result를 반환하는 함수 (저장된 결과가 없을 때만 호출)
+
+        Returns:
+            StoredRun: 저장된(또는 새로 계산된) 결과
+        """
+        fingerprint = data_fingerprint(data)
+        key = run_key(strategy, params, commission, fingerprint)
+        stored = self.get(key)
+        if stored is not None:
+            return stored
+
+        start = time.perf_counter()
+        results = run()
+        elapsed = time.perf_counter() - start
+
+        positions = pd.concat({name: backtest.positions for name, backtest in results.backtests.items()},
+                              axis=1, names=['strategy', 'security'])
+        return self.put(key, results.prices, positions, strategy, params, commission,
+                        fingerprint, elapsed)
+
+    def query(self, strategy=None, stats=STAT_COLUMNS, **params):
+        """
+        저장된 결과를 파라미터와 성과지표 표로 조회합니다. (다시 계산하지 않음)
+
+        사용법: table = store.query(strategy='RSIStrategy', rsi_lower=30)
+
+        Parameters:
+            strategy (str): 전략 이름 (describe 결과의 앞부분만 적어도 됨, 생략하면 전체)
+            stats (list): 표에 포함할 성과지표
+            params: 이 값과 같은 파라미터를 가진 결과만 조회
+
+        Returns:
+            pandas.DataFrame: 결과 키와 전략 이름별 한 행 (파라미터 컬럼 + 성과지표 컬럼)
+        """
+        sql = "SELECT key, strategy, params, commission, data_fingerprint, created_at FROM runs"
+        args = ()
+        if strategy is not None:
+            sql += " WHERE strategy LIKE ?"
+            args = (f"%{strategy}%",)
+        runs = pd.DataFrame(self._conn.execute(sql, args).fetchall(),
+                            columns=['key', 'strategy', 'params', 'commission', 'data_fingerprint', 'created_at'])
+        if runs.empty:
+            return pd.DataFrame()
+
+        param_table = pd.DataFrame([json.loads(p) for p in runs['params']], index=runs.index)
+        runs = pd.concat([runs.drop(columns='params'), param_table], axis=1)
+        for name, value in params.items():
+            if name not in runs.columns:
+                return pd.DataFrame()
+            runs = runs[runs[name] == value]
+
+        if runs.empty:
+            return pd.DataFrame()
+
+        # SQLite의 자리표시자 개수 제한(오래된 버전은 999개)을 넘지 않도록 나눠서 조회
+        keys = list(runs['key'])
+        rows = []
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows += self._conn.execute(f"SELECT key, name, stat, value FROM stats WHERE key IN ({placeholders})",
+                                       chunk).fetchall()
+        values = pd.DataFrame(rows, columns=['key', 'name', 'stat', 'value'])
+        wide = values.pivot_table(index=['key', 'name'], columns='stat', values='value', dropna=False)
+        wide = wide.reindex(columns=list(stats)).reset_index()
+        return runs.merge(wide, on='key').set_index(['key', 'name'])
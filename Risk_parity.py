@@ -0,0 +1,301 @@
+# StockTrade24.com
+# 리스크 패리티(위험 균형) 자산배분
+#
+# 올웨더 포트폴리오 스크립트는 TIPS/원자재/금/리츠에 30/20/20/30 고정 비중을 씁니다.
+# 원래 올웨더는 자산마다 포트폴리오 위험에 기여하는 몫이 같도록(equal risk contribution) 비중을 정하므로,
+# 이 모듈은 공분산 행렬을 추정해 리밸런싱일마다 위험 기여도가 같은 비중을 계산합니다.
+# - 공분산은 리밸런싱 때마다 과거 구간 전체로 다시 계산하지 않고, 매일 새 수익률 하나로 갱신합니다.
+#   (EWMA: 지수가중 평균/공분산 갱신, 고정 구간: 새 날 추가 + 가장 오래된 날 제거의 rank-1 갱신)
+# - 위험 기여도 균형 비중은 Spinu(2013)의 볼록 문제를 뉴턴법으로 풀고, 직전 비중에서 시작해
+#   보통 2~4번 반복으로 수렴합니다.
+# 자산 100개 이상, 매일 리밸런싱도 수 초 안에 계산되며 결과 비중표는 bt.algos.WeighTarget이나
+# Backtest_ranking.simulate_weights에 그대로 사용할 수 있습니다.
+#
+# 사용법:
+#   weights = risk_parity_weights(data[us_columns], halflife=60, rebalance='monthly')
+#   strategy = bt.Strategy('US Risk Parity', [RiskParityAlgo(data[us_columns]), bt.algos.Rebalance()])
+#
+#   python Risk_parity.py --portfolio allweather --market US --rebalance monthly
+#   python Risk_parity.py --synthetic 100 --bars 2520 --rebalance daily
+
+import argparse
+import time
+
+import bt
+import numpy as np
+import pandas as pd
+
+from Backtest_allocation import _period_keys
+
+REBALANCE_MODES = ('daily', 'monthly', 'quarterly')
+
+
+class RollingCovariance:
+    """
+    수익률을 하루씩 받아 공분산 행렬을 갱신하는 클래스입니다. (갱신 한 번에 O(자산 수^2))
+
+    halflife를 주면 지수가중(EWMA) 평균/공분산을, window를 주면 최근 window일 표본 공분산을 유지합니다.
+    고정 구간은 새 날을 더하고 window일 전 날을 빼는 평균 중심 rank-1 갱신(Welford 방식)이라
+    합계를 빼는 방식보다 오차가 쌓이지 않습니다.
+
+    Parameters:
+        n_assets (int): 자산 수
+        halflife (float): EWMA 반감기(일)
+        window (int): 고정 구간 길이(일) (halflife와 둘 중 하나만 지정)
+    """
+
+    def __init__(self, n_assets, halflife=None, window=None):
+        if (halflife is None) == (window is None):
+            raise ValueError("halflife와 window 중 하나만 지정하세요.")
+        self.halflife = halflife
+        self.window = window
+        self.alpha = None if halflife is None else 1 - np.exp(np.log(0.5) / halflife)
+        self.count = 0
+        self.mean = np.zeros(n_assets)
+        self.m2 = np.zeros((n_assets, n_assets))  # EWMA는 공분산, 고정 구간은 편차 곱의 합
+        self._buffer = None if window is None else np.empty((window, n_assets))
+
+    def update(self, returns):
+        """하루치 수익률 벡터를 반영합니다."""
+        x = np.asarray(returns, dtype=float)
+        if self.alpha is not None:
+            if self.count == 0:
+                self.mean = x.copy()
+            else:
+                delta = x - self.mean
+                self.mean += self.alpha * delta
+                self.m2 = (1 - self.alpha) * (self.m2 + self.alpha * np.outer(delta, delta))
+            self.count += 1
+            return
+
+        slot = self.count % self.window
+        if self.count >= self.window:
+            # window일 전 수익률 제거 (추가의 역연산)
+            old = self._buffer[slot]
+            n = min(self.count, self.window)
+            mean = self.mean - (old - self.mean) / (n - 1)
+            self.m2 -= np.outer(old - mean, old - self.mean)
+            self.mean = mean
+        n = min(self.count, self.window - 1) + 1
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += np.outer(delta, x - self.mean)
+        self._buffer[slot] = x
+        self.count += 1
+
+    def covariance(self):
+        """현재 공분산 행렬 (고정 구간은 표본 공분산, ddof=1)"""
+        if self.alpha is not None:
+            return self.m2.copy()
+        n = min(self.count, self.window)
+        return self.m2 / (n - 1) if n > 1 else np.full_like(self.m2, np.nan)
+
+
+def erc_weights(cov, budget=None, x0=None, tol=1e-14, max_iter=50):
+    """
+    위험 기여도 균형(equal risk contribution) 비중을 계산하는 함수입니다.
+    f(y) = y'Σy/2 - Σ b_i log(y_i)의 최솟값에서 y_i (Σy)_i = b_i 이므로 w = y / sum(y)가
+    자산별 위험 기여도 w_i (Σw)_i가 위험 예산 b에 비례하는 비중이 됩니다. (Spinu 2013, 뉴턴법)
+
+    Parameters:
+        cov (numpy.ndarray): 공분산 행렬 (자산 x 자산)
+        budget (numpy.ndarray): 자산별 위험 예산 (생략하면 모두 같게)
+        x0 (numpy.ndarray): 시작 비중 (직전 리밸런싱 비중을 넘기면 빨리 수렴)
+        tol (float): 수렴 기준 (뉴턴 감소량)
+        max_iter (int): 최대 반복 횟수
+
+    Returns:
+        numpy.ndarray: 합계 1인 비중 (분산이 0이거나 NaN인 자산이 있으면 ValueError)
+    """
+    n = len(cov)
+    variances = np.diag(cov)
+    if not np.all(np.isfinite(cov)) or np.any(variances <= 0):
+        raise ValueError("분산이 0이거나 NaN인 자산이 있어 리스크 패리티 비중을 계산할 수 없습니다.")
+    b = np.full(n, 1.0 / n) if budget is None else np.asarray(budget, dtype=float) / np.sum(budget)
+    if x0 is None or not np.all(x0 > 0):
+        x0 = 1.0 / np.sqrt(variances)  # 역변동성 비중에서 시작
+    # 최적해의 크기(y'Σy = sum(b) = 1)에 맞춰 시작점 조정
+    y = x0 / np.sqrt(x0 @ cov @ x0)
+
+    def objective(v):
+        return 0.5 * v @ cov @ v - b @ np.log(v)
+
+    value = objective(y)
+    for _ in range(max_iter):
+        gradient = cov @ y - b / y
+        hessian = cov + np.diag(b / y ** 2)
+        try:
+            step = np.linalg.solve(hessian, gradient)
+        except np.linalg.LinAlgError:
+            raise ValueError("공분산 행렬이 특이해 리스크 패리티 비중을 계산할 수 없습니다.")
+        decrement = gradient @ step
+        if decrement / 2 < tol:
+            break
+        t = 1.0
+        while np.any(y - t * step <= 0):  # 비중이 양수로 남도록
+            t *= 0.5
+        while True:  # Armijo 조건으로 감소 확인
+            candidate = y - t * step
+            candidate_value = objective(candidate)
+            if candidate_value <= value - 0.25 * t * decrement or t < 1e-10:
+                break
+            t *= 0.5
+        y, value = candidate, candidate_value
+    weights = y / y.sum()
+    if not np.all(np.isfinite(weights)):
+        raise ValueError("리스크 패리티 비중이 수렴하지 않았습니다.")
+    return weights
+
+
+def risk_contributions(weights, cov):
+    """자산별 위험 기여도 비율 w_i (Σw)_i / w'Σw (합계 1)"""
+    weights = np.asarray(weights, dtype=float)
+    marginal = cov @ weights
+    return weights * marginal / (weights @ marginal)
+
+
+def _rebalance_flags(dates, rebalance):
+    """리밸런싱일 표시 (첫 거래일 포함)"""
+    if rebalance not in REBALANCE_MODES:
+        raise ValueError(f"rebalance는 {REBALANCE_MODES} 중 하나여야 합니다: {rebalance}")
+    if rebalance == 'daily':
+        return np.ones(len(dates), dtype=bool)
+    keys = _period_keys(dates, rebalance)
+    return np.r_[True, keys[1:] != keys[:-1]]
+
+
+def risk_parity_weights(prices, halflife=60, window=None, rebalance='monthly', min_periods=20,
+                        budget=None, fallback=None):
+    """
+    리밸런싱일마다 위험 기여도 균형 비중을 계산해 비중표를 만드는 함수입니다.
+    공분산은 매일 그날 종가까지의 수익률로 갱신하고, 리밸런싱일 종가에 매매하는 비중을 계산합니다.
+
+    사용법: weights = risk_parity_weights(data[['US_TIP', 'US_DBC', 'US_GLD', 'US_VNQ']])
+
+    Parameters:
+        prices (pandas.DataFrame): 가격 데이터 (날짜 x 자산)
+        halflife (float): EWMA 공분산 반감기(일)
+        window (int): 고정 구간 공분산 길이(일) (지정하면 halflife 대신 사용)
+        rebalance (str): 'daily', 'monthly', 'quarterly' 중 하나
+        min_periods (int): 리스크 패리티 비중을 계산하기 시작할 최소 수익률 개수
+        budget (pandas.Series 또는 array): 자산별 위험 예산 (생략하면 모두 같게)
+        fallback (pandas.Series): 수익률이 충분히 쌓이기 전이나 분산이 0인 자산이 있는 리밸런싱일에
+            쓸 비중 (예: 고정 비중, 없으면 그 리밸런싱을 건너뜀)
+
+    Returns:
+        pandas.DataFrame: 비중표 (행: 리밸런싱일, 열: 자산)
+    """
+    prices = prices.ffill().dropna()
+    columns = prices.columns
+    values = prices.to_numpy(dtype=float)
+    returns = np.zeros_like(values)
+    returns[1:] = values[1:] / values[:-1] - 1
+    flags = _rebalance_flags(prices.index, rebalance)
+    if isinstance(budget, pd.Series):
+        budget = budget.reindex(columns).to_numpy(dtype=float)
+    fallback_row = None if fallback is None else fallback.reindex(columns, fill_value=0.0).to_numpy(dtype=float)
+    if window is not None:
+        halflife = None
+        min_periods = max(min_periods, 2)
+
+    estimator = RollingCovariance(len(columns), halflife=halflife, window=window)
+    rows, weights = [], []
+    previous = None
+    for t in range(len(values)):
+        if t > 0:
+            estimator.update(returns[t])
+        if not flags[t]:
+            continue
+        row = None
+        if estimator.count >= min_periods:
+            try:
+                row = erc_weights(estimator.covariance(), budget, previous)
+            except ValueError:
+                row = None  # 가격이 멈춘 자산 등: 고정 비중을 쓰거나 건너뜀
+        if row is not None:
+            previous = row
+            weights.append(row)
+        elif fallback_row is not None:
+            weights.append(fallback_row)
+        else:
+            continue
+        rows.append(t)
+    return pd.DataFrame(np.array(weights).reshape(len(rows), len(columns)),
+                        index=prices.index[rows], columns=columns)
+
+
+class RiskParityAlgo(bt.Algo):
+    """
+    리밸런싱일마다 리스크 패리티 비중을 target.temp['weights']에 넣는 bt.Algo입니다.
+    처음 호출될 때 risk_parity_weights로 전체 비중표를 한 번에 계산하고,
+    이후에는 날짜별로 찾아 쓰기만 합니다. (리밸런싱일이 아니면 False를 반환해 Rebalance를 건너뜀)
+
+    사용법: bt.Strategy('US Risk Parity', [RiskParityAlgo(prices), bt.algos.Rebalance()])
+
+    Parameters:
+        prices (pandas.DataFrame): 비중을 계산할 자산의 가격 데이터
+        (그 외 인자는 risk_parity_weights와 동일)
+    """
+
+    def __init__(self, prices, halflife=60, window=None, rebalance='monthly', min_periods=20,
+                 budget=None, fallback=None):
+        super(RiskParityAlgo, self).__init__()
+        self.prices = prices
+        self.params = dict(halflife=halflife, window=window, rebalance=rebalance,
+                           min_periods=min_periods, budget=budget, fallback=fallback)
+        self.weights = None
+        self._rows = {}
+
+    def __call__(self, target):
+        if self.weights is None:
+            self.weights = risk_parity_weights(self.prices, **self.params)
+            index = pd.DatetimeIndex(self.weights.index).as_unit('ns')
+            self._rows = dict(zip(index.asi8.tolist(), range(len(self.weights))))
+        i = self._rows.get(target.now.value)
+        if i is None:
+            return False
+        target.temp['weights'] = self.weights.iloc[i]
+        return True
+
+
+if __name__ == "__main__":
+    from Backtest_ranking import simulate_weights
+    from Backtest_stats import calculate_stats
+
+    parser = argparse.ArgumentParser(description='리스크 패리티 자산배분')
+    parser.add_argument('--portfolio', default='allweather', help='포트폴리오 키 (Backtest_strategies.PORTFOLIOS)')
+    parser.add_argument('--market', choices=['US', 'KR'], default='US', help='시장')
+    parser.add_argument('--synthetic', type=int, help='가상 자산 수 (인터넷 없이 속도 확인)')
+    parser.add_argument('--bars', type=int, default=2520, help='가상 데이터 일수')
+    parser.add_argument('--halflife', type=float, default=60, help='EWMA 공분산 반감기(일)')
+    parser.add_argument('--window', type=int, help='고정 구간 공분산 길이(일) (지정하면 EWMA 대신 사용)')
+    parser.add_argument('--rebalance', choices=REBALANCE_MODES, default='monthly', help='리밸런싱 주기')
+    parser.add_argument('--fee', type=float, default=0.0018, help='매매 수수료율')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from Synthetic_market import generate_prices
+        prices = generate_prices(args.bars, args.synthetic, seed=0)
+        fixed = pd.Series(1.0 / prices.shape[1], index=prices.columns)
+    else:
+        from Backtest_strategies import load_portfolio_prices, portfolio_weights
+        prices = load_portfolio_prices(args.portfolio, market=args.market)
+        fixed = portfolio_weights(args.portfolio)[args.market]
+        prices = prices[fixed.index]
+
+    started = time.perf_counter()
+    weights = risk_parity_weights(prices, args.halflife, args.window, args.rebalance, fallback=fixed)
+    elapsed = time.perf_counter() - started
+
+    prices = prices.ffill().dropna()
+    fixed_weights = pd.DataFrame([fixed.reindex(prices.columns).to_numpy()] * len(weights),
+                                 index=weights.index, columns=prices.columns)
+    curves = pd.concat([simulate_weights(prices, weights, args.fee, name='Risk Parity'),
+                        simulate_weights(prices, fixed_weights, args.fee, name='Fixed Weights')], axis=1)
+
+    print(f"\n{prices.shape[1]}개 자산 x {len(prices)}일, 리밸런싱 {len(weights)}회: {elapsed:.2f}초")
+    print("\n===== 성과 비교 =====")
+    print(calculate_stats(curves).round(4).to_string())
+    if prices.shape[1] <= 20:
+        print("\n===== 최근 리스크 패리티 비중 =====")
+        print(weights.tail().round(4).to_string())
@@ -4,11 +4,20 @@
 # 최종수정일: 2024.11.23
 
 # 필요한 라이브러리들을 불러옵니다
+import argparse # 실행 옵션(상주 모드)을 읽기 위한 라이브러리
 import requests  # 인터넷을 통해 API 요청을 보내기 위한 라이브러리
 import json     # API 응답을 처리하기 위한 JSON 데이터 처리 라이브러리
 import datetime # 날짜와 시간을 다루기 위한 라이브러리
 import time     # 프로그램 실행 중 일시 정지를 위한 라이브러리
 import yaml     # 설정 파일을 읽기 위한 라이브러리
+import socket   # 장 시작 전 서버 주소(DNS)를 미리 확인하기 위한 라이브러리
+from concurrent.futures import ThreadPoolExecutor  # 잔고 조회를 동시에 하기 위한 라이브러리
+from urllib.parse import urlparse
+from Trading_calendar import get_calendar  # 거래소 휴장일 확인
+from Trade_journal import TradeJournal     # 재시작용 상태 기록
+import Price_feed                          # 공유 메모리 현재가 피드
+from KIS_response import (KISError, decode, parse_balance, parse_daily_bars, parse_minute_bars,
+                          parse_order, parse_orderable_cash, parse_quote)  # 응답 해석
 
 # 설정 파일(config.yaml)에서 필요한 값들을 불러옵니다.
 # config.yaml 파일에는 API 키, 계좌번호 등 중요 정보가 저장되어 있습니다.
@@ -24,6 +33,13 @@ ACNT_PRDT_CD = _cfg['ACNT_PRDT_CD']  # 계좌상품코드
 DISCORD_WEBHOOK_URL = _cfg['DISCORD_WEBHOOK_URL']  # 디스코드 웹훅 URL (알림 발송용)
 URL_BASE = _cfg['URL_BASE']     # API 기본 주소
 
+# 같은 서버와의 연결을 재사용해 요청마다 TCP/TLS 연결을 새로 맺지 않습니다
+SESSION = requests.Session()
+TOKEN_ISSUED_AT = None           # 접근 토큰 발급 시각 (상주 모드에서 매일 장 전에 갱신)
+ORDER_TEMPLATES = {}             # 종목별 주문 요청 틀 (장 시작 전에 미리 만들어 둠)
+PRICE_FEED = None                # 실행 중인 현재가 피더 (있으면 API 대신 공유 메모리에서 현재가를 읽음)
+FEED_MAX_AGE = 3                 # 피더 값이 이 시간(초)보다 오래되면 API로 직접 조회
+
 def send_message(msg):
     """
     디스코드로 메시지를 전송하는 함수입니다.
@@ -38,7 +54,7 @@ def send_message(msg):
     # 메시지 형식을 만듭니다 - [시간] 메시지내용
     message = {"content": f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] {str(msg)}"}
     # 디스코드로 메시지를 전송합니다
-    requests.post(DISCORD_WEBHOOK_URL, data=message)
+    SESSION.post(DISCORD_WEBHOOK_URL, data=message)
     print(message)  # 콘솔에도 같은 메시지를 출력합니다
 
 def get_access_token():
@@ -60,9 +76,9 @@ def get_access_token():
     URL = f"{URL_BASE}/{PATH}"
     
     # API 요청을 보내고 응답을 받습니다
-    res = requests.post(URL, headers=headers, data=json.dumps(body))
+    res = SESSION.post(URL, headers=headers, data=json.dumps(body))
     # 응답에서 접근 토큰을 추출하여 반환합니다
-    ACCESS_TOKEN = res.json()["access_token"]
+    ACCESS_TOKEN = decode(res)["access_token"]
     return ACCESS_TOKEN
 
 def hashkey(datas):
@@ -84,13 +100,14 @@ def hashkey(datas):
         'appSecret' : APP_SECRET,
     }
     # 해시키를 요청하고 응답을 받아 반환합니다
-    res = requests.post(URL, headers=headers, data=json.dumps(datas))
-    hashkey = res.json()["HASH"]
+    res = SESSION.post(URL, headers=headers, data=json.dumps(datas))
+    hashkey = decode(res)["HASH"]
     return hashkey
 
 def get_current_price(code="005930"):
     """
     특정 종목의 현재가를 조회하는 함수입니다.
+    현재가 피더(Price_feed.py)가 실행 중이면 API를 호출하지 않고 공유 메모리에서 읽습니다.
     
     사용법: current_price = get_current_price("005930")  # 삼성전자의 현재가 조회
     
@@ -100,6 +117,19 @@ def get_current_price(code="005930"):
     Returns:
         int: 현재가
     """
+    if PRICE_FEED is not None:
+        price = PRICE_FEED.get_price(code, max_age=FEED_MAX_AGE)
+        if price is not None:
+            return int(price)
+    return get_quote(code)[0]
+
+def get_quote(code="005930"):
+    """
+    API로 특정 종목의 현재가와 누적 거래량을 조회하는 함수입니다.
+
+    Returns:
+        tuple: (현재가, 누적 거래량)
+    """
     PATH = "uapi/domestic-stock/v1/quotations/inquire-price"
     URL = f"{URL_BASE}/{PATH}"
     headers = {
@@ -114,8 +144,9 @@ def get_current_price(code="005930"):
         "fid_input_iscd":code,
     }
     # API로 현재가를 요청하고 응답을 받아 반환합니다
-    res = requests.get(URL, headers=headers, params=params)
-    return int(res.json()['output']['stck_prpr'])
+    res = SESSION.get(URL, headers=headers, params=params)
+    quote = parse_quote(res)
+    return quote.price, quote.volume
 
 def get_target_price(code="005930"):
     """
@@ -149,18 +180,64 @@ def get_target_price(code="005930"):
         "fid_period_div_code":"D"
     }
     # API로 가격 정보를 요청합니다
-    res = requests.get(URL, headers=headers, params=params)
+    res = SESSION.get(URL, headers=headers, params=params)
     
     # 오늘 시가와 전일 고가/저가를 조회합니다
-    stck_oprc = int(res.json()['output'][0]['stck_oprc']) # 오늘 시가
-    stck_hgpr = int(res.json()['output'][1]['stck_hgpr']) # 전일 고가
-    stck_lwpr = int(res.json()['output'][1]['stck_lwpr']) # 전일 저가
+    today, yesterday = parse_daily_bars(res)[:2]
+    stck_oprc = today.open      # 오늘 시가
+    stck_hgpr = yesterday.high  # 전일 고가
+    stck_lwpr = yesterday.low   # 전일 저가
     
     # 변동성 돌파 전략으로 목표가를 계산합니다
     # (당일 시가 + (전일 고가 - 전일 저가) * 0.5)
     target_price = stck_oprc + (stck_hgpr - stck_lwpr) * 0.5
     return target_price
 
+def get_minute_bars(code="005930", day=None, hour="153000"):
+    """
+    특정 종목의 분봉을 조회하는 함수입니다. hour 시각부터 거꾸로 한 페이지를 받습니다.
+    오늘은 당일분봉조회(30개씩), 지난 날짜는 일별분봉조회(120개씩)를 사용합니다.
+
+    사용법: bars = get_minute_bars("005930", datetime.date(2024, 11, 22), "153000")
+
+    Parameters:
+        code (str): 종목코드 (기본값: 삼성전자 005930)
+        day (datetime.date): 조회할 날짜 (생략하면 오늘)
+        hour (str): 이 시각(HHMMSS)까지의 분봉을 조회
+
+    Returns:
+        list: MinuteBar 목록 (최근 시각부터)
+    """
+    today = datetime.date.today()
+    day = day or today
+    params = {
+        "FID_ETC_CLS_CODE":"",
+        "FID_COND_MRKT_DIV_CODE":"J",
+        "FID_INPUT_ISCD":code,
+        "FID_INPUT_HOUR_1":hour,
+        "FID_PW_DATA_INCU_YN":"N",
+    }
+    if day == today:
+        PATH = "uapi/domestic-stock/v1/quotations/inquire-time-itemchartprice"
+        tr_id = "FHKST03010200"
+    else:
+        PATH = "uapi/domestic-stock/v1/quotations/inquire-time-dailychartprice"
+        tr_id = "FHKST03010230"
+        params["FID_INPUT_DATE_1"] = day.strftime("%Y%m%d")
+        params["FID_FAKE_TICK_INCU_YN"] = ""
+    URL = f"{URL_BASE}/{PATH}"
+    headers = {
+        "Content-Type":"application/json", 
+        "authorization": f"Bearer {ACCESS_TOKEN}",
+        "appKey":APP_KEY,
+        "appSecret":APP_SECRET,
+        "tr_id":tr_id,
+        "custtype":"P",
+    }
+    # API로 분봉을 요청하고 응답을 받아 반환합니다
+    res = SESSION.get(URL, headers=headers, params=params)
+    return parse_minute_bars(res)
+
 def get_stock_balance():
     """
     보유중인 주식 잔고를 조회하는 함수입니다.
@@ -192,25 +269,25 @@ def get_stock_balance():
         "CTX_AREA_NK100": ""
     }
     # API로 잔고를 조회합니다
-    res = requests.get(URL, headers=headers, params=params)
-    stock_list = res.json()['output1']    # 보유종목 리스트
-    evaluation = res.json()['output2']    # 평가 정보
+    res = SESSION.get(URL, headers=headers, params=params)
+    holdings, evaluation = parse_balance(res)  # 보유종목 리스트, 평가 정보
     
     # 보유종목을 딕셔너리로 저장합니다
     stock_dict = {}
     send_message(f"====주식 보유잔고====")
-    for stock in stock_list:
-        if int(stock['hldg_qty']) > 0:  # 보유수량이 있는 종목만
-            stock_dict[stock['pdno']] = stock['hldg_qty']
-            send_message(f"{stock['prdt_name']}({stock['pdno']}): {stock['hldg_qty']}주")
+    for stock in holdings:
+        qty = stock.qty
+        if qty > 0:  # 보유수량이 있는 종목만
+            stock_dict[stock.code] = qty
+            send_message(f"{stock.name}({stock.code}): {qty}주")
             time.sleep(0.1)
     
     # 평가 정보를 메시지로 전송합니다        
-    send_message(f"주식 평가 금액: {evaluation[0]['scts_evlu_amt']}원")
+    send_message(f"주식 평가 금액: {evaluation.stock_eval}원")
     time.sleep(0.1)
-    send_message(f"평가 손익 합계: {evaluation[0]['evlu_pfls_smtl_amt']}원")
+    send_message(f"평가 손익 합계: {evaluation.profit_loss}원")
     time.sleep(0.1)
-    send_message(f"총 평가 금액: {evaluation[0]['tot_evlu_amt']}원")
+    send_message(f"총 평가 금액: {evaluation.total_eval}원")
     time.sleep(0.1)
     send_message(f"=================")
     
@@ -243,10 +320,41 @@ def get_balance():
         "OVRS_ICLD_YN": "Y"
     }
     # API로 현금 잔고를 조회합니다
-    res = requests.get(URL, headers=headers, params=params)
-    cash = res.json()['output']['ord_psbl_cash']
+    res = SESSION.get(URL, headers=headers, params=params)
+    cash = parse_orderable_cash(res)
     send_message(f"주문 가능 현금 잔고: {cash}원")
-    return int(cash)
+    return cash
+
+def order_template(side, code):
+    """
+    시장가 주문 요청 틀(주소, 헤더, 수량을 뺀 주문 내용)을 반환합니다.
+    처음 한 번만 만들고 이후에는 저장된 틀을 사용합니다. (토큰이 바뀌면 다시 만듦)
+
+    Parameters:
+        side (str): "buy" 또는 "sell"
+        code (str): 종목코드
+    """
+    key = (side, code)
+    if key not in ORDER_TEMPLATES:
+        ORDER_TEMPLATES[key] = {
+            'url': f"{URL_BASE}/uapi/domestic-stock/v1/trading/order-cash",
+            'data': {
+                "CANO": CANO,
+                "ACNT_PRDT_CD": ACNT_PRDT_CD,
+                "PDNO": code,
+                "ORD_DVSN": "01",
+                "ORD_UNPR": "0",
+            },
+            'headers': {
+                "Content-Type":"application/json",
+                "authorization":f"Bearer {ACCESS_TOKEN}",
+                "appKey":APP_KEY,
+                "appSecret":APP_SECRET,
+                "tr_id":"TTTC0802U" if side == "buy" else "TTTC0801U",
+                "custtype":"P",
+            },
+        }
+    return ORDER_TEMPLATES[key]
 
 def buy(code="005930", qty="1"):
     """
@@ -262,76 +370,223 @@ def buy(code="005930", qty="1"):
         bool: 매수 성공 여부
     """
     """주식 시장가 매수"""  
-    PATH = "uapi/domestic-stock/v1/trading/order-cash"
-    URL = f"{URL_BASE}/{PATH}"
-    data = {
-        "CANO": CANO,
-        "ACNT_PRDT_CD": ACNT_PRDT_CD,
-        "PDNO": code,
-        "ORD_DVSN": "01",
-        "ORD_QTY": str(int(qty)),
-        "ORD_UNPR": "0",
-    }
-    headers = {"Content-Type":"application/json", 
-        "authorization":f"Bearer {ACCESS_TOKEN}",
-        "appKey":APP_KEY,
-        "appSecret":APP_SECRET,
-        "tr_id":"TTTC0802U",
-        "custtype":"P",
-        "hashkey" : hashkey(data)
-    }
-    res = requests.post(URL, headers=headers, data=json.dumps(data))
-    if res.json()['rt_cd'] == '0':
-        send_message(f"[매수 성공]{str(res.json())}")
-        return True
-    else:
-        send_message(f"[매수 실패]{str(res.json())}")
+    template = order_template("buy", code)  # 미리 만든 주문 틀에 수량과 해시키만 채웁니다
+    data = dict(template['data'], ORD_QTY=str(int(qty)))
+    headers = dict(template['headers'], hashkey=hashkey(data))
+    res = SESSION.post(template['url'], headers=headers, data=json.dumps(data))
+    try:
+        ack = parse_order(res)
+    except KISError as e:
+        send_message(f"[매수 실패]{e.body}")
         return False
+    send_message(f"[매수 성공]{ack.raw}")
+    return True
 
 def sell(code="005930", qty="1"):
     """주식 시장가 매도"""
-    PATH = "uapi/domestic-stock/v1/trading/order-cash"
-    URL = f"{URL_BASE}/{PATH}"
-    data = {
-        "CANO": CANO,
-        "ACNT_PRDT_CD": ACNT_PRDT_CD,
-        "PDNO": code,
-        "ORD_DVSN": "01",
-        "ORD_QTY": qty,
-        "ORD_UNPR": "0",
-    }
-    headers = {"Content-Type":"application/json", 
-        "authorization":f"Bearer {ACCESS_TOKEN}",
-        "appKey":APP_KEY,
-        "appSecret":APP_SECRET,
-        "tr_id":"TTTC0801U",
-        "custtype":"P",
-        "hashkey" : hashkey(data)
-    }
-    res = requests.post(URL, headers=headers, data=json.dumps(data))
-    if res.json()['rt_cd'] == '0':
-        send_message(f"[매도 성공]{str(res.json())}")
-        return True
-    else:
-        send_message(f"[매도 실패]{str(res.json())}")
+    template = order_template("sell", code)
+    data = dict(template['data'], ORD_QTY=str(qty))
+    headers = dict(template['headers'], hashkey=hashkey(data))
+    res = SESSION.post(template['url'], headers=headers, data=json.dumps(data))
+    try:
+        ack = parse_order(res)
+    except KISError as e:
+        send_message(f"[매도 실패]{e.body}")
         return False
+    send_message(f"[매도 성공]{ack.raw}")
+    return True
+
+def check_trading_day(day, action="프로그램을 종료합니다"):
+    """
+    그 날 정규 시간대로 장이 열리는지 확인합니다.
+    휴장일이나 개장/폐장 시각이 다른 날(새해 첫 거래일, 수능일)에는 매매 시간표가 맞지 않으므로 False를 반환합니다.
+
+    Parameters:
+        day (datetime.date): 확인할 날짜
+        action (str): 장이 열리지 않을 때 메시지에 붙일 안내 문구 (None이면 메시지를 보내지 않음)
+    """
+    krx = get_calendar('KRX')
+    try:
+        if not krx.is_session(day):
+            if action:
+                send_message(f"휴장일이므로 {action}.")
+            return False
+        if krx.is_special_session(day):
+            if action:
+                open_at, close_at = krx.session_hours(day)
+                send_message(f"개장 시간이 다른 날({open_at:%H:%M}~{close_at:%H:%M})이므로 {action}.")
+            return False
+    except ValueError as e:  # 휴장일 표에 없는 해에는 주말만 확인합니다
+        if action:
+            send_message(f"[휴장일 확인 불가]{e}")
+        if day.weekday() >= 5:
+            if action:
+                send_message(f"주말이므로 {action}.")
+            return False
+    return True
+
+def next_trading_day(day):
+    """day 다음(당일 제외)의 정규 거래일을 찾습니다."""
+    day += datetime.timedelta(days=1)
+    while not check_trading_day(day, action=None):
+        day += datetime.timedelta(days=1)
+    return day
 
-# 자동매매 시작
-try:
+def refresh_connection():
+    """API 연결을 새로 만듭니다. (밤사이 서버가 끊은 연결을 장 시작 전에 정리)"""
+    global SESSION
+    SESSION.close()
+    SESSION = requests.Session()
+
+def refresh_token():
+    """접근 토큰을 새로 발급받아 전역 변수에 저장합니다."""
+    global ACCESS_TOKEN, TOKEN_ISSUED_AT
     ACCESS_TOKEN = get_access_token()
+    TOKEN_ISSUED_AT = datetime.datetime.now()
+    ORDER_TEMPLATES.clear()  # 주문 틀의 토큰도 바꿔야 합니다
+
+def validate_token(code="005930"):
+    """
+    현재가 조회로 접근 토큰이 유효한지 확인하고, 만료되었으면 새로 발급받습니다.
+    이 조회로 API 서버와의 연결도 미리 맺어 둡니다.
+    """
+    if not ACCESS_TOKEN:
+        refresh_token()
+        return
+    res = SESSION.get(f"{URL_BASE}/uapi/domestic-stock/v1/quotations/inquire-price",
+                      headers={"Content-Type":"application/json",
+                               "authorization": f"Bearer {ACCESS_TOKEN}",
+                               "appKey":APP_KEY,
+                               "appSecret":APP_SECRET,
+                               "tr_id":"FHKST01010100"},
+                      params={"fid_cond_mrkt_div_code":"J", "fid_input_iscd":code})
+    try:
+        decode(res)
+    except KISError as e:
+        send_message(f"접근 토큰을 다시 발급받습니다. ({e})")
+        refresh_token()
+
+def resolve_hosts():
+    """API 서버와 디스코드 주소를 미리 조회해 첫 요청의 DNS 조회 시간을 없앱니다."""
+    for url in (URL_BASE, DISCORD_WEBHOOK_URL):
+        parsed = urlparse(url)
+        host = parsed.hostname
+        try:
+            socket.getaddrinfo(host, parsed.port or 443)
+        except OSError as e:
+            print(f"{host} 주소 조회 실패: {e}")
+
+def warm_up(plan):
+    """
+    장 시작 전 준비: DNS 조회, 토큰 확인(연결 맺기 포함), 현재가 피더 연결, 종목별 주문 틀 만들기.
+    이후 첫 주문은 수량과 해시키만 채워 바로 보냅니다.
+
+    Parameters:
+        plan (dict): 매매 계획 (매수 희망 종목과 보유 종목의 주문 틀을 만듦)
+    """
+    global PRICE_FEED
+    resolve_hosts()
+    validate_token(plan['symbol_list'][0])
+    if PRICE_FEED is None:
+        PRICE_FEED = Price_feed.connect()
+    if PRICE_FEED is not None:  # 피더가 있으면 매수 희망 종목을 구독합니다
+        PRICE_FEED.subscribe(plan['symbol_list'])
+        send_message("현재가 피더에서 현재가를 읽습니다.")
+    for sym in plan['symbol_list']:
+        order_template("buy", sym)
+    for sym in set(plan['symbol_list']) | set(plan['stock_dict']):
+        order_template("sell", sym)
+    hashkey(dict(order_template("buy", plan['symbol_list'][0])['data'], ORD_QTY="1"))  # 해시키 서버 연결
 
-    symbol_list = ["005930","035720","000660","069500"] # 매수 희망 종목 리스트
-    bought_list = [] # 매수 완료된 종목 리스트
-    total_cash = get_balance() # 보유 현금 조회
-    stock_dict = get_stock_balance() # 보유 주식 조회
+def keep_alive_until(target, interval=30, code="005930"):
+    """
+    target 시각까지 interval초마다 가벼운 조회를 보내 API 연결이 끊기지 않게 유지합니다.
+    """
+    while True:
+        remaining = (target - datetime.datetime.now()).total_seconds()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, interval))
+        if remaining > interval:
+            try:
+                get_quote(code)  # 피더가 있어도 API 연결을 유지하려면 직접 조회해야 합니다
+            except Exception as e:
+                print(f"연결 유지 조회 실패: {e}")
+
+def restore_day(journal):
+    """
+    오늘 저널 기록이 있으면 상태를 되살리고 보유 잔고 조회 한 번으로 맞춥니다.
+    현금 조회 없이 기록된 종목별 주문 금액을 그대로 사용합니다.
+
+    Returns:
+        dict: 매매 계획 (오늘 기록이 없으면 None)
+    """
+    plan = journal.replay()
+    if plan is None:
+        return None
+    stock_dict = get_stock_balance() # 실제 보유 종목과 맞추기
     for sym in stock_dict.keys():
-        bought_list.append(sym)
-    target_buy_count = 3 # 매수할 종목 수
-    buy_percent = 0.33 # 종목당 매수 금액 비율
-    buy_amount = total_cash * buy_percent  # 종목별 주문 금액 계산
-    soldout = False
+        if sym not in plan['bought_list']:
+            plan['bought_list'].append(sym)
+    plan['stock_dict'] = stock_dict
+    journal.record('reconcile', stock_dict=stock_dict, bought_list=plan['bought_list'], sync=True)
+    send_message(f"저널에서 상태를 복구했습니다. 매수 완료: {plan['bought_list']}")
+    return plan
+
+def prepare_day(journal=None):
+    """
+    하루 매매 계획(보유 현금, 보유 종목, 종목별 주문 금액)을 만듭니다.
+    journal에 오늘 기록이 있으면 잔고를 처음부터 조회하지 않고 기록으로 복구합니다.
+
+    Returns:
+        dict: 매매 계획
+    """
+    if journal is not None:
+        plan = restore_day(journal)
+        if plan is not None:
+            return plan
+    with ThreadPoolExecutor(max_workers=2) as pool:  # 현금과 보유 주식을 동시에 조회합니다
+        cash_job = pool.submit(get_balance)
+        stock_job = pool.submit(get_stock_balance)
+        total_cash = cash_job.result() # 보유 현금 조회
+        stock_dict = stock_job.result() # 보유 주식 조회
+    plan = {
+        'symbol_list': ["005930","035720","000660","069500"], # 매수 희망 종목 리스트
+        'target_buy_count': 3, # 매수할 종목 수
+        'buy_percent': 0.33, # 종목당 매수 금액 비율
+        'stock_dict': stock_dict,
+        'bought_list': list(stock_dict.keys()), # 매수 완료된 종목 리스트
+        'soldout': False,
+    }
+    plan['buy_amount'] = total_cash * plan['buy_percent']  # 종목별 주문 금액 계산
+    if journal is not None:
+        journal.record('plan', sync=True, **plan)
+    return plan
+
+def sleep_until(target):
+    """target 시각까지 기다립니다. (시스템 시계가 바뀌어도 맞도록 최대 10분씩 나누어 잠듭니다)"""
+    while True:
+        remaining = (target - datetime.datetime.now()).total_seconds()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, 600))
+
+def run_trading_day(plan, journal=None):
+    """
+    하루 매매를 실행합니다. 15:20이 지나면 반환합니다.
+
+    Parameters:
+        plan (dict): prepare_day가 만든 매매 계획
+        journal (TradeJournal): 주문, 체결 결과, 단계 변경을 기록할 저널 (생략하면 기록하지 않음)
+    """
+    symbol_list = plan['symbol_list']
+    target_buy_count = plan['target_buy_count']
+    buy_amount = plan['buy_amount']
+    stock_dict = plan['stock_dict']
+    bought_list = plan['bought_list']
+    soldout = plan.get('soldout', False)
+    record = journal.record if journal is not None else (lambda *args, **kwargs: None)
 
-    send_message("===국내 주식 자동매매 프로그램을 시작합니다===")
     while True:
         t_now = datetime.datetime.now()
         t_9 = t_now.replace(hour=9, minute=0, second=0, microsecond=0)
@@ -344,10 +599,12 @@ try:
             break
         if t_9 < t_now < t_start and soldout == False: # 잔여 수량 매도
             for sym, qty in stock_dict.items():
-                sell(sym, qty)
-            soldout == True
+                record('order', side='sell', code=sym, qty=qty, sync=True)
+                record('order_result', side='sell', code=sym, ok=sell(sym, qty))
+            soldout = True
             bought_list = []
             stock_dict = get_stock_balance()
+            record('phase', phase='presold', stock_dict=stock_dict)
         if t_start < t_now < t_sell :  # AM 09:05 ~ PM 03:15 : 매수
             for sym in symbol_list:
                 if len(bought_list) < target_buy_count:
@@ -360,7 +617,9 @@ try:
                         buy_qty = int(buy_amount // current_price)
                         if buy_qty > 0:
                             send_message(f"{sym} 목표가 달성({target_price} < {current_price}) 매수를 시도합니다.")
+                            record('order', side='buy', code=sym, qty=buy_qty, sync=True)
                             result = buy(sym, buy_qty)
+                            record('order_result', side='buy', code=sym, ok=result)
                             if result:
                                 soldout = False
                                 bought_list.append(sym)
@@ -374,13 +633,79 @@ try:
             if soldout == False:
                 stock_dict = get_stock_balance()
                 for sym, qty in stock_dict.items():
-                    sell(sym, qty)
+                    record('order', side='sell', code=sym, qty=qty, sync=True)
+                    record('order_result', side='sell', code=sym, ok=sell(sym, qty))
                 soldout = True
                 bought_list = []
+                record('phase', phase='closed_out')
                 time.sleep(1)
         if t_exit < t_now:  # PM 03:20 ~ :프로그램 종료
-            send_message("프로그램을 종료합니다.")
+            record('phase', phase='day_end', sync=True)
             break
-except Exception as e:
-    send_message(f"[오류 발생]{e}")
-    time.sleep(1)
+
+def run_daemon(warmup_minutes=10, journal=None):
+    """
+    여러 날 동안 종료하지 않고 매매하는 상주 모드입니다.
+    장이 끝나면 다음 거래일 장 시작 warmup_minutes분 전까지 잠들었다가
+    토큰, 연결, 매매 계획을 미리 준비해 09:00 첫 주문이 바로 나가도록 합니다.
+
+    사용법: python StockAuto_basic.py --daemon
+
+    Parameters:
+        warmup_minutes (int): 장 시작 몇 분 전에 준비를 시작할지
+        journal (TradeJournal): 상태 기록 저널 (오류 후 다시 준비할 때 기록으로 복구)
+    """
+    send_message("===국내 주식 자동매매 프로그램을 상주 모드로 시작합니다===")
+    day = datetime.date.today()
+    while True:
+        t_exit = datetime.datetime.combine(day, datetime.time(15, 20))
+        if not check_trading_day(day, action=None) or datetime.datetime.now() > t_exit:
+            day = next_trading_day(day)
+        t_open = datetime.datetime.combine(day, datetime.time(9, 0))
+        t_warmup = t_open - datetime.timedelta(minutes=warmup_minutes)
+        if datetime.datetime.now() < t_warmup:
+            send_message(f"다음 거래일 {day} 장 시작 전까지 대기합니다.")
+            sleep_until(t_warmup)
+        try:
+            refresh_connection()
+            refresh_token()
+            plan = prepare_day(journal)
+            warm_up(plan)
+            send_message(f"{day} 매매 준비를 마쳤습니다.")
+            keep_alive_until(t_open, code=plan['symbol_list'][0])
+            run_trading_day(plan, journal)
+            send_message(f"{day} 매매를 마쳤습니다.")
+        except Exception as e:  # 오류가 나도 종료하지 않고 1분 뒤 다시 준비합니다 (장이 끝났으면 다음 거래일)
+            send_message(f"[오류 발생]{e}")
+            time.sleep(60)
+            continue
+        day = next_trading_day(day)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='국내 주식 자동매매 (변동성 돌파 전략)')
+    parser.add_argument('--daemon', action='store_true', help='종료하지 않고 매일 장 전에 준비해 매매하는 상주 모드')
+    parser.add_argument('--warmup-minutes', type=int, default=10, help='상주 모드에서 장 시작 몇 분 전에 준비할지')
+    parser.add_argument('--journal-dir', default='journal', help='재시작용 상태 기록 폴더')
+    args = parser.parse_args()
+    journal = TradeJournal(args.journal_dir)
+
+    if args.daemon:
+        run_daemon(args.warmup_minutes, journal)
+    else:
+        # 자동매매 시작 (하루 실행 후 종료)
+        try:
+            if not check_trading_day(datetime.date.today()):
+                raise SystemExit
+            refresh_token()
+            plan = prepare_day(journal)
+            warm_up(plan)
+            send_message("===국내 주식 자동매매 프로그램을 시작합니다===")
+            keep_alive_until(datetime.datetime.combine(datetime.date.today(), datetime.time(9, 0)),
+                             code=plan['symbol_list'][0])
+            run_trading_day(plan, journal)
+            send_message("프로그램을 종료합니다.")
+        except Exception as e:
+            send_message(f"[오류 발생]{e}")
+            time.sleep(1)
+        finally:
+            journal.close()
@@ -1,44 +1,43 @@
-import yfinance as yf
-import pandas as pd
-import pandas_ta as ta
 import bt
 import numpy as np
 from datetime import datetime
+from Backtest_stats import compound_annual_returns
+from Indicator_cache import memoize_indicator  # 지표 계산 결과 캐시
+from Fast_algo import FastAlgo  # 지표 배열을 미리 꺼내 두는 빠른 Algo 기본 클래스
+from Backtest_parallel import run_parallel  # 전략과 벤치마크 백테스트 동시 실행
 
-# 데이터 다운로드
-ticker = yf.Ticker("AGG")
-start_date = "2018-01-01"
-end_date = "2024-11-30"
-ohlcv = ticker.history(start=start_date, end=end_date)
+# MACD 계산 함수 (기본 12,26,9)
+@memoize_indicator
+def calculate_macd(ohlcv, fast=12, slow=26, signal=9):
+    import pandas_ta as ta  # 지표를 계산할 때만 불러옵니다
+    # MACD 계산을 위한 데이터프레임 준비
+    data = ohlcv[['Close']].copy()
+    
+    macd = ta.macd(data['Close'], fast=fast, slow=slow, signal=signal)
+    suffix = f"{fast}_{slow}_{signal}"
+    data['MACD'] = macd[f'MACD_{suffix}']
+    data['Signal'] = macd[f'MACDs_{suffix}']
+    data['MACD_Hist'] = macd[f'MACDh_{suffix}']
+    return data
 
-# MACD 계산을 위한 데이터프레임 준비
-data = ohlcv[['Close']].copy()
+# MACD 전략 클래스 정의
+class MACDStrategy(FastAlgo):
+    columns = ('MACD', 'Signal')
 
-# MACD 계산 (12,26,9)
-macd = ta.macd(data['Close'], fast=12, slow=26, signal=9)
-data['MACD'] = macd['MACD_12_26_9']
-data['Signal'] = macd['MACDs_12_26_9']
-data['MACD_Hist'] = macd['MACDh_12_26_9']
+    def __init__(self, data=None):
+        super(MACDStrategy, self).__init__(data)  # 지표 데이터 (없으면 스크립트의 전역 data 사용)
+
+    def source(self):
+        return data if self.data is None else self.data
 
-# MACD 전략 클래스 정의
-class MACDStrategy(bt.Algo):
-    def __init__(self):
-        super(MACDStrategy, self).__init__()
-        self.last_position = 0
-        
     def __call__(self, target):
-        current = target.now
-        
-        try:
-            macd_val = data.loc[current, 'MACD']
-            signal_val = data.loc[current, 'Signal']
-            prev_macd = data.shift(1).loc[current, 'MACD']
-            prev_signal = data.shift(1).loc[current, 'Signal']
-        except:
+        i = self.row(target)
+        if i is None:
             return False
-            
-        selected = target.universe.columns
-        weights = pd.Series(0, index=selected)
+        macd_val = self.arrays['MACD'][i]
+        signal_val = self.arrays['Signal'][i]
+        prev_macd = self.previous('MACD', i)
+        prev_signal = self.previous('Signal', i)
         
         # MACD 크로스오버 전략
         if macd_val > signal_val and prev_macd <= prev_signal:  # 골든크로스: 매수
@@ -49,23 +48,9 @@ class MACDStrategy(bt.Algo):
             new_position = self.last_position  # 현재 포지션 유지
             
         # 거래 수수료 계산 (포지션 변경시에만)
-        if new_position != self.last_position:
-            target.temp['trade_commission'] = abs(new_position - self.last_position) * 0.0018
-        else:
-            target.temp['trade_commission'] = 0
-            
-        self.last_position = new_position
-        weights[selected] = new_position
-        target.temp['weights'] = weights
-        
+        self.set_position(target, new_position)
         return True
 
-# MACD 전략과 단순 매수후 보유 전략 설정
-macd_strategy = bt.Strategy('MACD Strategy',
-    [bt.algos.SelectAll(),
-     MACDStrategy(),
-     bt.algos.Rebalance()])
-
 # 단순 매수후 보유 전략 함수
 def buy_and_hold(data, name):
     bt_strategy = bt.Strategy(name, [
@@ -76,23 +61,10 @@ def buy_and_hold(data, name):
     ])
     return bt.Backtest(bt_strategy, data)
 
-# 백테스트 실행
-macd_backtest = bt.Backtest(macd_strategy, data[['Close']])
-stock = buy_and_hold(data[['Close']], name='Buy & Hold')
-results = bt.run(macd_backtest, stock)
-
 # 연도별 수익률 계산 함수
 def calculate_annual_returns(results):
-    daily_returns = results.prices.pct_change()
-    annual_returns = {}
-    
-    for strategy in daily_returns.columns:
-        strategy_returns = daily_returns[strategy] + 1
-        by_year = strategy_returns.groupby(strategy_returns.index.year)
-        yearly_returns = (by_year.prod() - 1) * 100
-        annual_returns[strategy] = yearly_returns
-        
-    annual_returns_df = pd.DataFrame(annual_returns)
+    # 모든 전략의 연도별 복리 수익률을 한 번에 계산
+    annual_returns_df = compound_annual_returns(results.prices)
     
     # 수수료 반영
     if 'MACD Strategy' in annual_returns_df.columns:
@@ -102,10 +74,34 @@ def calculate_annual_returns(results):
             
     return annual_returns_df.round(2)
 
-# 결과 출력 및 시각화
-print("\n===== 백테스트 통계 =====")
-print(results.stats)
-print("\n===== 연도별 수익률(%) =====")
-annual_returns = calculate_annual_returns(results)
-print(annual_returns)
-results.plot(title='MACD Strategy vs Buy & Hold')
+# 메인 실행 코드
+if __name__ == "__main__":
+    import yfinance as yf  # 데이터를 내려받을 때만 불러옵니다
+
+    # 데이터 다운로드
+    ticker = yf.Ticker("AGG")
+    start_date = "2018-01-01"
+    end_date = "2024-11-30"
+    ohlcv = ticker.history(start=start_date, end=end_date)
+    
+    # MACD 계산 (12,26,9)
+    data = calculate_macd(ohlcv, fast=12, slow=26, signal=9)
+    
+    # MACD 전략과 단순 매수후 보유 전략 설정
+    macd_strategy = bt.Strategy('MACD Strategy',
+        [bt.algos.SelectAll(),
+         MACDStrategy(),
+         bt.algos.Rebalance()])
+    
+    # 백테스트 실행
+    macd_backtest = bt.Backtest(macd_strategy, data[['Close']])
+    stock = buy_and_hold(data[['Close']], name='Buy & Hold')
+    results = run_parallel(macd_backtest, stock)
+    
+    # 결과 출력 및 시각화
+    print("\n===== 백테스트 통계 =====")
+    print(results.stats)
+    print("\n===== 연도별 수익률(%) =====")
+    annual_returns = calculate_annual_returns(results)
+    print(annual_returns)
+    results.plot(title='MACD Strategy vs Buy & Hold')
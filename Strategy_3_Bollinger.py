@@ -1,31 +1,32 @@
-import yfinance as yf
-import pandas as pd
-import pandas_ta as ta
 import bt
 import numpy as np
 from datetime import datetime
+from Backtest_stats import compound_annual_returns
+from Indicator_cache import memoize_indicator  # 지표 계산 결과 캐시
+from Fast_algo import FastAlgo  # 지표 배열을 미리 꺼내 두는 빠른 Algo 기본 클래스
+from Backtest_parallel import run_parallel  # 전략과 벤치마크 백테스트 동시 실행
 
 # 볼린저밴드 전략 클래스 정의
-class BollingerStrategy(bt.Algo):
-    def __init__(self, bb_length=20, bb_std=2.0):
-        super(BollingerStrategy, self).__init__()
+class BollingerStrategy(FastAlgo):
+    columns = ('Close', 'Upper_Band', 'Lower_Band')
+
+    def __init__(self, bb_length=20, bb_std=2.0, data=None):
+        super(BollingerStrategy, self).__init__(data)  # 지표 데이터 (없으면 스크립트의 전역 data 사용)
         self.bb_length = bb_length  # 기간 설정 (기본 20일)
         self.bb_std = bb_std        # 표준편차 배수 설정 (기본 2배)
-        self.last_position = 0      # 이전 포지션 기록용
-        
+
+    def source(self):
+        return data if self.data is None else self.data
+
     def __call__(self, target):
-        current = target.now  # 현재 시점
-        
-        try:
-            # 현재 볼린저밴드 값들 확인
-            current_price = data.loc[current, 'Close']
-            upper_band = data.loc[current, 'Upper_Band']
-            lower_band = data.loc[current, 'Lower_Band']
-        except:
+        i = self.row(target)  # 현재 시점의 행 번호
+        if i is None:
             return False
-            
-        selected = target.universe.columns
-        weights = pd.Series(0, index=selected)
+
+        # 현재 볼린저밴드 값들 확인
+        current_price = self.arrays['Close'][i]
+        upper_band = self.arrays['Upper_Band'][i]
+        lower_band = self.arrays['Lower_Band'][i]
         
         # 볼린저밴드 기반 매매 전략
         if current_price < lower_band:     # 하단밴드 아래로 진입시 매수(1)
@@ -36,42 +37,37 @@ class BollingerStrategy(bt.Algo):
             new_position = 0
             
         # 포지션 변경시에만 수수료(0.18%) 부과
-        if new_position != self.last_position:
-            target.temp['trade_commission'] = abs(new_position - self.last_position) * 0.0018
-        else:
-            target.temp['trade_commission'] = 0
-            
-        self.last_position = new_position
-        weights[selected] = new_position
-        target.temp['weights'] = weights
+        self.set_position(target, new_position)
         return True
 
 # 데이터 준비 함수
 def prepare_data(ticker, start_date, end_date):
+    import yfinance as yf  # 데이터를 내려받을 때만 불러옵니다
     # 주가 데이터 다운로드
     stock = yf.Ticker(ticker)
-    data = stock.history(start=start_date, end=end_date)[['Close']]
+    data = stock.history(start=start_date, end=end_date)
     
     # 볼린저밴드 계산
-    bb = ta.bbands(data['Close'], length=20, std=2)
-    data['Middle_Band'] = bb['BBM_20_2.0']
-    data['Upper_Band'] = bb['BBU_20_2.0']
-    data['Lower_Band'] = bb['BBL_20_2.0']
+    return calculate_bbands(data, length=20, std=2.0)
+
+# 볼린저밴드 계산 함수
+@memoize_indicator
+def calculate_bbands(ohlcv, length=20, std=2.0):
+    import pandas_ta as ta  # 지표를 계산할 때만 불러옵니다
+    data = ohlcv[['Close']].copy()
+    
+    bb = ta.bbands(data['Close'], length=length, std=std)
+    suffix = f"{length}_{float(std)}"
+    data['Middle_Band'] = bb[f'BBM_{suffix}']
+    data['Upper_Band'] = bb[f'BBU_{suffix}']
+    data['Lower_Band'] = bb[f'BBL_{suffix}']
     
     return data
 
 def calculate_annual_returns(results):
     """연도별 수익률 계산 함수"""
-    daily_returns = results.prices.pct_change()
-    annual_returns = {}
-    
-    for strategy in daily_returns.columns:
-        strategy_returns = daily_returns[strategy] + 1
-        by_year = strategy_returns.groupby(strategy_returns.index.year)
-        yearly_returns = (by_year.prod() - 1) * 100
-        annual_returns[strategy] = yearly_returns
-        
-    annual_returns_df = pd.DataFrame(annual_returns)
+    # 모든 전략의 연도별 복리 수익률을 한 번에 계산
+    annual_returns_df = compound_annual_returns(results.prices)
     
     # 수수료 반영
     if 'Bollinger Bands Strategy' in annual_returns_df.columns:
@@ -109,7 +105,7 @@ if __name__ == "__main__":
     # 백테스트 실행
     bollinger_backtest = bt.Backtest(bollinger_strategy, data[['Close']])
     buy_hold = buy_and_hold(data[['Close']], 'Buy & Hold')
-    results = bt.run(bollinger_backtest, buy_hold)
+    results = run_parallel(bollinger_backtest, buy_hold)
     
     # 결과 출력
     print("\n===== 백테스트 통계 =====")
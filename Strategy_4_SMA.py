@@ -1,37 +1,49 @@
-import yfinance as yf
-import pandas as pd
-import pandas_ta as ta
 import bt
 import numpy as np
 from datetime import datetime
+from Backtest_stats import compound_annual_returns
+from Indicator_cache import memoize_indicator  # 지표 계산 결과 캐시
+from Fast_algo import FastAlgo  # 지표 배열을 미리 꺼내 두는 빠른 Algo 기본 클래스
+from Backtest_parallel import run_parallel  # 전략과 벤치마크 백테스트 동시 실행
 
 # 데이터 다운로드
 def get_stock_data(symbol, start_date, end_date):
+    import yfinance as yf  # 데이터를 내려받을 때만 불러옵니다
     ticker = yf.Ticker(symbol)
     data = ticker.history(start=start_date, end=end_date)
     return data[['Close']]
 
+# 이동평균선 계산 함수
+@memoize_indicator
+def calculate_sma(data, short_period=20, long_period=60):
+    import pandas_ta as ta  # 지표를 계산할 때만 불러옵니다
+    data = data[['Close']].copy()
+    data[f'SMA_{short_period}'] = ta.sma(data['Close'], length=short_period)
+    data[f'SMA_{long_period}'] = ta.sma(data['Close'], length=long_period)
+    return data
+
 # 이동평균선 교차 전략 클래스 정의
-class MACrossStrategy(bt.Algo):
-    def __init__(self, short_period=20, long_period=60):
-        super(MACrossStrategy, self).__init__()
+class MACrossStrategy(FastAlgo):
+    commission = 0.0015
+
+    def __init__(self, short_period=20, long_period=60, data=None):
+        super(MACrossStrategy, self).__init__(data)  # 지표 데이터 (없으면 스크립트의 전역 data 사용)
         self.short_period = short_period
         self.long_period = long_period
-        self.last_position = 0
-        
+        self.columns = (f'SMA_{short_period}', f'SMA_{long_period}')
+
+    def source(self):
+        return data if self.data is None else self.data
+
     def __call__(self, target):
-        # 현재 시점
-        current = target.now
-        
-        # 전체 데이터에서 현재 시점의 이동평균 확인
-        try:
-            short_ma = data.loc[current, f'SMA_{self.short_period}']
-            long_ma = data.loc[current, f'SMA_{self.long_period}']
-        except:
+        # 현재 시점의 행 번호
+        i = self.row(target)
+        if i is None:
             return False
-            
-        selected = target.universe.columns
-        weights = pd.Series(0, index=selected)
+
+        # 전체 데이터에서 현재 시점의 이동평균 확인
+        short_ma = self.arrays[f'SMA_{self.short_period}'][i]
+        long_ma = self.arrays[f'SMA_{self.long_period}'][i]
         
         # 이동평균선 교차 조건에 따른 매매 전략
         if short_ma > long_ma:  # 골든크로스: 단기선이 장기선을 상향돌파
@@ -42,14 +54,7 @@ class MACrossStrategy(bt.Algo):
             new_position = 0
             
         # 포지션 변경시에만 수수료 부과
-        if new_position != self.last_position:
-            target.temp['trade_commission'] = abs(new_position - self.last_position) * 0.0015
-        else:
-            target.temp['trade_commission'] = 0
-            
-        self.last_position = new_position
-        weights[selected] = new_position
-        target.temp['weights'] = weights
+        self.set_position(target, new_position)
         return True
 
 # 메인 실행 코드
@@ -63,8 +68,7 @@ if __name__ == "__main__":
     data = get_stock_data(symbol, start_date, end_date)
     
     # 이동평균선 계산
-    data['SMA_20'] = ta.sma(data['Close'], length=20)
-    data['SMA_60'] = ta.sma(data['Close'], length=60)
+    data = calculate_sma(data, short_period=20, long_period=60)
     
     # 전략 설정
     ma_cross_strategy = bt.Strategy('MA Crossover',
@@ -85,20 +89,12 @@ if __name__ == "__main__":
     # 백테스트 실행
     ma_backtest = bt.Backtest(ma_cross_strategy, data)
     stock = buy_and_hold(data, name='Buy & Hold')
-    results = bt.run(ma_backtest, stock)
+    results = run_parallel(ma_backtest, stock)
     
     # 연간 수익률 계산 함수
     def calculate_annual_returns(results):
-        daily_returns = results.prices.pct_change()
-        annual_returns = {}
-        
-        for strategy in daily_returns.columns:
-            strategy_returns = daily_returns[strategy] + 1
-            by_year = strategy_returns.groupby(strategy_returns.index.year)
-            yearly_returns = (by_year.prod() - 1) * 100
-            annual_returns[strategy] = yearly_returns
-            
-        annual_returns_df = pd.DataFrame(annual_returns)
+        # 모든 전략의 연도별 복리 수익률을 한 번에 계산
+        annual_returns_df = compound_annual_returns(results.prices)
         
         # 수수료(0.03%) 반영
         if 'MA Crossover' in annual_returns_df.columns:
@@ -1,12 +1,15 @@
-import yfinance as yf
-import pandas as pd
-import pandas_ta as ta
 import bt
 import numpy as np
 from datetime import datetime
+from Backtest_stats import compound_annual_returns
+from Indicator_cache import memoize_indicator  # 지표 계산 결과 캐시
+from Fast_algo import FastAlgo  # 지표 배열을 미리 꺼내 두는 빠른 Algo 기본 클래스
+from Backtest_parallel import run_parallel  # 전략과 벤치마크 백테스트 동시 실행
 
-class VolumeWeightedMomentumStrategy(bt.Algo):
-    def __init__(self, momentum_period=20, volume_period=20, weighting_factor=0.5):
+class VolumeWeightedMomentumStrategy(FastAlgo):
+    columns = ('momentum_score', 'volume_signal', 'combined_signal')
+
+    def __init__(self, momentum_period=20, volume_period=20, weighting_factor=0.5, data=None):
         """
         거래량 가중 모멘텀 전략 초기화
         
@@ -14,28 +17,26 @@ class VolumeWeightedMomentumStrategy(bt.Algo):
         momentum_period (int): 모멘텀 계산 기간
         volume_period (int): 거래량 평균 계산 기간
         weighting_factor (float): 거래량 가중치 계수 (0~1)
+        data (pandas.DataFrame): 신호 데이터 (없으면 스크립트의 전역 data 사용)
         """
-        super(VolumeWeightedMomentumStrategy, self).__init__()
+        super(VolumeWeightedMomentumStrategy, self).__init__(data)
         self.momentum_period = momentum_period
         self.volume_period = volume_period
         self.weighting_factor = weighting_factor
-        self.last_position = 0
+
+    def source(self):
+        return data if self.data is None else self.data
 
     def __call__(self, target):
-        # 현재 시점의 데이터 확인
-        current = target.now
-
-        try:
-            # 현재 시점의 지표값 확인
-            momentum_score = data.loc[current, 'momentum_score']
-            volume_signal = data.loc[current, 'volume_signal']
-            combined_signal = data.loc[current, 'combined_signal']
-        except:
+        # 현재 시점의 행 번호 확인
+        i = self.row(target)
+        if i is None:
             return False
 
-        # 포트폴리오 구성
-        selected = target.universe.columns
-        weights = pd.Series(0, index=selected)
+        # 현재 시점의 지표값 확인
+        momentum_score = self.arrays['momentum_score'][i]
+        volume_signal = self.arrays['volume_signal'][i]
+        combined_signal = self.arrays['combined_signal'][i]
 
         # 매매 신호 생성
         if combined_signal > 0:
@@ -46,17 +47,10 @@ class VolumeWeightedMomentumStrategy(bt.Algo):
             new_position = 0  # 중립
 
         # 포지션 변경시에만 수수료 부과
-        if new_position != self.last_position:
-            target.temp['trade_commission'] = abs(new_position - self.last_position) * 0.0018
-        else:
-            target.temp['trade_commission'] = 0
-
-        self.last_position = new_position
-        weights[selected] = new_position
-        target.temp['weights'] = weights
-
+        self.set_position(target, new_position)
         return True
 
+@memoize_indicator
 def calculate_signals(df, momentum_period=20, volume_period=20, weighting_factor=0.5):
     """
     거래량 가중 모멘텀 신호 계산
@@ -90,26 +84,6 @@ def calculate_signals(df, momentum_period=20, volume_period=20, weighting_factor
     
     return df
 
-# 데이터 다운로드 및 전처리
-ticker = yf.Ticker("BND")  # S&P 500 ETF
-start_date = "2018-01-01"
-end_date = "2024-12-01"
-ohlcv = ticker.history(start=start_date, end=end_date)
-
-# 신호 계산
-data = calculate_signals(ohlcv, 
-                        momentum_period=20, 
-                        volume_period=20, 
-                        weighting_factor=0.5)
-
-# 백테스트 전략 설정
-volume_momentum_strategy = bt.Strategy('Volume Weighted Momentum',
-    [bt.algos.SelectAll(),
-     VolumeWeightedMomentumStrategy(momentum_period=20, 
-                                   volume_period=20, 
-                                   weighting_factor=0.5),
-     bt.algos.Rebalance()])
-
 # 단순 매수후 보유 전략 설정
 def buy_and_hold(data, name):
     strategy = bt.Strategy(name, [
@@ -120,23 +94,10 @@ def buy_and_hold(data, name):
     ])
     return bt.Backtest(strategy, data)
 
-# 백테스트 실행
-volume_momentum_backtest = bt.Backtest(volume_momentum_strategy, data[['Close']])
-buy_hold = buy_and_hold(data[['Close']], 'Buy & Hold')
-results = bt.run(volume_momentum_backtest, buy_hold)
-
 # 연도별 수익률 계산
 def calculate_annual_returns(results):
-    daily_returns = results.prices.pct_change()
-    annual_returns = {}
-    
-    for strategy in daily_returns.columns:
-        strategy_returns = daily_returns[strategy] + 1
-        by_year = strategy_returns.groupby(strategy_returns.index.year)
-        yearly_returns = (by_year.prod() - 1) * 100
-        annual_returns[strategy] = yearly_returns
-    
-    annual_returns_df = pd.DataFrame(annual_returns)
+    # 모든 전략의 연도별 복리 수익률을 한 번에 계산
+    annual_returns_df = compound_annual_returns(results.prices)
     
     if 'Volume Weighted Momentum' in annual_returns_df.columns:
         commission_factor = (1 - 0.0018)  # 수수료 0.18% 반영
@@ -145,12 +106,41 @@ def calculate_annual_returns(results):
     
     return annual_returns_df.round(2)
 
-# 결과 출력
-print("\n===== 백테스트 통계 =====")
-print(results.stats)
-print("\n===== 연도별 수익률(%) =====")
-annual_returns = calculate_annual_returns(results)
-print(annual_returns)
-
-# 수익률 그래프 표시
-results.plot(title='Volume Weighted Momentum vs Buy & Hold')
+# 메인 실행 코드
+if __name__ == "__main__":
+    import yfinance as yf  # 데이터를 내려받을 때만 불러옵니다
+
+    # 데이터 다운로드 및 전처리
+    ticker = yf.Ticker("BND")  # S&P 500 ETF
+    start_date = "2018-01-01"
+    end_date = "2024-12-01"
+    ohlcv = ticker.history(start=start_date, end=end_date)
+
+    # 신호 계산
+    data = calculate_signals(ohlcv, 
+                            momentum_period=20, 
+                            volume_period=20, 
+                            weighting_factor=0.5)
+
+    # 백테스트 전략 설정
+    volume_momentum_strategy = bt.Strategy('Volume Weighted Momentum',
+        [bt.algos.SelectAll(),
+         VolumeWeightedMomentumStrategy(momentum_period=20, 
+                                       volume_period=20, 
+                                       weighting_factor=0.5),
+         bt.algos.Rebalance()])
+
+    # 백테스트 실행
+    volume_momentum_backtest = bt.Backtest(volume_momentum_strategy, data[['Close']])
+    buy_hold = buy_and_hold(data[['Close']], 'Buy & Hold')
+    results = run_parallel(volume_momentum_backtest, buy_hold)
+
+    # 결과 출력
+    print("\n===== 백테스트 통계 =====")
+    print(results.stats)
+    print("\n===== 연도별 수익률(%) =====")
+    annual_returns = calculate_annual_returns(results)
+    print(annual_returns)
+
+    # 수익률 그래프 표시
+    results.plot(title='Volume Weighted Momentum vs Buy & Hold')
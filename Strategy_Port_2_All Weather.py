@@ -1,19 +1,56 @@
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
 import bt
 import numpy as np
 from datetime import datetime
+from Backtest_stats import calculate_stats, compound_annual_returns
+from Backtest_parallel import run_parallel  # 미국/한국 백테스트 동시 실행
+from Backtest_strategies import market_prices  # 시장별 거래소 거래일에 맞춘 가격
+from Risk_parity import RiskParityAlgo  # 위험 기여도 균형(리스크 패리티) 비중 계산
+
+# ETF 티커 정의
+TICKERS = {
+    'US': {
+        'tips': 'TIP',      # TIPS ETF
+        'commodity': 'DBC',  # 원자재 ETF
+        'gold': 'GLD',      # 금 ETF
+        'reit': 'VNQ'       # 리츠 ETF
+    },
+    'KR': {
+        'tips': '305080',    # KBSTAR 국고채TIPS
+        'commodity': '261220', # KODEX 원자재
+        'gold': '132030',     # KODEX 골드선물
+        'reit': '329200'      # TIGER 리츠부동산
+    }
+}
+
+def create_weights(tickers):
+    """시장별 포트폴리오 가중치 (TIPS 30%, 원자재 20%, 금 20%, 리츠 30%)"""
+    us_weights = pd.Series({
+        f"US_{tickers['US']['tips']}": 0.3,       # TIPS 30%
+        f"US_{tickers['US']['commodity']}": 0.2,   # 원자재 20%
+        f"US_{tickers['US']['gold']}": 0.2,        # 금 20%
+        f"US_{tickers['US']['reit']}": 0.3         # 리츠 30%
+    })
+    
+    kr_weights = pd.Series({
+        f"KR_{tickers['KR']['tips']}": 0.3,       # TIPS 30%
+        f"KR_{tickers['KR']['commodity']}": 0.2,   # 원자재 20%
+        f"KR_{tickers['KR']['gold']}": 0.2,        # 금 20%
+        f"KR_{tickers['KR']['reit']}": 0.3         # 리츠 30%
+    })
+    
+    return us_weights, kr_weights
 
 def download_data(tickers_dict, start_date, end_date):
-    data = pd.DataFrame()
+    import yfinance as yf  # 데이터를 내려받을 때만 불러옵니다
+    closes = {}  # 두 시장의 거래일을 모두 남기도록 합친 뒤 시장별로 나눕니다
     
     # 미국 ETF 데이터 다운로드
     for category, ticker in tickers_dict['US'].items():
         try:
             ticker_data = yf.download(ticker, start=start_date, end=end_date)['Adj Close']
             if not ticker_data.empty:
-                data[f"US_{ticker}"] = ticker_data
+                closes[f"US_{ticker}"] = ticker_data
                 print(f"Successfully downloaded {ticker}")
         except Exception as e:
             print(f"Error downloading US {ticker}: {e}")
@@ -23,11 +60,15 @@ def download_data(tickers_dict, start_date, end_date):
         try:
             ticker_data = yf.download(f"{ticker}.KS", start=start_date, end=end_date)['Adj Close']
             if not ticker_data.empty:
-                data[f"KR_{ticker}"] = ticker_data
+                closes[f"KR_{ticker}"] = ticker_data
                 print(f"Successfully downloaded {ticker}.KS")
         except Exception as e:
             print(f"Error downloading KR {ticker}: {e}")
     
+    if not closes:
+        raise ValueError("No data was downloaded. Please check the ticker symbols.")
+    data = pd.concat(closes, axis=1).sort_index()
+    
     # 결측치 전일 데이터로 채우기
     data = data.ffill()
     
@@ -52,78 +93,18 @@ def create_strategy(name, weights):
          StaticAllocationStrategy(weights),
          bt.algos.Rebalance()])
 
-def run_inflation_portfolio_backtest():
-    # ETF 티커 정의
-    tickers = {
-        'US': {
-            'tips': 'TIP',      # TIPS ETF
-            'commodity': 'DBC',  # 원자재 ETF
-            'gold': 'GLD',      # 금 ETF
-            'reit': 'VNQ'       # 리츠 ETF
-        },
-        'KR': {
-            'tips': '305080',    # KBSTAR 국고채TIPS
-            'commodity': '261220', # KODEX 원자재
-            'gold': '132030',     # KODEX 골드선물
-            'reit': '329200'      # TIGER 리츠부동산
-        }
-    }
-    
-    # 데이터 다운로드 (5년치)
-    start_date = "2023-01-01"
-    end_date = "2024-12-02"
-    
-    print("Downloading data...")
-    data = download_data(tickers, start_date, end_date)
-    print("Data shape:", data.shape)
-    print("Available columns:", data.columns.tolist())
-    
-    # 결측치 확인 및 보고
-    missing_data = data.isnull().sum()
-    if missing_data.any():
-        print("\nMissing data count:")
-        print(missing_data[missing_data > 0])
-    
-    # 포트폴리오 가중치 설정
-    us_weights = pd.Series({
-        f"US_{tickers['US']['tips']}": 0.3,       # TIPS 30%
-        f"US_{tickers['US']['commodity']}": 0.2,   # 원자재 20%
-        f"US_{tickers['US']['gold']}": 0.2,        # 금 20%
-        f"US_{tickers['US']['reit']}": 0.3         # 리츠 30%
-    })
-    
-    kr_weights = pd.Series({
-        f"KR_{tickers['KR']['tips']}": 0.3,       # TIPS 30%
-        f"KR_{tickers['KR']['commodity']}": 0.2,   # 원자재 20%
-        f"KR_{tickers['KR']['gold']}": 0.2,        # 금 20%
-        f"KR_{tickers['KR']['reit']}": 0.3         # 리츠 30%
-    })
-    
-    # 수수료 설정
-    us_commission = lambda q, p: max(0, abs(q) * 0.0018)  # 미국 ETF 수수료: 0.18%
-    kr_commission = lambda q, p: max(0, abs(q) * 0.0003)  # 한국 ETF 수수료: 0.03%
-    
-    # 전략 생성 및 백테스트 실행
-    us_strategy = create_strategy('US Inflation Portfolio', us_weights)
-    kr_strategy = create_strategy('KR Inflation Portfolio', kr_weights)
-    
-    us_backtest = bt.Backtest(us_strategy, data, commissions=us_commission)
-    kr_backtest = bt.Backtest(kr_strategy, data, commissions=kr_commission)
-    
-    res = bt.run(us_backtest, kr_backtest)
-    return res
+def create_risk_parity_strategy(name, data, weights):
+    """
+    리스크 패리티 올웨더: 같은 자산에 위험 기여도가 같도록 분기마다 비중을 다시 계산
+    (공분산은 반감기 60일 EWMA로 매일 갱신, 수익률이 20일 쌓이기 전에는 고정 비중 사용)
+    """
+    return bt.Strategy(name,
+        [RiskParityAlgo(data[weights.index], halflife=60, rebalance='quarterly', fallback=weights),
+         bt.algos.Rebalance()])
 
 def calculate_annual_returns(results):
-    daily_returns = results.prices.pct_change()
-    annual_returns = {}
-    
-    for strategy in daily_returns.columns:
-        strategy_returns = daily_returns[strategy] + 1
-        by_year = strategy_returns.groupby(strategy_returns.index.year)
-        yearly_returns = (by_year.prod() - 1) * 100
-        annual_returns[strategy] = yearly_returns
-    
-    annual_df = pd.DataFrame(annual_returns).round(2)
+    # 모든 전략의 연도별 복리 수익률을 한 번에 계산
+    annual_df = compound_annual_returns(results.prices).round(2)
     
     # 연평균 수익률 추가
     means = annual_df.mean().round(2)
@@ -137,15 +118,17 @@ def calculate_detailed_metrics(results):
     예외 처리를 강화하고 결과 포맷을 개선했습니다.
     """
     try:
-        metrics = pd.DataFrame(index=results.stats.index)
+        # 전략별 지표를 한 번에 계산 (행: 전략, 열: 지표)
+        stats = calculate_stats(results.prices)
+        metrics = pd.DataFrame(index=stats.index)
         
-        for strategy in results.stats.index:
+        for strategy in stats.index:
             try:
-                cagr = results.stats.loc[strategy, 'cagr']
-                vol = results.stats.loc[strategy, 'yearly_vol']
-                sharpe = results.stats.loc[strategy, 'daily_sharpe']
-                max_dd = results.stats.loc[strategy, 'max_drawdown']
-                calmar = results.stats.loc[strategy, 'calmar']
+                cagr = stats.loc[strategy, 'cagr']
+                vol = stats.loc[strategy, 'yearly_vol']
+                sharpe = stats.loc[strategy, 'daily_sharpe']
+                max_dd = stats.loc[strategy, 'max_drawdown']
+                calmar = stats.loc[strategy, 'calmar']
                 
                 metrics.loc[strategy, '연평균 수익률(CAGR)'] = f"{cagr*100:.2f}%"
                 metrics.loc[strategy, '변동성'] = f"{vol*100:.2f}%" if not np.isnan(vol) else "N/A"
@@ -164,21 +147,7 @@ def calculate_detailed_metrics(results):
         return pd.DataFrame({"Error": "Failed to calculate metrics"})
 
 def run_inflation_portfolio_backtest():
-    # ETF 티커 정의
-    tickers = {
-        'US': {
-            'tips': 'TIP',      # TIPS ETF
-            'commodity': 'DBC',  # 원자재 ETF
-            'gold': 'GLD',      # 금 ETF
-            'reit': 'VNQ'       # 리츠 ETF
-        },
-        'KR': {
-            'tips': '305080',    # KBSTAR 국고채TIPS
-            'commodity': '261220', # KODEX 원자재
-            'gold': '132030',     # KODEX 골드선물
-            'reit': '329200'      # TIGER 리츠부동산
-        }
-    }
+    tickers = TICKERS
     
     try:
         # 데이터 다운로드 (2년치)
@@ -204,32 +173,31 @@ def run_inflation_portfolio_backtest():
                 print("Warning: Some assets have more than 10% missing data")
         
         # 포트폴리오 가중치 설정
-        us_weights = pd.Series({
-            f"US_{tickers['US']['tips']}": 0.3,       # TIPS 30%
-            f"US_{tickers['US']['commodity']}": 0.2,   # 원자재 20%
-            f"US_{tickers['US']['gold']}": 0.2,        # 금 20%
-            f"US_{tickers['US']['reit']}": 0.3         # 리츠 30%
-        })
-        
-        kr_weights = pd.Series({
-            f"KR_{tickers['KR']['tips']}": 0.3,       # TIPS 30%
-            f"KR_{tickers['KR']['commodity']}": 0.2,   # 원자재 20%
-            f"KR_{tickers['KR']['gold']}": 0.2,        # 금 20%
-            f"KR_{tickers['KR']['reit']}": 0.3         # 리츠 30%
-        })
+        us_weights, kr_weights = create_weights(tickers)
         
         # 수수료 설정
         us_commission = lambda q, p: max(0, abs(q) * 0.0018)  # 미국 ETF 수수료: 0.18%
         kr_commission = lambda q, p: max(0, abs(q) * 0.0003)  # 한국 ETF 수수료: 0.03%
         
         # 전략 생성 및 백테스트 실행
+        # 시장별로 자기 거래소 거래일만 남김 (상대 시장 휴장일의 채운 행 제외)
+        us_data = market_prices(data, 'US')
+        kr_data = market_prices(data, 'KR')
+        
         us_strategy = create_strategy('US Inflation Portfolio', us_weights)
         kr_strategy = create_strategy('KR Inflation Portfolio', kr_weights)
         
-        us_backtest = bt.Backtest(us_strategy, data, commissions=us_commission)
-        kr_backtest = bt.Backtest(kr_strategy, data, commissions=kr_commission)
+        us_backtest = bt.Backtest(us_strategy, us_data, commissions=us_commission)
+        kr_backtest = bt.Backtest(kr_strategy, kr_data, commissions=kr_commission)
+        
+        # 리스크 패리티 비교 전략 (고정 비중 대신 위험 기여도 균형 비중)
+        # (공분산도 자기 시장 거래일 수익률로만 계산)
+        us_rp_backtest = bt.Backtest(create_risk_parity_strategy('US Risk Parity Portfolio', us_data, us_weights),
+                                     us_data, commissions=us_commission)
+        kr_rp_backtest = bt.Backtest(create_risk_parity_strategy('KR Risk Parity Portfolio', kr_data, kr_weights),
+                                     kr_data, commissions=kr_commission)
         
-        res = bt.run(us_backtest, kr_backtest)
+        res = run_parallel(us_backtest, kr_backtest, us_rp_backtest, kr_rp_backtest)
         return res
         
     except Exception as e:
@@ -1,13 +1,45 @@
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
 import bt
 import numpy as np
 from datetime import datetime
+from Backtest_stats import calculate_stats, compound_annual_returns
+from Backtest_parallel import run_parallel  # run the US and KR backtests concurrently
+from Backtest_strategies import market_prices  # prices aligned to each exchange calendar
+
+# Define ETF tickers
+TICKERS = {
+    'US': {
+        'global': ['VT', 'ACWI'],
+        'emerging': ['VWO', 'EEM'],
+        'tech': ['VGT', 'QQQ']
+    },
+    'KR': {
+        'global': '371460',
+        'emerging': '195980',
+        'tech': '133690'
+    }
+}
+
+def create_weights(tickers):
+    """Portfolio weights per market (global 40%, emerging 30%, tech 30%)"""
+    us_weights = pd.Series({
+        'US_VT': 0.2, 'US_ACWI': 0.2,  # Global stocks 40%
+        'US_VWO': 0.15, 'US_EEM': 0.15,  # Emerging markets 30%
+        'US_VGT': 0.15, 'US_QQQ': 0.15   # Tech stocks 30%
+    })
+    
+    kr_weights = pd.Series({
+        'KR_371460': 0.4,  # Global stocks 40%
+        'KR_195980': 0.3,  # Emerging markets 30%
+        'KR_133690': 0.3   # Tech stocks 30%
+    })
+    
+    return us_weights, kr_weights
 
 def download_data(tickers_dict, start_date, end_date):
     """Download and prepare ETF price data"""
-    data = pd.DataFrame()
+    import yfinance as yf  # imported only when downloading
+    closes = {}  # keep every trading day of both markets, split per market later
     
     # US ETF data download
     for category, tickers in tickers_dict['US'].items():
@@ -15,7 +47,7 @@ def download_data(tickers_dict, start_date, end_date):
             try:
                 ticker_data = yf.download(ticker, start=start_date, end=end_date)['Adj Close']
                 if not ticker_data.empty:
-                    data[f"US_{ticker}"] = ticker_data
+                    closes[f"US_{ticker}"] = ticker_data
                     print(f"Successfully downloaded {ticker}")
             except Exception as e:
                 print(f"Error downloading US {ticker}: {e}")
@@ -25,11 +57,15 @@ def download_data(tickers_dict, start_date, end_date):
         try:
             ticker_data = yf.download(f"{ticker}.KS", start=start_date, end=end_date)['Adj Close']
             if not ticker_data.empty:
-                data[f"KR_{ticker}"] = ticker_data
+                closes[f"KR_{ticker}"] = ticker_data
                 print(f"Successfully downloaded {ticker}.KS")
         except Exception as e:
             print(f"Error downloading KR {ticker}: {e}")
     
+    if not closes:
+        raise ValueError("No data was downloaded. Please check the ticker symbols.")
+    data = pd.concat(closes, axis=1).sort_index()
+    
     # Handle missing data
     data = data.ffill().bfill()
     
@@ -58,48 +94,30 @@ def create_strategy(name, weights):
 
 def calculate_metrics(results):
     """Calculate detailed performance metrics"""
-    metrics = pd.DataFrame(index=results.stats.index)
+    # One vectorized pass over all equity curves (rows: strategies)
+    stats = calculate_stats(results.prices)
+    metrics = pd.DataFrame(index=stats.index)
     
-    for strategy in results.stats.index:
-        metrics.loc[strategy, 'CAGR'] = f"{results.stats.loc[strategy, 'cagr']:.2%}"
-        metrics.loc[strategy, 'Volatility'] = f"{results.stats.loc[strategy, 'yearly_vol']:.2%}"
-        metrics.loc[strategy, 'Sharpe Ratio'] = f"{results.stats.loc[strategy, 'yearly_sharpe']:.2f}"
-        metrics.loc[strategy, 'Max Drawdown'] = f"{results.stats.loc[strategy, 'max_drawdown']:.2%}"
-        metrics.loc[strategy, 'Return/Risk'] = f"{results.stats.loc[strategy, 'calmar']:.2f}"
+    for strategy in stats.index:
+        metrics.loc[strategy, 'CAGR'] = f"{stats.loc[strategy, 'cagr']:.2%}"
+        metrics.loc[strategy, 'Volatility'] = f"{stats.loc[strategy, 'yearly_vol']:.2%}"
+        metrics.loc[strategy, 'Sharpe Ratio'] = f"{stats.loc[strategy, 'yearly_sharpe']:.2f}"
+        metrics.loc[strategy, 'Max Drawdown'] = f"{stats.loc[strategy, 'max_drawdown']:.2%}"
+        metrics.loc[strategy, 'Return/Risk'] = f"{stats.loc[strategy, 'calmar']:.2f}"
     
     return metrics
 
 def calculate_annual_returns(results):
     """Calculate annual returns for each strategy"""
-    daily_returns = results.prices.pct_change()
-    annual_returns = {}
-    
-    for strategy in daily_returns.columns:
-        strategy_returns = daily_returns[strategy] + 1
-        by_year = strategy_returns.groupby(strategy_returns.index.year)
-        yearly_returns = (by_year.prod() - 1) * 100
-        annual_returns[strategy] = yearly_returns
-    
-    annual_df = pd.DataFrame(annual_returns).round(2)
+    # Compound daily returns by year for all strategies at once
+    annual_df = compound_annual_returns(results.prices).round(2)
     means = annual_df.mean().round(2)
     annual_df.loc['Average'] = means
     
     return annual_df
 
 def run_backtest():
-    # Define ETF tickers
-    tickers = {
-        'US': {
-            'global': ['VT', 'ACWI'],
-            'emerging': ['VWO', 'EEM'],
-            'tech': ['VGT', 'QQQ']
-        },
-        'KR': {
-            'global': '371460',
-            'emerging': '195980',
-            'tech': '133690'
-        }
-    }
+    tickers = TICKERS
     
     # Set time period
     start_date = "2018-01-01"
@@ -109,30 +127,24 @@ def run_backtest():
     data = download_data(tickers, start_date, end_date)
     
     # Set portfolio weights
-    us_weights = pd.Series({
-        'US_VT': 0.2, 'US_ACWI': 0.2,  # Global stocks 40%
-        'US_VWO': 0.15, 'US_EEM': 0.15,  # Emerging markets 30%
-        'US_VGT': 0.15, 'US_QQQ': 0.15   # Tech stocks 30%
-    })
-    
-    kr_weights = pd.Series({
-        'KR_371460': 0.4,  # Global stocks 40%
-        'KR_195980': 0.3,  # Emerging markets 30%
-        'KR_133690': 0.3   # Tech stocks 30%
-    })
+    us_weights, kr_weights = create_weights(tickers)
     
     # Define trading costs
     us_commission = lambda q, p: max(0, abs(q) * 0.0018)  # US ETF fee: 0.18%
     kr_commission = lambda q, p: max(0, abs(q) * 0.0003)  # KR ETF fee: 0.03%
     
     # Create and run backtests
+    # Keep only each market's own sessions (drop rows filled on the other market's holidays)
+    us_data = market_prices(data, 'US')
+    kr_data = market_prices(data, 'KR')
+    
     us_strategy = create_strategy('US Global ETF Portfolio', us_weights)
     kr_strategy = create_strategy('KR Global ETF Portfolio', kr_weights)
     
-    us_backtest = bt.Backtest(us_strategy, data, commissions=us_commission)
-    kr_backtest = bt.Backtest(kr_strategy, data, commissions=kr_commission)
+    us_backtest = bt.Backtest(us_strategy, us_data, commissions=us_commission)
+    kr_backtest = bt.Backtest(kr_strategy, kr_data, commissions=kr_commission)
     
-    return bt.run(us_backtest, kr_backtest)
+    return run_parallel(us_backtest, kr_backtest)
 
 if __name__ == "__main__":
     try:
@@ -1,19 +1,51 @@
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
 import bt
 import numpy as np
 from datetime import datetime
+from Backtest_stats import calculate_stats, compound_annual_returns
+from Backtest_parallel import run_parallel  # 미국/한국 백테스트 동시 실행
+from Backtest_strategies import market_prices  # 시장별 거래소 거래일에 맞춘 가격
+
+# ETF 티커 정의 (실제 거래되는 티커 심볼로 수정)
+TICKERS = {
+    'US': {
+        'sp500': 'SPY',       # SPDR S&P 500 ETF
+        'dividend': 'VYM',     # Vanguard High Dividend Yield ETF
+        'bond': 'AGG'         # iShares Core U.S. Aggregate Bond ETF
+    },
+    'KR': {
+        'sp500': '069500',    # KODEX 200
+        'dividend': '279530',  # KODEX 고배당
+        'bond': '114820'      # KBSTAR 중기국고채
+    }
+}
+
+def create_weights(tickers):
+    """시장별 포트폴리오 가중치 (주식 40%, 배당주 30%, 채권 30%)"""
+    us_weights = pd.Series({
+        f"US_{tickers['US']['sp500']}": 0.4,
+        f"US_{tickers['US']['dividend']}": 0.3,
+        f"US_{tickers['US']['bond']}": 0.3
+    })
+    
+    kr_weights = pd.Series({
+        f"KR_{tickers['KR']['sp500']}": 0.4,
+        f"KR_{tickers['KR']['dividend']}": 0.3,
+        f"KR_{tickers['KR']['bond']}": 0.3
+    })
+    
+    return us_weights, kr_weights
 
 def download_data(tickers_dict, start_date, end_date):
-    data = pd.DataFrame()
+    import yfinance as yf  # 데이터를 내려받을 때만 불러옵니다
+    closes = {}  # 두 시장의 거래일을 모두 남기도록 합친 뒤 시장별로 나눕니다
     
     # 미국 ETF 데이터 다운로드
     for category, ticker in tickers_dict['US'].items():
         try:
             ticker_data = yf.download(ticker, start=start_date, end=end_date)['Adj Close']
             if not ticker_data.empty:
-                data[f"US_{ticker}"] = ticker_data
+                closes[f"US_{ticker}"] = ticker_data
                 print(f"Successfully downloaded {ticker}")
         except Exception as e:
             print(f"Error downloading US {ticker}: {e}")
@@ -23,11 +55,15 @@ def download_data(tickers_dict, start_date, end_date):
         try:
             ticker_data = yf.download(f"{ticker}.KS", start=start_date, end=end_date)['Adj Close']
             if not ticker_data.empty:
-                data[f"KR_{ticker}"] = ticker_data
+                closes[f"KR_{ticker}"] = ticker_data
                 print(f"Successfully downloaded {ticker}.KS")
         except Exception as e:
             print(f"Error downloading KR {ticker}: {e}")
     
+    if not closes:
+        raise ValueError("No data was downloaded. Please check the ticker symbols.")
+    data = pd.concat(closes, axis=1).sort_index()
+    
     # 결측치 처리
     data = data.ffill()
     
@@ -54,19 +90,7 @@ def create_strategy(name, weights):
          bt.algos.Rebalance()])
 
 def run_backtest():
-    # ETF 티커 정의 (실제 거래되는 티커 심볼로 수정)
-    tickers = {
-        'US': {
-            'sp500': 'SPY',       # SPDR S&P 500 ETF
-            'dividend': 'VYM',     # Vanguard High Dividend Yield ETF
-            'bond': 'AGG'         # iShares Core U.S. Aggregate Bond ETF
-        },
-        'KR': {
-            'sp500': '069500',    # KODEX 200
-            'dividend': '279530',  # KODEX 고배당
-            'bond': '114820'      # KBSTAR 중기국고채
-        }
-    }
+    tickers = TICKERS
     
     # 데이터 다운로드
     start_date = "2018-01-01"
@@ -84,43 +108,29 @@ def run_backtest():
         print(missing_data[missing_data > 0])
     
     # 포트폴리오 가중치 설정
-    us_weights = pd.Series({
-        f"US_{tickers['US']['sp500']}": 0.4,
-        f"US_{tickers['US']['dividend']}": 0.3,
-        f"US_{tickers['US']['bond']}": 0.3
-    })
-    
-    kr_weights = pd.Series({
-        f"KR_{tickers['KR']['sp500']}": 0.4,
-        f"KR_{tickers['KR']['dividend']}": 0.3,
-        f"KR_{tickers['KR']['bond']}": 0.3
-    })
+    us_weights, kr_weights = create_weights(tickers)
     
     # 수수료 함수 정의
     us_commission = lambda q, p: max(0, abs(q) * 0.0018)  # 미국 ETF 수수료: 0.18%
     kr_commission = lambda q, p: max(0, abs(q) * 0.0003)  # 한국 ETF 수수료: 0.03%
     
     # 전략 생성 및 백테스트 실행
+    # 시장별로 자기 거래소 거래일만 남김 (상대 시장 휴장일의 채운 행 제외)
+    us_data = market_prices(data, 'US')
+    kr_data = market_prices(data, 'KR')
+    
     us_strategy = create_strategy('US ETF Portfolio', us_weights)
     kr_strategy = create_strategy('KR ETF Portfolio', kr_weights)
     
-    us_backtest = bt.Backtest(us_strategy, data, commissions=us_commission)
-    kr_backtest = bt.Backtest(kr_strategy, data, commissions=kr_commission)
+    us_backtest = bt.Backtest(us_strategy, us_data, commissions=us_commission)
+    kr_backtest = bt.Backtest(kr_strategy, kr_data, commissions=kr_commission)
     
-    res = bt.run(us_backtest, kr_backtest)
+    res = run_parallel(us_backtest, kr_backtest)
     return res
 
 def calculate_annual_returns(results):
-    daily_returns = results.prices.pct_change()
-    annual_returns = {}
-    
-    for strategy in daily_returns.columns:
-        strategy_returns = daily_returns[strategy] + 1
-        by_year = strategy_returns.groupby(strategy_returns.index.year)
-        yearly_returns = (by_year.prod() - 1) * 100
-        annual_returns[strategy] = yearly_returns
-    
-    annual_df = pd.DataFrame(annual_returns).round(2)
+    # 모든 전략의 연도별 복리 수익률을 한 번에 계산
+    annual_df = compound_annual_returns(results.prices).round(2)
     
     # 연평균 수익률 추가
     means = annual_df.mean().round(2)
@@ -129,14 +139,16 @@ def calculate_annual_returns(results):
     return annual_df
 
 def calculate_detailed_metrics(results):
-    metrics = pd.DataFrame(index=results.stats.index)
-    
-    for strategy in results.stats.index:
-        metrics.loc[strategy, '연평균 수익률(CAGR)'] = f"{results.stats.loc[strategy, 'cagr']:.2%}"
-        metrics.loc[strategy, '변동성'] = f"{results.stats.loc[strategy, 'yearly_vol']:.2%}"
-        metrics.loc[strategy, '샤프비율'] = f"{results.stats.loc[strategy, 'yearly_sharpe']:.2f}"
-        metrics.loc[strategy, '최대낙폭'] = f"{results.stats.loc[strategy, 'max_drawdown']:.2%}"
-        metrics.loc[strategy, '수익률/위험'] = f"{results.stats.loc[strategy, 'calmar']:.2f}"
+    # 전략별 지표를 한 번에 계산 (행: 전략, 열: 지표)
+    stats = calculate_stats(results.prices)
+    metrics = pd.DataFrame(index=stats.index)
+    
+    for strategy in stats.index:
+        metrics.loc[strategy, '연평균 수익률(CAGR)'] = f"{stats.loc[strategy, 'cagr']:.2%}"
+        metrics.loc[strategy, '변동성'] = f"{stats.loc[strategy, 'yearly_vol']:.2%}"
+        metrics.loc[strategy, '샤프비율'] = f"{stats.loc[strategy, 'yearly_sharpe']:.2f}"
+        metrics.loc[strategy, '최대낙폭'] = f"{stats.loc[strategy, 'max_drawdown']:.2%}"
+        metrics.loc[strategy, '수익률/위험'] = f"{stats.loc[strategy, 'calmar']:.2f}"
     
     return metrics
 
@@ -0,0 +1,196 @@
+# StockTrade24.com
+# 가상 시장 데이터 생성기
+#
+# 야후 파이낸스 없이도 백테스트를 실행하고 성능을 측정할 수 있도록
+# 실제와 비슷한 가상 OHLCV 데이터를 만듭니다.
+# - 기하 브라운 운동(GBM)에 점프(급등락)를 더한 가격 경로
+# - 여러 종목 사이의 상관관계
+# - 수익률 크기에 따라 늘어나는 거래량
+# - 한국거래소(KRX) 호가 단위 / 미국 0.01달러 단위 반올림
+# 같은 seed를 넣으면 항상 같은 데이터가 나옵니다.
+#
+# 사용법:
+#   ohlcv = generate_ohlcv(2000, seed=1)                             # 한 종목
+#   universe = generate_universe(100, 2000, market='KR', seed=1)     # {티커: OHLCV}
+#   prices = generate_prices(2000, n_assets=6, correlation=0.5)      # 종가만 (시점 x 종목)
+
+import numpy as np
+import pandas as pd
+
+# KRX 유가증권시장 호가 단위 (가격 상한, 호가 단위)
+KRX_TICK_SIZES = [
+    (2000, 1),
+    (5000, 5),
+    (20000, 10),
+    (50000, 50),
+    (200000, 100),
+    (500000, 500),
+    (np.inf, 1000),
+]
+
+DAILY_BAR_LIMIT = 50000  # 이보다 많은 봉은 일봉 대신 분봉 날짜를 사용합니다 (날짜 범위 초과 방지)
+MINUTES_PER_DAY = 390
+
+
+def krx_tick_size(prices):
+    """
+    가격별 KRX 호가 단위를 반환합니다.
+
+    Parameters:
+        prices (numpy.ndarray 또는 float): 가격
+
+    Returns:
+        numpy.ndarray: 호가 단위
+    """
+    prices = np.asarray(prices, dtype=float)
+    limits = np.array([limit for limit, _ in KRX_TICK_SIZES])
+    ticks = np.array([tick for _, tick in KRX_TICK_SIZES], dtype=float)
+    return ticks[np.searchsorted(limits, prices, side='right').clip(max=len(ticks) - 1)]
+
+
+def round_to_tick(prices, market='US'):
+    """
+    가격을 시장의 호가 단위로 반올림합니다. ('KR': KRX 호가 단위, 'US': 0.01달러)
+    """
+    prices = np.asarray(prices, dtype=float)
+    if market == 'KR':
+        tick = krx_tick_size(prices)
+        return np.maximum(np.round(prices / tick) * tick, 1.0)
+    return np.maximum(np.round(prices, 2), 0.01)
+
+
+def _dates(n_bars, start, freq):
+    """봉 개수에 맞는 날짜 인덱스를 만듭니다. 봉이 아주 많으면 분봉 간격을 사용합니다."""
+    if freq is None:
+        freq = 'B' if n_bars <= DAILY_BAR_LIMIT else 'min'
+    return pd.date_range(start, periods=n_bars, freq=freq), freq
+
+
+def _periods_per_year(freq):
+    return 252 if freq in ('B', 'D', 'C') else 252 * MINUTES_PER_DAY
+
+
+def _log_returns(rng, n_bars, n_assets, mu, sigma, correlation, jump_intensity, jump_mean, jump_std, dt):
+    """상관관계가 있는 GBM + 점프 로그수익률 행렬 (시점 x 종목)"""
+    corr = np.full((n_assets, n_assets), correlation, dtype=float)
+    np.fill_diagonal(corr, 1.0)
+    chol = np.linalg.cholesky(corr)
+
+    shocks = rng.standard_normal((n_bars, n_assets)) @ chol.T
+    returns = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * shocks
+
+    if jump_intensity > 0:
+        # 포아송 과정으로 점프 횟수를 뽑고, 점프 크기는 정규분포 합으로 만듭니다
+        counts = rng.poisson(jump_intensity * dt, (n_bars, n_assets))
+        jumped = counts > 0
+        returns[jumped] += rng.normal(jump_mean * counts[jumped], jump_std * np.sqrt(counts[jumped]))
+    return returns
+
+
+def generate_prices(n_bars, n_assets=1, mu=0.07, sigma=0.25, correlation=0.3, jump_intensity=0.0,
+                    jump_mean=-0.02, jump_std=0.05, start_price=100.0, start='2000-01-03',
+                    freq=None, market='US', columns=None, seed=None):
+    """
+    상관관계가 있는 여러 종목의 가상 종가를 만드는 함수입니다.
+
+    Parameters:
+        n_bars (int): 봉 개수
+        n_assets (int): 종목 수
+        mu (float): 연 기대수익률
+        sigma (float): 연 변동성
+        correlation (float): 종목 간 상관계수
+        jump_intensity (float): 연평균 점프 횟수 (0이면 점프 없음)
+        jump_mean (float): 점프 크기 평균 (로그수익률)
+        jump_std (float): 점프 크기 표준편차
+        start_price (float 또는 list): 시작 가격
+        start (str): 시작일
+        freq (str): 날짜 간격 (생략하면 봉 개수에 따라 'B' 또는 'min')
+        market (str): 'US' 또는 'KR' (호가 단위 반올림 기준)
+        columns (list): 종목 이름 (생략하면 SYN0000 형식)
+        seed (int): 난수 시드
+
+    Returns:
+        pandas.DataFrame: 종가 (시점 x 종목)
+    """
+    rng = np.random.default_rng(seed)
+    index, freq = _dates(n_bars, start, freq)
+    dt = 1.0 / _periods_per_year(freq)
+    returns = _log_returns(rng, n_bars, n_assets, mu, sigma, correlation,
+                           jump_intensity, jump_mean, jump_std, dt)
+    closes = np.asarray(start_price, dtype=float) * np.exp(np.cumsum(returns, axis=0))
+    columns = columns or [f"SYN{i:04d}" for i in range(n_assets)]
+    return pd.DataFrame(round_to_tick(closes, market), index=index, columns=columns)
+
+
+def _ohlcv_from_returns(rng, returns, start_price, index, market, base_volume, sigma_dt):
+    """한 종목의 로그수익률로 OHLCV를 만듭니다."""
+    close = start_price * np.exp(np.cumsum(returns))
+    previous = np.r_[start_price, close[:-1]]
+
+    # 시가는 전일 종가에서 약간 벗어나고, 고가/저가는 시가와 종가 바깥으로 벌어집니다
+    open_ = previous * np.exp(rng.normal(0, 0.2 * sigma_dt, len(close)))
+    spread = np.abs(rng.normal(0, 0.5 * sigma_dt, (2, len(close))))
+    high = np.maximum(open_, close) * np.exp(spread[0])
+    low = np.minimum(open_, close) * np.exp(-spread[1])
+
+    # 수익률이 클수록 거래량이 늘어납니다
+    surprise = np.abs(returns) / sigma_dt
+    volume = np.floor(base_volume * np.exp(rng.normal(0, 0.4, len(close)) + 0.5 * surprise))
+
+    return pd.DataFrame({
+        'Open': round_to_tick(open_, market),
+        'High': round_to_tick(high, market),
+        'Low': round_to_tick(low, market),
+        'Close': round_to_tick(close, market),
+        'Volume': volume,
+    }, index=index)
+
+
+def generate_universe(n_assets, n_bars, mu=0.07, sigma=0.25, correlation=0.3, jump_intensity=0.0,
+                      jump_mean=-0.02, jump_std=0.05, start_price=None, start='2000-01-03', freq=None,
+                      market='US', base_volume=1000000, seed=None):
+    """
+    상관관계가 있는 여러 종목의 가상 OHLCV를 만드는 함수입니다.
+    결과는 Data_cache.load_universe와 같은 {티커: OHLCV} 형태입니다.
+
+    Parameters:
+        n_assets (int): 종목 수
+        n_bars (int): 종목별 봉 개수
+        start_price (float): 시작 가격 (생략하면 US 100달러, KR 50,000원)
+        base_volume (float): 평균 거래량
+        (그 외 인자는 generate_prices와 동일)
+
+    Returns:
+        dict: {티커: OHLCV DataFrame}
+    """
+    rng = np.random.default_rng(seed)
+    index, freq = _dates(n_bars, start, freq)
+    dt = 1.0 / _periods_per_year(freq)
+    sigma_dt = sigma * np.sqrt(dt)
+    if start_price is None:
+        start_price = 50000.0 if market == 'KR' else 100.0
+
+    returns = _log_returns(rng, n_bars, n_assets, mu, sigma, correlation,
+                           jump_intensity, jump_mean, jump_std, dt)
+    universe = {}
+    for i in range(n_assets):
+        ticker = f"{i:06d}.KS" if market == 'KR' else f"SYN{i:04d}"
+        universe[ticker] = _ohlcv_from_returns(rng, returns[:, i], start_price, index,
+                                               market, base_volume, sigma_dt)
+    return universe
+
+
+def generate_ohlcv(n_bars, mu=0.07, sigma=0.25, jump_intensity=0.0, start_price=None,
+                   start='2000-01-03', freq=None, market='US', seed=None, **kwargs):
+    """
+    한 종목의 가상 OHLCV를 만드는 함수입니다.
+
+    사용법: ohlcv = generate_ohlcv(1000, jump_intensity=3, seed=42)
+
+    Returns:
+        pandas.DataFrame: OHLCV 데이터
+    """
+    universe = generate_universe(1, n_bars, mu=mu, sigma=sigma, jump_intensity=jump_intensity,
+                                 start_price=start_price, start=start, freq=freq,
+                                 market=market, seed=seed, **kwargs)
+    return next(iter(universe.values()))
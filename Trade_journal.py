@@ -0,0 +1,176 @@
+# StockTrade24.com
+# 자동매매 상태 기록(저널)
+#
+# 자동매매 프로그램의 하루 상태(매수 완료 종목, 매도 완료 여부, 보유 종목, 종목별 주문 금액)는
+# 메모리에만 있어서 오류로 프로그램이 멈췄다가 다시 시작하면 잔고 조회를 여러 번 다시 해야 하고,
+# 보유 종목만으로 매수 완료 목록을 만들기 때문에 주문 중이던 종목을 한 번 더 살 수도 있습니다.
+# 이 모듈은 주문, 체결 결과, 단계 변경을 날짜별 파일에 한 줄씩 덧붙여 기록하고,
+# 다시 시작할 때 파일을 처음부터 읽어 상태를 밀리초 단위로 되살립니다.
+#
+# - 기록은 매번 운영체제에 바로 씁니다 (프로그램이 죽어도 남음)
+# - 디스크 동기화(fsync)는 여러 기록을 모아서 합니다 (정전 대비, 주문 기록은 즉시 동기화)
+# - 마지막 줄이 쓰다 만 상태로 남아도 그 줄만 버리고 읽습니다
+#
+# 사용법:
+#   journal = TradeJournal()
+#   journal.record('plan', buy_amount=1000000, bought_list=[], ...)
+#   journal.record('order', side='buy', code='005930', qty=10, sync=True)
+#   state = journal.replay()          # 오늘 기록으로 되살린 상태 (없으면 None)
+
+import datetime
+import json
+import os
+import time
+
+JOURNAL_DIR = "journal"  # 저널 파일 폴더
+
+
+class TradeJournal:
+    """
+    날짜별 덧붙이기 전용 기록 파일입니다.
+
+    Parameters:
+        journal_dir (str): 기록 파일 폴더 (파일 이름: YYYY-MM-DD.jsonl)
+        sync_every (int): 이 개수만큼 기록이 쌓이면 디스크에 동기화
+        sync_interval (float): 마지막 동기화 후 이 시간(초)이 지나면 다음 기록 때 동기화
+    """
+
+    def __init__(self, journal_dir=JOURNAL_DIR, sync_every=32, sync_interval=1.0):
+        self.journal_dir = journal_dir
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._fd = None
+        self._day = None
+        self._seq = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        os.makedirs(journal_dir, exist_ok=True)
+
+    def path(self, day=None):
+        """그 날의 기록 파일 경로"""
+        day = day or datetime.date.today()
+        return os.path.join(self.journal_dir, f"{day.isoformat()}.jsonl")
+
+    def _open(self, day):
+        """날짜가 바뀌면 새 파일을 엽니다."""
+        if self._day == day:
+            return
+        self.close()
+        path = self.path(day)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._day = day
+        if os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":  # 쓰다 만 줄은 끝내 두어 다음 기록과 붙지 않게 합니다
+                    os.write(self._fd, b"\n")
+        self._seq = sum(1 for _ in read_events(self.path(day)))
+
+    def record(self, event, sync=False, **fields):
+        """
+        기록을 한 줄 덧붙입니다.
+
+        Parameters:
+            event (str): 기록 종류 ('plan', 'order', 'order_result', 'phase', 'reconcile')
+            sync (bool): True면 바로 디스크에 동기화 (주문처럼 잃으면 안 되는 기록)
+            **fields: 기록 내용 (JSON으로 저장할 수 있는 값)
+        """
+        now = datetime.datetime.now()
+        self._open(now.date())
+        self._seq += 1
+        line = json.dumps(dict(seq=self._seq, ts=now.isoformat(timespec='milliseconds'),
+                               event=event, **fields), ensure_ascii=False)
+        os.write(self._fd, (line + "\n").encode("UTF-8"))
+        self._pending += 1
+        if (sync or self._pending >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+
+    def sync(self):
+        """쌓인 기록을 디스크에 동기화합니다."""
+        if self._fd is not None and self._pending:
+            os.fsync(self._fd)
+            self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def replay(self, day=None):
+        """그 날의 기록으로 상태를 되살립니다. (replay_state 참고)"""
+        return replay_state(read_events(self.path(day)))
+
+    def close(self):
+        if self._fd is not None:
+            self.sync()
+            os.close(self._fd)
+        self._fd = None
+        self._day = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_events(path):
+    """
+    기록 파일의 기록을 차례로 읽습니다. 쓰다 만 마지막 줄은 건너뜁니다.
+
+    Returns:
+        generator: 기록 dict
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="UTF-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # 프로그램이 죽으며 쓰다 만 줄
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"{path}: 읽을 수 없는 기록을 건너뜁니다: {line[:80]}")
+
+
+def replay_state(events):
+    """
+    기록을 순서대로 적용해 자동매매 상태를 만듭니다.
+
+    결과를 받지 못한 매수 주문(pending_buys)은 체결되었을 수도 있으므로
+    같은 종목을 다시 사지 않도록 매수 완료 목록에 넣어 둡니다.
+
+    Returns:
+        dict: 매매 계획과 같은 형태의 상태 (그 날 'plan' 기록이 없으면 None)
+    """
+    state = None
+    for event in events:
+        kind = event['event']
+        if kind == 'plan':
+            state = {key: value for key, value in event.items() if key not in ('seq', 'ts', 'event')}
+            state.setdefault('soldout', False)
+            state['pending_buys'] = []
+            state['phase'] = 'planned'
+        elif state is None:
+            continue
+        elif kind == 'order' and event['side'] == 'buy':
+            state['pending_buys'].append(event['code'])
+        elif kind == 'order_result' and event['side'] == 'buy':
+            if event['code'] in state['pending_buys']:
+                state['pending_buys'].remove(event['code'])
+            if event['ok']:
+                state['soldout'] = False
+                if event['code'] not in state['bought_list']:
+                    state['bought_list'].append(event['code'])
+        elif kind == 'phase':
+            state['phase'] = event['phase']
+            if event['phase'] in ('presold', 'closed_out'):  # 장 시작/마감 일괄 매도 완료
+                state['soldout'] = True
+                state['bought_list'] = []
+                state['stock_dict'] = event.get('stock_dict', {})
+        elif kind == 'reconcile':
+            state['stock_dict'] = event['stock_dict']
+            state['bought_list'] = event['bought_list']
+
+    if state is not None:
+        for code in state['pending_buys']:
+            if code not in state['bought_list']:
+                state['bought_list'].append(code)
+    return state
@@ -0,0 +1,344 @@
+# StockTrade24.com
+# 거래소 거래일 달력 (KRX, NYSE)
+#
+# 주말만 확인하면 설날, 추석, 선거일 같은 휴장일에도 자동매매 프로그램이 하루 종일
+# 시세를 조회하고, 백테스트는 두 시장의 날짜를 합친 뒤 빈 행을 ffill/bfill로 채우게 됩니다.
+# 이 모듈은 거래소별 거래일을 정렬된 배열로 미리 만들어 두고
+# 이진 탐색(O(log n))으로 거래일 여부, 다음/이전 거래일, 개장/폐장 시각을 알려줍니다.
+# 자동매매 프로그램도 쓸 수 있도록 표준 라이브러리만 사용합니다. (pandas는 패널 정렬 함수에서만 사용)
+#
+# - KRX: 휴장일 표(KRX_HOLIDAYS)를 사용합니다. 매년 거래소 휴장일 공지에 맞춰 다음 해를 추가해야 합니다.
+# - NYSE: 휴장일 규칙으로 계산합니다. (부활절 전 금요일, 대체 휴일, 조기 폐장일 포함)
+#
+# 사용법:
+#   krx = get_calendar('KRX')
+#   krx.is_session(datetime.date.today())       # 오늘 장이 열리는지
+#   krx.session_hours(datetime.date.today())    # (개장 시각, 폐장 시각)
+#   krx.next_session('2024-09-16')              # 추석 연휴 다음 거래일
+
+import bisect
+import datetime
+
+# KRX 휴장일 (주말 제외, 연말 휴장일 포함)
+KRX_HOLIDAYS = (
+    # 2018
+    '2018-01-01', '2018-02-15', '2018-02-16', '2018-03-01', '2018-05-01', '2018-05-07',
+    '2018-05-22', '2018-06-06', '2018-06-13', '2018-08-15', '2018-09-24', '2018-09-25',
+    '2018-09-26', '2018-10-03', '2018-10-09', '2018-12-25', '2018-12-31',
+    # 2019
+    '2019-01-01', '2019-02-04', '2019-02-05', '2019-02-06', '2019-03-01', '2019-05-01',
+    '2019-05-06', '2019-06-06', '2019-08-15', '2019-09-12', '2019-09-13', '2019-10-03',
+    '2019-10-09', '2019-12-25', '2019-12-31',
+    # 2020
+    '2020-01-01', '2020-01-24', '2020-01-27', '2020-04-15', '2020-04-30', '2020-05-01',
+    '2020-05-05', '2020-08-17', '2020-09-30', '2020-10-01', '2020-10-02', '2020-10-09',
+    '2020-12-25', '2020-12-31',
+    # 2021
+    '2021-01-01', '2021-02-11', '2021-02-12', '2021-03-01', '2021-05-05', '2021-05-19',
+    '2021-08-16', '2021-09-20', '2021-09-21', '2021-09-22', '2021-10-04', '2021-10-11',
+    '2021-12-31',
+    # 2022
+    '2022-01-31', '2022-02-01', '2022-02-02', '2022-03-01', '2022-03-09', '2022-05-05',
+    '2022-06-01', '2022-06-06', '2022-08-15', '2022-09-09', '2022-09-12', '2022-10-03',
+    '2022-10-10', '2022-12-30',
+    # 2023
+    '2023-01-23', '2023-01-24', '2023-03-01', '2023-05-01', '2023-05-05', '2023-05-29',
+    '2023-06-06', '2023-08-15', '2023-09-28', '2023-09-29', '2023-10-02', '2023-10-03',
+    '2023-10-09', '2023-12-25', '2023-12-29',
+    # 2024
+    '2024-01-01', '2024-02-09', '2024-02-12', '2024-03-01', '2024-04-10', '2024-05-01',
+    '2024-05-06', '2024-05-15', '2024-06-06', '2024-08-15', '2024-09-16', '2024-09-17',
+    '2024-09-18', '2024-10-01', '2024-10-03', '2024-10-09', '2024-12-25', '2024-12-31',
+    # 2025
+    '2025-01-01', '2025-01-27', '2025-01-28', '2025-01-29', '2025-01-30', '2025-03-03',
+    '2025-05-01', '2025-05-05', '2025-05-06', '2025-06-03', '2025-06-06', '2025-08-15',
+    '2025-10-03', '2025-10-06', '2025-10-07', '2025-10-08', '2025-10-09', '2025-12-25',
+    '2025-12-31',
+    # 2026
+    '2026-01-01', '2026-02-16', '2026-02-17', '2026-02-18', '2026-03-02', '2026-05-01',
+    '2026-05-05', '2026-05-25', '2026-06-03', '2026-08-17', '2026-09-24', '2026-09-25',
+    '2026-10-05', '2026-10-09', '2026-12-25', '2026-12-31',
+)
+
+# 대학수학능력시험일 (KRX는 1시간 늦게 개장하고 1시간 늦게 폐장)
+KRX_CSAT_DAYS = (
+    '2018-11-15', '2019-11-14', '2020-12-03', '2021-11-18', '2022-11-17',
+    '2023-11-16', '2024-11-14', '2025-11-13', '2026-11-19',
+)
+
+# 규칙으로 계산되지 않는 NYSE 임시 휴장일
+NYSE_SPECIAL_CLOSURES = (
+    '2001-09-11', '2001-09-12', '2001-09-13', '2001-09-14', '2004-06-11', '2007-01-02',
+    '2012-10-29', '2012-10-30', '2018-12-05', '2025-01-09',
+)
+
+NYSE_FIRST_YEAR = 1990
+NYSE_LAST_YEAR = 2035
+
+_CALENDARS = {}
+
+
+def _to_date(value):
+    """문자열, datetime, pandas.Timestamp를 datetime.date로 바꿉니다."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if hasattr(value, 'date'):
+        return value.date()  # pandas.Timestamp
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def _weekdays(first, last):
+    """first~last 사이의 평일(월~금) 목록"""
+    day = first
+    one_day = datetime.timedelta(days=1)
+    days = []
+    while day <= last:
+        if day.weekday() < 5:
+            days.append(day)
+        day += one_day
+    return days
+
+
+class TradingCalendar:
+    """
+    한 거래소의 거래일 달력입니다.
+
+    Parameters:
+        name (str): 거래소 이름
+        sessions (list): 거래일 목록 (datetime.date, 정렬되지 않아도 됨)
+        open_time / close_time (datetime.time): 정규 개장/폐장 시각 (현지 시각)
+        special_hours (dict): {날짜: (개장 시각, 폐장 시각)} 정규 시간과 다른 날
+        timezone (str): 현지 시간대 이름
+        first_day / last_day (datetime.date): 달력이 다루는 기간 (생략하면 첫/마지막 거래일)
+    """
+
+    def __init__(self, name, sessions, open_time, close_time, special_hours=None, timezone=None,
+                 first_day=None, last_day=None):
+        self.name = name
+        self.open_time = open_time
+        self.close_time = close_time
+        self.special_hours = dict(special_hours or {})
+        self.timezone = timezone
+        self._ordinals = sorted({day.toordinal() for day in sessions})  # 이진 탐색용 정렬 배열
+        self.first_session = datetime.date.fromordinal(self._ordinals[0])
+        self.last_session = datetime.date.fromordinal(self._ordinals[-1])
+        self.first_day = first_day or self.first_session
+        self.last_day = last_day or self.last_session
+
+    def _check_range(self, day):
+        if not (self.first_day <= day <= self.last_day):
+            raise ValueError(f"{self.name} 달력 범위({self.first_day} ~ {self.last_day}) "
+                             f"밖의 날짜입니다: {day}")
+
+    def is_session(self, value):
+        """그 날 장이 열리는지 확인합니다."""
+        day = _to_date(value)
+        self._check_range(day)
+        ordinal = day.toordinal()
+        i = bisect.bisect_left(self._ordinals, ordinal)
+        return i < len(self._ordinals) and self._ordinals[i] == ordinal
+
+    def next_session(self, value):
+        """그 날 이후(그 날 제외) 첫 거래일을 반환합니다."""
+        day = _to_date(value)
+        i = bisect.bisect_right(self._ordinals, day.toordinal())
+        if i == len(self._ordinals):
+            raise ValueError(f"{self.name} 달력에 {day} 이후 거래일이 없습니다.")
+        return datetime.date.fromordinal(self._ordinals[i])
+
+    def previous_session(self, value):
+        """그 날 이전(그 날 제외) 마지막 거래일을 반환합니다."""
+        day = _to_date(value)
+        i = bisect.bisect_left(self._ordinals, day.toordinal())
+        if i == 0:
+            raise ValueError(f"{self.name} 달력에 {day} 이전 거래일이 없습니다.")
+        return datetime.date.fromordinal(self._ordinals[i - 1])
+
+    def sessions_between(self, start, end):
+        """start~end(둘 다 포함) 사이의 거래일 목록 (datetime.date)"""
+        lo = bisect.bisect_left(self._ordinals, _to_date(start).toordinal())
+        hi = bisect.bisect_right(self._ordinals, _to_date(end).toordinal())
+        return [datetime.date.fromordinal(o) for o in self._ordinals[lo:hi]]
+
+    def session_index(self, start, end):
+        """start~end 사이의 거래일을 pandas.DatetimeIndex로 반환합니다."""
+        import pandas as pd
+        return pd.DatetimeIndex(self.sessions_between(start, end))
+
+    def is_special_session(self, value):
+        """정규 시간과 다르게 열리는 날(늦은 개장, 조기 폐장)인지 확인합니다."""
+        day = _to_date(value)
+        return self.is_session(day) and day in self.special_hours
+
+    def session_hours(self, value):
+        """
+        그 날의 개장/폐장 시각을 반환합니다. 휴장일이면 None을 반환합니다.
+
+        Returns:
+            tuple: (개장 datetime, 폐장 datetime) (현지 시각, 시간대 정보 없음)
+        """
+        day = _to_date(value)
+        if not self.is_session(day):
+            return None
+        open_time, close_time = self.special_hours.get(day, (self.open_time, self.close_time))
+        return datetime.datetime.combine(day, open_time), datetime.datetime.combine(day, close_time)
+
+
+def _krx_calendar():
+    holidays = {datetime.date.fromisoformat(d) for d in KRX_HOLIDAYS}
+    first = datetime.date(int(KRX_HOLIDAYS[0][:4]), 1, 1)
+    last = datetime.date(int(KRX_HOLIDAYS[-1][:4]), 12, 31)
+    sessions = [day for day in _weekdays(first, last) if day not in holidays]
+
+    special = {}
+    # 새해 첫 거래일은 10시 개장
+    for year in range(first.year, last.year + 1):
+        opening_day = next(day for day in sessions if day.year == year)
+        special[opening_day] = (datetime.time(10, 0), datetime.time(15, 30))
+    # 수능일은 10시 개장, 16시 30분 폐장
+    for d in KRX_CSAT_DAYS:
+        special[datetime.date.fromisoformat(d)] = (datetime.time(10, 0), datetime.time(16, 30))
+
+    return TradingCalendar('KRX', sessions, datetime.time(9, 0), datetime.time(15, 30),
+                           special, 'Asia/Seoul', first, last)
+
+
+def _easter(year):
+    """그레고리력 부활절 날짜 (익명 그레고리력 알고리즘)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """그 달의 n번째 요일 (n=-1이면 마지막)"""
+    if n > 0:
+        day = datetime.date(year, month, 1)
+        day += datetime.timedelta(days=(weekday - day.weekday()) % 7)
+        return day + datetime.timedelta(weeks=n - 1)
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    day = next_month - datetime.timedelta(days=1)
+    return day - datetime.timedelta(days=(day.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    """토요일 휴일은 금요일, 일요일 휴일은 월요일에 쉽니다."""
+    if day.weekday() == 5:
+        return day - datetime.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + datetime.timedelta(days=1)
+    return day
+
+
+def _nyse_holidays(year):
+    """그 해 NYSE 휴장일 (규칙 기반)"""
+    days = [
+        _nth_weekday(year, 1, 0, 3),                   # 마틴 루터 킹 데이
+        _nth_weekday(year, 2, 0, 3),                   # 대통령의 날
+        _easter(year) - datetime.timedelta(days=2),    # 성금요일
+        _nth_weekday(year, 5, 0, -1),                  # 메모리얼 데이
+        _observed(datetime.date(year, 7, 4)),          # 독립기념일
+        _nth_weekday(year, 9, 0, 1),                   # 노동절
+        _nth_weekday(year, 11, 3, 4),                  # 추수감사절
+        _observed(datetime.date(year, 12, 25)),        # 크리스마스
+    ]
+    new_year = datetime.date(year, 1, 1)
+    if new_year.weekday() != 5:  # 토요일이면 전년도 12월 31일에 쉬지 않습니다
+        days.append(_observed(new_year))
+    if year >= 2022:
+        days.append(_observed(datetime.date(year, 6, 19)))  # 준틴스
+    return days
+
+
+def _nyse_calendar():
+    first = datetime.date(NYSE_FIRST_YEAR, 1, 1)
+    last = datetime.date(NYSE_LAST_YEAR, 12, 31)
+    holidays = {datetime.date.fromisoformat(d) for d in NYSE_SPECIAL_CLOSURES}
+    for year in range(first.year, last.year + 1):
+        holidays.update(_nyse_holidays(year))
+    sessions = [day for day in _weekdays(first, last) if day not in holidays]
+    session_set = set(sessions)
+
+    # 13시 조기 폐장: 독립기념일 전날, 추수감사절 다음 날, 크리스마스 이브
+    early = (datetime.time(9, 30), datetime.time(13, 0))
+    special = {}
+    for year in range(first.year, last.year + 1):
+        candidates = [
+            datetime.date(year, 7, 3),
+            _nth_weekday(year, 11, 3, 4) + datetime.timedelta(days=1),
+            datetime.date(year, 12, 24),
+        ]
+        for day in candidates:
+            if day in session_set:
+                special[day] = early
+
+    return TradingCalendar('NYSE', sessions, datetime.time(9, 30), datetime.time(16, 0),
+                           special, 'America/New_York', first, last)
+
+
+_BUILDERS = {'KRX': _krx_calendar, 'NYSE': _nyse_calendar}
+
+
+def get_calendar(exchange):
+    """
+    거래소 달력을 반환합니다. 처음 한 번만 만들고 이후에는 같은 객체를 돌려줍니다.
+
+    Parameters:
+        exchange (str): 'KRX' 또는 'NYSE'
+    """
+    exchange = exchange.upper()
+    if exchange not in _BUILDERS:
+        raise ValueError(f"지원하지 않는 거래소입니다: {exchange} (사용 가능: {', '.join(_BUILDERS)})")
+    if exchange not in _CALENDARS:
+        _CALENDARS[exchange] = _BUILDERS[exchange]()
+    return _CALENDARS[exchange]
+
+
+def exchange_for_ticker(ticker):
+    """야후 파이낸스 티커의 거래소 ('.KS', '.KQ'는 KRX, 나머지는 NYSE)"""
+    return 'KRX' if str(ticker).upper().endswith(('.KS', '.KQ')) else 'NYSE'
+
+
+def align_to_calendar(frame, exchange, fill=True):
+    """
+    가격 데이터를 거래소 거래일에 맞춥니다.
+    거래일이 아닌 날의 행(다른 시장 휴장일을 합치며 생긴 빈 행)은 지우고,
+    거래일에 일부 종목만 비어 있는 칸만 직전 값으로 채웁니다.
+    달력 범위 밖의 날짜는 원래 행을 그대로 둡니다.
+
+    사용법: us_prices = align_to_calendar(data[us_columns], 'NYSE')
+
+    Parameters:
+        frame (pandas.DataFrame): 날짜 인덱스를 가진 가격 데이터
+        exchange (str): 'KRX' 또는 'NYSE'
+        fill (bool): 거래일의 빈 칸을 직전 값으로 채울지 여부
+
+    Returns:
+        pandas.DataFrame: 거래일 행만 남은 데이터
+    """
+    calendar = get_calendar(exchange)
+    index = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+    aligned = frame.set_axis(index.normalize(), axis=0)
+    aligned = aligned[~aligned.index.duplicated(keep='last')]
+    if len(aligned) == 0:
+        return aligned
+
+    first = max(aligned.index[0].date(), calendar.first_day)
+    last = min(aligned.index[-1].date(), calendar.last_day)
+    outside = aligned.index[(aligned.index.date < calendar.first_day) |
+                            (aligned.index.date > calendar.last_day)]
+    sessions = calendar.session_index(first, last).union(outside)
+    aligned = aligned.reindex(sessions)
+    if fill:
+        aligned = aligned.ffill()
+    return aligned.dropna(how='all')